@@ -0,0 +1,116 @@
+"""Hot/cold archival of bookings, artwork orders and M-Pesa transactions
+
+exhibition_bookings, artwork_orders and mpesa_transactions only grow. archive_history()
+moves settled rows older than ARCHIVE_AFTER_MONTHS into artwork_orders_archive,
+exhibition_bookings_archive and mpesa_transactions_archive, which have the same columns
+and indexes (created with CREATE TABLE ... LIKE, without the foreign keys):
+
+- bookings for exhibitions that ended that long ago, once their payment is settled
+- artwork orders placed that long ago whose payment completed or failed
+- M-Pesa transactions made that long ago that completed or failed
+
+Each chunk of ARCHIVE_CHUNK_SIZE rows is copied and deleted in one short transaction, so a
+row is always in exactly one of the two tables. Pending rows are never moved.
+
+Admin listings, exports, check-in and the recommendation models read the hot tables only.
+A user's order history, an artist's orders and ticket PDFs include archived rows, and the
+counter and rollup rebuilds count both tables, so archiving never changes a report.
+Moving rows does not touch the counters themselves.
+
+A migration that changes one of the hot tables must change its archive table the same
+way, since rows are copied with INSERT ... SELECT *. The scheduler runs this nightly; to
+run it by hand:
+
+    python archive.py [--months N]
+"""
+import argparse
+import os
+from database import get_db_connection
+
+# Settled rows older than this many months move to the archive tables
+ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', '12'))
+# Rows moved per transaction
+ARCHIVE_CHUNK_SIZE = 500
+
+# Archive table of each hot table
+ARCHIVE_TABLES = {
+    'artwork_orders': 'artwork_orders_archive',
+    'exhibition_bookings': 'exhibition_bookings_archive',
+    'mpesa_transactions': 'mpesa_transactions_archive',
+}
+
+def with_archive(table):
+    """A hot table followed by its archive table"""
+    return (table, ARCHIVE_TABLES[table])
+
+# Ids of the next chunk to archive from each table; parameters are (months, limit).
+# The subquery on exhibitions is not locked, only the bookings read through their exhibition index.
+_ARCHIVABLE = {
+    'exhibition_bookings': """
+    SELECT id FROM exhibition_bookings
+    WHERE exhibition_id IN (SELECT id FROM exhibitions WHERE end_date < CURDATE() - INTERVAL %s MONTH)
+    AND payment_status IN ('completed', 'failed')
+    LIMIT %s
+    FOR UPDATE
+    """,
+    'artwork_orders': """
+    SELECT id FROM artwork_orders
+    WHERE payment_status IN ('completed', 'failed') AND order_date < NOW() - INTERVAL %s MONTH
+    LIMIT %s
+    FOR UPDATE
+    """,
+    'mpesa_transactions': """
+    SELECT id FROM mpesa_transactions
+    WHERE status IN ('completed', 'failed') AND transaction_date < NOW() - INTERVAL %s MONTH
+    LIMIT %s
+    FOR UPDATE
+    """,
+}
+
+def _archive_chunk(cursor, table, months):
+    """Move one chunk of a table's archivable rows; returns how many were moved"""
+    cursor.execute(_ARCHIVABLE[table], (months, ARCHIVE_CHUNK_SIZE))
+    ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return 0
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"INSERT INTO {ARCHIVE_TABLES[table]} SELECT * FROM {table} WHERE id IN ({placeholders})", ids)
+    cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+    return len(ids)
+
+def archive_history(months=ARCHIVE_AFTER_MONTHS):
+    """Move settled bookings, orders and transactions older than the given months to the archive tables"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+    counts = {"bookings": 0, "orders": 0, "transactions": 0}
+
+    try:
+        for key, table in (("bookings", 'exhibition_bookings'), ("orders", 'artwork_orders'),
+                           ("transactions", 'mpesa_transactions')):
+            while True:
+                moved = _archive_chunk(cursor, table, months)
+                connection.commit()
+                counts[key] += moved
+                if moved < ARCHIVE_CHUNK_SIZE:
+                    break
+
+        if any(counts.values()):
+            print(f"Archived history older than {months} months: {counts}")
+        return {"success": True, **counts}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error archiving history: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old settled bookings, orders and transactions to the archive tables")
+    parser.add_argument('--months', type=int, default=ARCHIVE_AFTER_MONTHS)
+    args = parser.parse_args()
+    print(archive_history(args.months))
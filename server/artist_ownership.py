@@ -0,0 +1,115 @@
+"""Keep artworks.artist_id populated so artist ownership is a plain foreign-key match
+
+Artworks entered before artist accounts existed (or by an admin typing the artist's name)
+only carried the free-text artworks.artist. Ownership is now decided by artist_id alone:
+names are resolved to ids when an artwork is written or an artist registers, and existing
+rows are resolved in batches with:
+
+    python artist_ownership.py
+
+A name is only resolved when exactly one artist account has it; ambiguous and unknown
+names are left NULL and reported.
+"""
+from database import get_db_connection
+from artist_stats import artwork_assigned
+from sales_rollup import artwork_reassigned
+
+# Unowned artworks resolved per transaction by the backfill
+BACKFILL_CHUNK_SIZE = 1000
+
+def _artist_ids_by_name(cursor, names):
+    """Map each name held by exactly one artist to that artist's id"""
+    if not names:
+        return {}
+    names = list(names)
+    placeholders = ', '.join(['%s'] * len(names))
+    cursor.execute(f"SELECT id, name FROM artists WHERE name IN ({placeholders})", tuple(names))
+    ids = {}
+    ambiguous = set()
+    for artist_id, name in cursor.fetchall():
+        if name in ids:
+            ambiguous.add(name)
+        ids[name] = artist_id
+    for name in ambiguous:
+        del ids[name]
+    return ids
+
+def resolve_artist_id(cursor, artist_name):
+    """Return the id of the only artist with this name, or None"""
+    if not artist_name:
+        return None
+    return _artist_ids_by_name(cursor, [artist_name]).get(artist_name)
+
+def assign_artwork(cursor, artwork_id, artist_id):
+    """Give an unowned artwork to an artist and move its sales into their counters and rollup bucket"""
+    cursor.execute(
+        "UPDATE artworks SET artist_id = %s WHERE id = %s AND artist_id IS NULL",
+        (artist_id, artwork_id)
+    )
+    if cursor.rowcount == 1:
+        artwork_assigned(cursor, artwork_id, artist_id)
+        artwork_reassigned(cursor, artwork_id, None, artist_id)
+        return True
+    return False
+
+def claim_artworks_by_name(cursor, artist_id, artist_name):
+    """Assign unowned artworks credited to a newly registered artist's name"""
+    if resolve_artist_id(cursor, artist_name) != artist_id:
+        return 0
+    cursor.execute("SELECT id FROM artworks WHERE artist_id IS NULL AND artist = %s", (artist_name,))
+    claimed = 0
+    for (artwork_id,) in cursor.fetchall():
+        if assign_artwork(cursor, artwork_id, artist_id):
+            claimed += 1
+    if claimed:
+        print(f"Assigned {claimed} existing artworks to artist {artist_id} ({artist_name})")
+    return claimed
+
+def backfill_artist_ids():
+    """Resolve artist_id for every unowned artwork, BACKFILL_CHUNK_SIZE rows per transaction"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+    assigned = 0
+    unresolved = {}
+    last_id = 0
+
+    try:
+        while True:
+            cursor.execute("""
+            SELECT id, artist FROM artworks
+            WHERE artist_id IS NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+            """, (last_id, BACKFILL_CHUNK_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            ids_by_name = _artist_ids_by_name(cursor, {name for _, name in rows if name})
+            for artwork_id, name in rows:
+                artist_id = ids_by_name.get(name)
+                if artist_id is None:
+                    unresolved[name] = unresolved.get(name, 0) + 1
+                elif assign_artwork(cursor, artwork_id, artist_id):
+                    assigned += 1
+            connection.commit()
+
+        print(f"Assigned artist_id to {assigned} artworks")
+        for name, count in sorted(unresolved.items(), key=lambda item: -item[1]):
+            print(f"  unresolved: {name!r} ({count} artworks) - no artist account, or more than one with this name")
+        return {"success": True, "assigned": assigned, "unresolved": sum(unresolved.values())}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error backfilling artist ids: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+if __name__ == "__main__":
+    backfill_artist_ids()
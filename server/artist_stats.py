@@ -0,0 +1,193 @@
+"""Denormalized per-artist and per-artwork counters
+
+artists.artwork_count, artists.order_count, artists.revenue and artworks.order_count are
+kept up to date by the write paths that change them. Each helper takes the caller's cursor
+and runs inside the caller's transaction, so a counter moves only if the write it describes
+commits. Revenue counts orders whose payment has completed, including orders moved to
+artwork_orders_archive (see archive.py).
+
+Counters follow artworks.artist_id; an artwork with no artist_id counts towards no artist until
+artist_ownership assigns it one. If counters ever drift, rebuild them with:
+
+    python artist_stats.py
+"""
+from database import get_db_connection
+from archive import with_archive
+
+# Artists (and artworks) recounted per transaction by the backfill
+BACKFILL_CHUNK_SIZE = 500
+
+def _paid_revenue(cursor, artwork_id):
+    """Total of an artwork's paid orders"""
+    revenue = 0
+    for table in with_archive('artwork_orders'):
+        cursor.execute(f"""
+        SELECT COALESCE(SUM(total_amount), 0) FROM {table}
+        WHERE artwork_id = %s AND payment_status = 'completed'
+        """, (artwork_id,))
+        revenue += cursor.fetchone()[0]
+    return revenue
+
+def artwork_added(cursor, artist_id):
+    """Count a newly inserted artwork towards its artist"""
+    if not artist_id:
+        return
+    cursor.execute("UPDATE artists SET artwork_count = artwork_count + 1 WHERE id = %s", (artist_id,))
+
+def artwork_removed(cursor, artwork_id):
+    """Take an artwork and its orders out of its artist's counters; call before deleting it"""
+    cursor.execute("SELECT artist_id, order_count FROM artworks WHERE id = %s FOR UPDATE", (artwork_id,))
+    row = cursor.fetchone()
+    if not row or not row[0]:
+        return
+    artist_id, order_count = row
+    revenue = _paid_revenue(cursor, artwork_id)
+
+    cursor.execute("""
+    UPDATE artists
+    SET artwork_count = GREATEST(artwork_count - 1, 0),
+        order_count = GREATEST(order_count - %s, 0),
+        revenue = GREATEST(revenue - %s, 0)
+    WHERE id = %s
+    """, (order_count, revenue, artist_id))
+
+def artwork_assigned(cursor, artwork_id, artist_id):
+    """Count an existing artwork, with its orders, towards the artist it was just assigned to"""
+    cursor.execute("SELECT order_count FROM artworks WHERE id = %s", (artwork_id,))
+    row = cursor.fetchone()
+    if not row:
+        return
+    order_count = row[0]
+    revenue = _paid_revenue(cursor, artwork_id)
+
+    cursor.execute("""
+    UPDATE artists
+    SET artwork_count = artwork_count + 1,
+        order_count = order_count + %s,
+        revenue = revenue + %s
+    WHERE id = %s
+    """, (order_count, revenue, artist_id))
+
+def order_added(cursor, artwork_id):
+    """Count a newly inserted artwork order towards the artwork and its artist"""
+    cursor.execute("UPDATE artworks SET order_count = order_count + 1 WHERE id = %s", (artwork_id,))
+    cursor.execute("""
+    UPDATE artists art
+    JOIN artworks a ON a.artist_id = art.id
+    SET art.order_count = art.order_count + 1
+    WHERE a.id = %s
+    """, (artwork_id,))
+
+def order_payment_changed(cursor, order_id, old_status, new_status):
+    """Move an order's amount into or out of its artist's revenue when it becomes (or stops being) paid"""
+    was_paid = old_status == 'completed'
+    is_paid = new_status == 'completed'
+    if was_paid == is_paid:
+        return
+    sign = 1 if is_paid else -1
+    cursor.execute("""
+    UPDATE artists art
+    JOIN artworks a ON a.artist_id = art.id
+    JOIN artwork_orders ao ON ao.artwork_id = a.id
+    SET art.revenue = art.revenue + %s * ao.total_amount
+    WHERE ao.id = %s
+    """, (sign, order_id))
+
+def _id_chunks(cursor, table):
+    """Yield (first_id, last_id) ranges covering a table"""
+    cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+    low, high = cursor.fetchone()
+    if low is None:
+        return
+    for start in range(low, high + 1, BACKFILL_CHUNK_SIZE):
+        yield start, start + BACKFILL_CHUNK_SIZE - 1
+
+def backfill_artist_stats():
+    """Recompute every counter from the source tables, one chunk per transaction
+
+    Each chunk locks its rows before counting, so orders and artworks written while
+    the backfill runs wait for the chunk to commit and are then counted on top of it.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+    artworks_updated = 0
+    artists_updated = 0
+
+    try:
+        for first_id, last_id in list(_id_chunks(cursor, 'artworks')):
+            cursor.execute("SELECT id FROM artworks WHERE id BETWEEN %s AND %s FOR UPDATE", (first_id, last_id))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                connection.commit()
+                continue
+
+            counts = {}
+            for table in with_archive('artwork_orders'):
+                cursor.execute(f"""
+                SELECT artwork_id, COUNT(*) FROM {table}
+                WHERE artwork_id BETWEEN %s AND %s
+                GROUP BY artwork_id
+                """, (first_id, last_id))
+                for artwork_id, count in cursor.fetchall():
+                    counts[artwork_id] = counts.get(artwork_id, 0) + count
+
+            cursor.executemany(
+                "UPDATE artworks SET order_count = %s WHERE id = %s",
+                [(counts.get(artwork_id, 0), artwork_id) for artwork_id in ids]
+            )
+            connection.commit()
+            artworks_updated += len(ids)
+
+        for first_id, last_id in list(_id_chunks(cursor, 'artists')):
+            cursor.execute("SELECT id FROM artists WHERE id BETWEEN %s AND %s FOR UPDATE", (first_id, last_id))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                connection.commit()
+                continue
+
+            cursor.execute("""
+            SELECT artist_id, COUNT(*) FROM artworks
+            WHERE artist_id BETWEEN %s AND %s
+            GROUP BY artist_id
+            """, (first_id, last_id))
+            artwork_counts = dict(cursor.fetchall())
+
+            order_totals = {}
+            for table in with_archive('artwork_orders'):
+                cursor.execute(f"""
+                SELECT a.artist_id, COUNT(*),
+                       COALESCE(SUM(CASE WHEN ao.payment_status = 'completed' THEN ao.total_amount END), 0)
+                FROM {table} ao
+                JOIN artworks a ON a.id = ao.artwork_id
+                WHERE a.artist_id BETWEEN %s AND %s
+                GROUP BY a.artist_id
+                """, (first_id, last_id))
+                for artist_id, count, revenue in cursor.fetchall():
+                    previous_count, previous_revenue = order_totals.get(artist_id, (0, 0))
+                    order_totals[artist_id] = (previous_count + count, previous_revenue + revenue)
+
+            cursor.executemany("""
+            UPDATE artists SET artwork_count = %s, order_count = %s, revenue = %s WHERE id = %s
+            """, [
+                (artwork_counts.get(artist_id, 0), *order_totals.get(artist_id, (0, 0)), artist_id)
+                for artist_id in ids
+            ])
+            connection.commit()
+            artists_updated += len(ids)
+
+        print(f"Backfilled counters for {artists_updated} artists and {artworks_updated} artworks")
+        return {"success": True, "artists": artists_updated, "artworks": artworks_updated}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error backfilling artist counters: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+if __name__ == "__main__":
+    backfill_artist_stats()
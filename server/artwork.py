@@ -1,4 +1,11 @@
-from database import get_db_connection, dict_from_row, json_dumps
+from database import get_db_connection, json_dumps
+from serialization import ResponseShape, to_float
+from response_cache import invalidate, ARTWORKS
+import search_index
+import autocomplete
+import similar_artworks
+from artist_stats import artwork_added, artwork_removed
+from artist_ownership import resolve_artist_id, assign_artwork
 from auth import verify_token
 import json
 import os
@@ -6,6 +13,20 @@ import base64
 import time
 from decimal import Decimal
 
+# Artwork JSON as the frontend expects it: (response field, column, conversion)
+ARTWORK_FIELDS = ResponseShape([
+    ('id', 'id', str),
+    ('title', 'title', None),
+    ('artist', 'artist', None),
+    ('description', 'description', None),
+    ('price', 'price', to_float),
+    ('image_url', 'image_url', None),
+    ('dimensions', 'dimensions', None),
+    ('medium', 'medium', None),
+    ('year', 'year', None),
+    ('status', 'status', None),
+])
+
 # Create the uploads directory if it doesn't exist
 def ensure_uploads_directory():
     """Create the uploads directory if it doesn't exist"""
@@ -65,8 +86,24 @@ def save_image_from_base64(base64_str, name_prefix="artwork"):
         print(f"Error saving image: {e}")
         return None
 
+def _resolve_image_url(artwork):
+    """Move an inline base64 image out to a file and make sure the URL is under /static/"""
+    image_url = artwork['image_url']
+    if not image_url:
+        return
+    if image_url.startswith('data:') or 'base64' in image_url:
+        # Save the base64 image to a file and get its path
+        saved_path = save_image_from_base64(image_url)
+        if saved_path:
+            # Update the database with the new path
+            update_artwork_image(artwork['id'], saved_path)
+            artwork['image_url'] = saved_path
+            print(f"Converted base64 image to file: {saved_path}")
+    elif not image_url.startswith('/static/'):
+        artwork['image_url'] = f"/static/uploads/{os.path.basename(image_url)}"
+
 def get_all_artworks():
-    connection = get_db_connection()
+    connection = get_db_connection(read_only=True)
     if connection is None:
         return {"error": "Database connection failed"}
     
@@ -82,31 +119,9 @@ def get_all_artworks():
         cursor.execute(query)
         rows = cursor.fetchall()
         
-        artworks = []
-        for row in rows:
-            artwork = dict_from_row(row, cursor)
-            
-            # Convert id to string to match frontend expectations
-            artwork['id'] = str(artwork['id'])
-            
-            # Format image URL if needed - ALWAYS ensure it has the correct prefix
-            if artwork['image_url']:
-                # Handle base64 images
-                if artwork['image_url'].startswith('data:') or 'base64' in artwork['image_url']:
-                    # Save the base64 image to a file and get its path
-                    saved_path = save_image_from_base64(artwork['image_url'])
-                    if saved_path:
-                        # Update the database with the new path
-                        update_artwork_image(artwork['id'], saved_path)
-                        artwork['image_url'] = saved_path
-                        print(f"Converted base64 image to file: {saved_path}")
-                elif not artwork['image_url'].startswith('/static/'):
-                    artwork['image_url'] = f"/static/uploads/{os.path.basename(artwork['image_url'])}"
-                
-                # Log the final image URL for debugging
-                print(f"Final image URL for {artwork['title']}: {artwork['image_url']}")
-                
-            artworks.append(artwork)
+        artworks = ARTWORK_FIELDS.all(cursor, rows)
+        for artwork in artworks:
+            _resolve_image_url(artwork)
         
         return {"artworks": artworks}
     except Exception as e:
@@ -117,6 +132,119 @@ def get_all_artworks():
             cursor.close()
             connection.close()
 
+def get_artworks_by_ids(artwork_ids, available_only=False):
+    """Get the given artworks in the order of artwork_ids, skipping missing (or sold) ones"""
+    if not artwork_ids:
+        return {"artworks": []}
+
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        placeholders = ", ".join(["%s"] * len(artwork_ids))
+        query = f"""
+        SELECT id, title, artist, description, price, image_url,
+               dimensions, medium, year, status
+        FROM artworks
+        WHERE id IN ({placeholders})
+        """
+        if available_only:
+            query += " AND status = 'available'"
+        cursor.execute(query, tuple(artwork_ids))
+        rows = cursor.fetchall()
+
+        by_id = {artwork['id']: artwork for artwork in ARTWORK_FIELDS.all(cursor, rows)}
+        artworks = [by_id[str(artwork_id)] for artwork_id in artwork_ids if str(artwork_id) in by_id]
+        for artwork in artworks:
+            _resolve_image_url(artwork)
+
+        return {"artworks": artworks}
+    except Exception as e:
+        print(f"Error getting artworks: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_similar_artworks(artwork_id, limit=similar_artworks.DEFAULT_SIMILAR):
+    """Get the artwork's most similar available artworks from artwork_neighbors, best first"""
+    limit = max(1, min(limit, similar_artworks.MAX_SIMILAR))
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+    
+    cursor = connection.cursor()
+    
+    try:
+        cursor.execute("SELECT 1 FROM artworks WHERE id = %s", (artwork_id,))
+        if not cursor.fetchone():
+            return {"error": "Artwork not found"}
+        
+        query = """
+        SELECT a.id, a.title, a.artist, a.description, a.price, a.image_url,
+               a.dimensions, a.medium, a.year, a.status
+        FROM artwork_neighbors n
+        JOIN artworks a ON a.id = n.neighbor_id
+        WHERE n.artwork_id = %s AND a.status = 'available'
+        ORDER BY n.score DESC, a.id
+        LIMIT %s
+        """
+        cursor.execute(query, (artwork_id, limit))
+        rows = cursor.fetchall()
+        
+        artworks = ARTWORK_FIELDS.all(cursor, rows)
+        for artwork in artworks:
+            _resolve_image_url(artwork)
+        
+        return {"artworks": artworks}
+    except Exception as e:
+        print(f"Error getting similar artworks: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_trending_artworks(days, limit):
+    """Get the most viewed artworks over the last days (today included), with their view counts"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+    
+    cursor = connection.cursor()
+    
+    try:
+        query = """
+        SELECT a.id, a.title, a.artist, a.description, a.price, a.image_url,
+               a.dimensions, a.medium, a.year, a.status, SUM(v.views) AS views
+        FROM daily_view_counts v
+        JOIN artworks a ON a.id = v.item_id
+        WHERE v.kind = 'artwork' AND v.day > CURDATE() - INTERVAL %s DAY
+        GROUP BY a.id
+        ORDER BY views DESC, a.id
+        LIMIT %s
+        """
+        cursor.execute(query, (days, limit))
+        rows = cursor.fetchall()
+        
+        artworks = ARTWORK_FIELDS.all(cursor, rows)
+        for artwork, row in zip(artworks, rows):
+            artwork['views'] = int(row[-1])
+            _resolve_image_url(artwork)
+        
+        return {"artworks": artworks, "days": days}
+    except Exception as e:
+        print(f"Error getting trending artworks: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
 def update_artwork_image(artwork_id, image_path):
     connection = get_db_connection()
     if connection is None:
@@ -161,23 +289,8 @@ def get_artwork(artwork_id):
         if not row:
             return {"error": "Artwork not found"}
         
-        artwork = dict_from_row(row, cursor)
-        # Convert id to string to match frontend expectations
-        artwork['id'] = str(artwork['id'])
-        
-        # Format image URL if needed
-        if artwork['image_url']:
-            # Handle base64 images
-            if artwork['image_url'].startswith('data:') or artwork['image_url'].startswith('base64,'):
-                # Save the base64 image to a file and get the file path
-                saved_path = save_image_from_base64(artwork['image_url'])
-                if saved_path:
-                    # Update the database with the new path
-                    update_artwork_image(artwork['id'], saved_path)
-                    artwork['image_url'] = saved_path
-                    print(f"Converted base64 image to file: {saved_path}")
-            elif not artwork['image_url'].startswith('/static/'):
-                artwork['image_url'] = f"/static/uploads/{os.path.basename(artwork['image_url'])}"
+        artwork = ARTWORK_FIELDS.one(cursor, row)
+        _resolve_image_url(artwork)
         
         return artwork
     except Exception as e:
@@ -266,6 +379,9 @@ def create_artwork(auth_header, artwork_data):
             # Make sure we set the artist_id in the database
             artwork_data["artist_id"] = artist_id
         
+        # Use artist_id from token if available, otherwise the artist account with this name
+        owner_id = artwork_data.get("artist_id", artist_id) or resolve_artist_id(cursor, artwork_data.get("artist"))
+        
         print(f"Inserting artwork data: {artwork_data}")
         query = """
         INSERT INTO artworks (title, artist, description, price, image_url,
@@ -282,12 +398,18 @@ def create_artwork(auth_header, artwork_data):
             artwork_data.get("medium"),
             artwork_data.get("year"),
             artwork_data.get("status", "available"),
-            artwork_data.get("artist_id", artist_id)  # Use artist_id from token if available
+            owner_id
         ))
+        # Read the id before the counter UPDATE below resets lastrowid
+        new_artwork_id = cursor.lastrowid
+        artwork_added(cursor, owner_id)
         connection.commit()
+        invalidate(ARTWORKS)
         
         # Return the newly created artwork
-        new_artwork_id = cursor.lastrowid
+        search_index.artwork_changed(new_artwork_id)
+        autocomplete.artwork_saved(new_artwork_id, artwork_data.get("title"), artwork_data.get("artist"), artwork_data.get("medium"))
+        similar_artworks.artwork_added(new_artwork_id)
         print(f"Artwork created successfully with ID: {new_artwork_id}")
         return get_artwork(new_artwork_id)
     except Exception as e:
@@ -384,12 +506,21 @@ def update_artwork(auth_header, artwork_id, artwork_data):
             artwork_data.get("status"),
             artwork_id
         ))
-        connection.commit()
         
         # Check if artwork was found and updated
         if cursor.rowcount == 0:
+            connection.rollback()
             return {"error": "Artwork not found"}
         
+        # An unowned artwork renamed to a registered artist now belongs to them
+        resolved_id = resolve_artist_id(cursor, artwork_data.get("artist"))
+        if resolved_id:
+            assign_artwork(cursor, artwork_id, resolved_id)
+        connection.commit()
+        invalidate(ARTWORKS)
+        search_index.artwork_changed(artwork_id)
+        autocomplete.artwork_saved(artwork_id, artwork_data.get("title"), artwork_data.get("artist"), artwork_data.get("medium"))
+        
         # Return the updated artwork
         return get_artwork(artwork_id)
     except Exception as e:
@@ -447,15 +578,29 @@ def delete_artwork(auth_header, artwork_id):
             result = cursor.fetchone()
             if not result or str(result[0]) != str(artist_id):
                 return {"error": "Unauthorized access: You can only delete your own artworks"}
-                
+        
+        # Archived orders have no foreign key to the artwork; refuse as the hot table's key would
+        cursor.execute("SELECT 1 FROM artwork_orders_archive WHERE artwork_id = %s LIMIT 1", (artwork_id,))
+        if cursor.fetchone():
+            return {"error": "Artwork has orders and cannot be deleted"}
+        
+        # Take the artwork out of its artist's counters in the same transaction as the delete
+        artwork_removed(cursor, artwork_id)
+        similar_artworks.artwork_deleted(cursor, artwork_id)
         query = "DELETE FROM artworks WHERE id = %s"
         cursor.execute(query, (artwork_id,))
-        connection.commit()
         
         # Check if artwork was found and deleted
         if cursor.rowcount == 0:
+            connection.rollback()
             return {"error": "Artwork not found"}
         
+        connection.commit()
+        invalidate(ARTWORKS)
+        search_index.artwork_removed(artwork_id)
+        autocomplete.artwork_deleted(artwork_id)
+        similar_artworks.forget_artwork(artwork_id)
+        
         return {"success": True, "message": "Artwork deleted successfully"}
     except Exception as e:
         print(f"Error deleting artwork: {e}")
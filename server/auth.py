@@ -2,6 +2,8 @@
 import hashlib
 import secrets
 from database import get_db_connection, json_dumps
+from artist_ownership import claim_artworks_by_name
+import autocomplete
 import jwt
 import datetime
 import os
@@ -96,6 +98,14 @@ def send_2fa_code(email, user_type):
         print(f"Error in send_2fa_code: {e}")
         return {"error": str(e)}
 
+def purge_expired_2fa_codes():
+    """Drop 2FA codes that expired without being used"""
+    now = time.time()
+    expired = [key for key, stored in list(two_fa_codes.items()) if now > stored["expires_at"]]
+    for key in expired:
+        two_fa_codes.pop(key, None)
+    return {"success": True, "purged": len(expired)}
+
 def verify_2fa_code(email, code, user_type):
     """Verify 2FA code"""
     try:
@@ -221,11 +231,15 @@ def register_artist(name, email, password, phone, bio=""):
         VALUES (%s, %s, %s, %s, %s)
         """
         cursor.execute(query, (name, email, hashed_password, phone, bio))
-        connection.commit()
         
         # Get the new artist ID
         artist_id = cursor.lastrowid
         
+        # Take ownership of artworks already credited to this name
+        claim_artworks_by_name(cursor, artist_id, name)
+        connection.commit()
+        autocomplete.artist_registered(artist_id, name)
+        
         # Generate token for the new artist
         token = generate_token(artist_id, name, False, True)
         
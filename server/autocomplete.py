@@ -0,0 +1,319 @@
+"""Type-ahead suggestions for the search box (GET /autocomplete)
+
+Artist names, artwork titles, mediums and exhibition titles are kept in memory as a
+sorted array of lower-cased keys searched with bisect: one key per word a phrase can
+be found by ("oti" suggests "Amani Otieno"), truncated to MAX_KEY_CHARS. Keys sit in
+a plain list with their entry ids in a parallel array('l'), which is far smaller than
+a trie of dict nodes. Suggestions are ranked by weight: how many artworks carry the
+artist name or medium (plus one for a registered artist account), and 1 for titles.
+
+The structure is built at startup and kept current by the artwork, exhibition and
+artist registration write paths. AUTOCOMPLETE_MEMORY_MB caps its footprint: past the
+budget new phrases are findable only by their first word, and past that not at all.
+"""
+import bisect
+import heapq
+import os
+import re
+import sys
+import threading
+from array import array
+from database import get_db_connection
+
+# Memory the structure may use before it stops adding keys
+AUTOCOMPLETE_MEMORY_MB = float(os.environ.get('AUTOCOMPLETE_MEMORY_MB', '128'))
+
+# Keys are cut to this many characters; longer prefixes are checked against the phrase
+MAX_KEY_CHARS = 24
+# Words of a phrase that get their own key ("the ... " titles are found by later words too)
+MAX_WORDS_INDEXED = 6
+
+DEFAULT_SUGGESTION_LIMIT = 8
+MAX_SUGGESTION_LIMIT = 20
+
+# Measured cost of a suggestion's sort key, display text and lookup slots, and of a source's id tuple
+ENTRY_OVERHEAD_BYTES = 300
+SOURCE_OVERHEAD_BYTES = 110
+# Past the budget by this factor, new phrases are not added at all
+BUDGET_HARD_LIMIT = 1.1
+
+# Ranked suggestions for prefixes this short are cached until the next change
+CACHED_PREFIX_CHARS = 2
+
+# Suggestion kinds, listed in this order when weights tie
+KINDS = ('artist', 'exhibition', 'title', 'medium')
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def normalize(text):
+    """Lower-cased words of text joined by single spaces"""
+    return ' '.join(_WORD.findall(str(text).lower())) if text else ''
+
+def _phrase_keys(normalized):
+    # One key per indexed word start, each running to the end of the phrase
+    keys = {normalized[:MAX_KEY_CHARS]}
+    start = 0
+    for _ in range(MAX_WORDS_INDEXED - 1):
+        start = normalized.find(' ', start) + 1
+        if not start:
+            break
+        keys.add(normalized[start:start + MAX_KEY_CHARS])
+    return keys
+
+class PrefixIndex:
+    """Weighted phrases searchable by the prefix of any of their first words
+
+    Phrases are added and removed by source (an artwork, exhibition or artist) so an
+    update replaces exactly what the previous version contributed. Thread-safe.
+    """
+
+    def __init__(self, memory_budget=AUTOCOMPLETE_MEMORY_MB * 1024 * 1024):
+        self.memory_budget = memory_budget
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._keys = []             # sorted lower-cased keys
+        self._ids = array('l')      # entry id of each key, parallel to _keys
+        self._key_bytes = 0         # sys.getsizeof() of every key
+        self._order = {}            # entry id -> (-weight, kind rank, normalized text), best first
+        self._texts = {}            # entry id -> display text
+        self._entry_ids = {kind: {} for kind in KINDS}  # kind -> normalized text -> entry id
+        self._next_id = 0
+        self._sources = {}          # source -> ids of the entries it contributed
+        self._cache = {}            # short prefix -> ranked entry ids
+        self.degraded = 0           # phrases findable by their first word only
+        self.skipped = 0            # phrases left out because the budget was spent
+
+    def __len__(self):
+        return len(self._order)
+
+    def memory_bytes(self):
+        """Approximate bytes held by keys, entries and sources"""
+        return (self._key_bytes + len(self._keys) * (8 + self._ids.itemsize)
+                + len(self._order) * ENTRY_OVERHEAD_BYTES + len(self._sources) * SOURCE_OVERHEAD_BYTES)
+
+    def _budget_keys(self, normalized):
+        # Over budget: only the whole phrase is findable, then nothing new at all
+        keys = _phrase_keys(normalized)
+        if self.memory_bytes() <= self.memory_budget:
+            return keys
+        if self.memory_bytes() > self.memory_budget * BUDGET_HARD_LIMIT:
+            self.skipped += 1
+            return None
+        if len(keys) > 1:
+            self.degraded += 1
+        return {normalized[:MAX_KEY_CHARS]}
+
+    def _new_entry(self, text, kind, weight, normalized):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._order[entry_id] = (-weight, KINDS.index(kind), normalized)
+        self._texts[entry_id] = str(text).strip()
+        self._entry_ids[kind][normalized] = entry_id
+        return entry_id
+
+    def set_source(self, source, phrases):
+        """Replace the (kind, text) phrases a source contributes"""
+        with self._lock:
+            previous = self._sources.pop(source, ())
+            for entry_id in previous:
+                self._release(entry_id)
+            entry_ids = []
+            for kind, text in phrases:
+                normalized = normalize(text)
+                if normalized:
+                    entry_id = self._acquire(kind, text, normalized)
+                    if entry_id is not None:
+                        entry_ids.append(entry_id)
+            if entry_ids:
+                self._sources[source] = tuple(entry_ids)
+            self._cache.clear()
+
+    def remove_source(self, source):
+        """Drop everything a source contributed"""
+        self.set_source(source, ())
+
+    def _acquire(self, kind, text, normalized):
+        entry_id = self._entry_ids[kind].get(normalized)
+        if entry_id is not None:
+            weight, kind_rank, _ = self._order[entry_id]
+            self._order[entry_id] = (weight - 1, kind_rank, normalized)
+            return entry_id
+
+        keys = self._budget_keys(normalized)
+        if keys is None:
+            return None
+        entry_id = self._new_entry(text, kind, 1, normalized)
+        for key in keys:
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, entry_id)
+            self._key_bytes += sys.getsizeof(key)
+        return entry_id
+
+    def _release(self, entry_id):
+        weight, kind_rank, normalized = self._order[entry_id]
+        if weight < -1:
+            self._order[entry_id] = (weight + 1, kind_rank, normalized)
+            return
+
+        del self._order[entry_id]
+        del self._texts[entry_id]
+        del self._entry_ids[KINDS[kind_rank]][normalized]
+        for key in _phrase_keys(normalized):
+            position = bisect.bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == entry_id:
+                    del self._keys[position]
+                    del self._ids[position]
+                    self._key_bytes -= sys.getsizeof(key)
+                    break
+                position += 1
+
+    def bulk_load(self, sources):
+        """Replace the whole index with {source: phrases}, sorting once instead of inserting"""
+        with self._lock:
+            self._reset()
+            weights = {}
+            texts = {}
+            source_phrases = {}
+            for source, phrases in sources.items():
+                kept = []
+                for kind, text in phrases:
+                    normalized = normalize(text)
+                    if normalized:
+                        phrase = (kind, normalized)
+                        kept.append(phrase)
+                        weights[phrase] = weights.get(phrase, 0) + 1
+                        texts.setdefault(phrase, text)
+                source_phrases[source] = kept
+            # Reserve the sources' share of the budget before spending it on keys
+            self._sources = dict.fromkeys(source_phrases, ())
+
+            # Heaviest phrases first, so a tight budget loses rare titles rather than artists
+            for (kind, normalized), weight in sorted(weights.items(), key=lambda item: -item[1]):
+                keys = self._budget_keys(normalized)
+                if keys is None:
+                    continue
+                entry_id = self._new_entry(texts[(kind, normalized)], kind, weight, normalized)
+                for key in keys:
+                    self._keys.append(key)
+                    self._ids.append(entry_id)
+                    self._key_bytes += sys.getsizeof(key)
+
+            for source, phrases in source_phrases.items():
+                entry_ids = tuple(self._entry_ids[kind][normalized] for kind, normalized in phrases
+                                  if normalized in self._entry_ids[kind])
+                if entry_ids:
+                    self._sources[source] = entry_ids
+                else:
+                    del self._sources[source]
+
+            order = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+            self._keys = [self._keys[position] for position in order]
+            self._ids = array('l', (self._ids[position] for position in order))
+
+    def suggest(self, prefix, limit=DEFAULT_SUGGESTION_LIMIT):
+        """Best-weighted phrases with a word starting with prefix, as (text, kind) pairs"""
+        query = normalize(prefix)
+        if not query:
+            return []
+
+        with self._lock:
+            ranked = self._cache.get(query)
+            if ranked is None:
+                key = query[:MAX_KEY_CHARS]
+                low = bisect.bisect_left(self._keys, key)
+                high = bisect.bisect_left(self._keys, key + '\U0010ffff')
+                entry_ids = set(self._ids[low:high])
+                if len(query) > MAX_KEY_CHARS:
+                    # Keys were truncated: confirm the whole prefix against the phrase
+                    entry_ids = {entry_id for entry_id in entry_ids
+                                 if (' ' + self._order[entry_id][2]).find(' ' + query) != -1}
+                ranked = heapq.nsmallest(MAX_SUGGESTION_LIMIT, entry_ids, key=self._order.__getitem__)
+                if len(query) <= CACHED_PREFIX_CHARS:
+                    self._cache[query] = ranked
+            return [(self._texts[entry_id], KINDS[self._order[entry_id][1]]) for entry_id in ranked[:limit]]
+
+_index = PrefixIndex()
+_built = False
+_build_lock = threading.Lock()
+
+def _artwork_phrases(title, artist, medium):
+    return (('title', title), ('artist', artist), ('medium', medium))
+
+def build():
+    """Load every artwork, exhibition and artist into the index"""
+    global _built
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        with _build_lock:
+            sources = {}
+            cursor.execute("SELECT id, title, artist, medium FROM artworks")
+            for artwork_id, title, artist, medium in cursor.fetchall():
+                sources[('artwork', artwork_id)] = _artwork_phrases(title, artist, medium)
+            cursor.execute("SELECT id, title FROM exhibitions")
+            for exhibition_id, title in cursor.fetchall():
+                sources[('exhibition', exhibition_id)] = (('exhibition', title),)
+            cursor.execute("SELECT id, name FROM artists")
+            for artist_id, name in cursor.fetchall():
+                sources[('artist', artist_id)] = (('artist', name),)
+
+            _index.bulk_load(sources)
+            _built = True
+        print(f"Autocomplete built: {len(_index)} suggestions, {_index.memory_bytes() / 1024 / 1024:.1f} MB")
+        if _index.degraded or _index.skipped:
+            print(f"Autocomplete over its {AUTOCOMPLETE_MEMORY_MB:g} MB budget: {_index.degraded} phrases indexed "
+                  f"by first word only, {_index.skipped} left out")
+        return {"success": True}
+    except Exception as e:
+        print(f"Error building autocomplete: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def _update(source, phrases):
+    # Before the first build there is nothing to keep current; build() reads the new row
+    with _build_lock:
+        if _built:
+            _index.set_source(source, phrases)
+
+def artwork_saved(artwork_id, title, artist, medium):
+    """Record an artwork's title, artist and medium after it was created or updated"""
+    _update(('artwork', int(artwork_id)), _artwork_phrases(title, artist, medium))
+
+def artwork_deleted(artwork_id):
+    """Forget a deleted artwork's phrases"""
+    _update(('artwork', int(artwork_id)), ())
+
+def exhibition_saved(exhibition_id, title):
+    """Record an exhibition's title after it was created or updated"""
+    _update(('exhibition', int(exhibition_id)), (('exhibition', title),))
+
+def exhibition_deleted(exhibition_id):
+    """Forget a deleted exhibition's title"""
+    _update(('exhibition', int(exhibition_id)), ())
+
+def artist_registered(artist_id, name):
+    """Suggest a newly registered artist"""
+    _update(('artist', int(artist_id)), (('artist', name),))
+
+def get_suggestions(prefix, limit=DEFAULT_SUGGESTION_LIMIT):
+    """Suggestions for a partly typed search, best first"""
+    if not _built:
+        result = build()
+        if "error" in result:
+            return result
+    limit = max(1, min(limit, MAX_SUGGESTION_LIMIT))
+    return {
+        "query": prefix,
+        "suggestions": [{"text": text, "kind": kind} for text, kind in _index.suggest(prefix, limit)],
+    }
@@ -0,0 +1,109 @@
+"""Compare the old name-matching artist dashboard queries with the artist_id-only ones
+
+Usage:
+    python benchmarks/seed_data.py                      # once, to get a realistically sized dataset
+    python benchmarks/bench_artist_queries.py           # mean latency per query over random artists
+    python benchmarks/bench_artist_queries.py --artists 200
+
+The old queries are kept here verbatim so the comparison can be rerun against any database.
+Both sets run against the same data; run artist_ownership.py first so the new queries see
+every artwork the old ones matched by name.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+
+BEFORE = {
+    "artist artworks": ("""
+        SELECT a.*,
+               COALESCE((SELECT COUNT(*) FROM artwork_orders ao WHERE ao.artwork_id = a.id), 0) as order_count
+        FROM artworks a
+        JOIN artists art ON art.id = %s
+        WHERE a.artist_id = %s OR a.artist = art.name
+        ORDER BY a.created_at DESC
+    """, 2),
+    "artist orders": ("""
+        SELECT ao.*, a.title as artwork_title, u.name as buyer_name, u.email as buyer_email
+        FROM artwork_orders ao
+        JOIN artworks a ON ao.artwork_id = a.id
+        JOIN users u ON ao.user_id = u.id
+        WHERE a.artist_id = %s OR a.artist = (SELECT name FROM artists WHERE id = %s)
+        ORDER BY ao.order_date DESC
+    """, 2),
+    "ownership check": ("""
+        SELECT a.id FROM artworks a
+        JOIN artists art ON art.id = %s
+        WHERE a.id = (SELECT MIN(id) FROM artworks) AND (a.artist_id = %s OR a.artist = art.name)
+    """, 2),
+}
+
+AFTER = {
+    "artist artworks": ("""
+        SELECT a.*
+        FROM artworks a
+        WHERE a.artist_id = %s
+        ORDER BY a.created_at DESC
+    """, 1),
+    "artist orders": ("""
+        SELECT ao.*, a.title as artwork_title, u.name as buyer_name, u.email as buyer_email
+        FROM artwork_orders ao
+        JOIN artworks a ON ao.artwork_id = a.id
+        JOIN users u ON ao.user_id = u.id
+        WHERE a.artist_id = %s
+        ORDER BY ao.order_date DESC
+    """, 1),
+    "ownership check": ("""
+        SELECT id FROM artworks
+        WHERE id = (SELECT MIN(id) FROM artworks) AND artist_id = %s
+    """, 1),
+}
+
+def time_query(cursor, query, arity, artist_ids):
+    """Mean milliseconds per execution, including reading every row"""
+    start = time.perf_counter()
+    rows = 0
+    for artist_id in artist_ids:
+        cursor.execute(query, (artist_id,) * arity)
+        rows += len(cursor.fetchall())
+    return (time.perf_counter() - start) * 1000 / len(artist_ids), rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artists', type=int, default=50, help="random artists to query")
+    args = parser.parse_args()
+
+    connection = get_db_connection()
+    if connection is None:
+        print("Failed to connect to database")
+        return
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT id FROM artists ORDER BY RAND() LIMIT %s", (args.artists,))
+        artist_ids = [row[0] for row in cursor.fetchall()]
+        if not artist_ids:
+            print("No artists - run benchmarks/seed_data.py first")
+            return
+
+        cursor.execute("SELECT COUNT(*), SUM(artist_id IS NULL) FROM artworks")
+        total, unowned = cursor.fetchone()
+        print(f"{total} artworks, {unowned or 0} without artist_id, {len(artist_ids)} artists sampled")
+        print()
+        print(f"{'query':<18} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'rows before':>12} {'rows after':>11}")
+
+        for label in BEFORE:
+            before_ms, before_rows = time_query(cursor, *BEFORE[label], artist_ids)
+            after_ms, after_rows = time_query(cursor, *AFTER[label], artist_ids)
+            speedup = before_ms / after_ms if after_ms else float('inf')
+            print(f"{label:<18} {before_ms:>10.2f} {after_ms:>10.2f} {speedup:>7.1f}x {before_rows:>12} {after_rows:>11}")
+    finally:
+        cursor.close()
+        connection.close()
+
+if __name__ == '__main__':
+    main()
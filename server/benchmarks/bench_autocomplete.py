@@ -0,0 +1,112 @@
+"""Measure /autocomplete latency and memory on a synthetic catalog
+
+Usage:
+    python benchmarks/bench_autocomplete.py                          # 100k artworks
+    python benchmarks/bench_autocomplete.py --artworks 20000 --budget-mb 4
+
+No database is needed: artworks, artists and exhibitions are generated in memory and
+bulk-loaded the way autocomplete.build() does. Memory is reported both as the
+structure's own estimate (what AUTOCOMPLETE_MEMORY_MB is checked against) and as
+measured by tracemalloc.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autocomplete import PrefixIndex, normalize
+
+MEDIUMS = ['Oil on canvas', 'Acrylic', 'Watercolour', 'Charcoal', 'Bronze sculpture', 'Digital print',
+           'Mixed media', 'Photography', 'Batik', 'Soapstone carving']
+SYLLABLES = ['ka', 'mo', 'ri', 'sa', 'na', 'to', 'li', 'we', 'zu', 'ba', 'ni', 'ko', 'ma', 'ji', 'ru', 'ya']
+
+def make_sources(artworks, rng):
+    words = [''.join(parts).capitalize() for length in (2, 3) for parts in itertools.product(SYLLABLES, repeat=length)]
+    artists = [f"{rng.choice(words)} {rng.choice(words)}" for _ in range(max(1, artworks // 50))]
+    sources = {}
+    for artwork_id in range(1, artworks + 1):
+        sources[('artwork', artwork_id)] = (
+            ('title', ' '.join(rng.choices(words, k=rng.randint(2, 5)))),
+            ('artist', rng.choice(artists)),
+            ('medium', rng.choice(MEDIUMS)),
+        )
+    for artist_id, name in enumerate(artists, 1):
+        sources[('artist', artist_id)] = (('artist', name),)
+    for exhibition_id in range(1, artworks // 100 + 2):
+        sources[('exhibition', exhibition_id)] = (('exhibition', f"{rng.choice(words)} {rng.choice(words)} Exhibition"),)
+    return sources, words
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def report(label, timings):
+    print(f"{label:<30} p50 {percentile(timings, 0.5) * 1e6:8.1f} us  p95 {percentile(timings, 0.95) * 1e6:8.1f} us"
+          f"  p99 {percentile(timings, 0.99) * 1e6:8.1f} us  max {max(timings) * 1e6:8.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artworks', type=int, default=100000)
+    parser.add_argument('--budget-mb', type=float, default=128, help="memory budget (AUTOCOMPLETE_MEMORY_MB)")
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    sources, words = make_sources(args.artworks, rng)
+
+    # Built twice: once timed, once under tracemalloc (which slows allocation down)
+    index = PrefixIndex(args.budget_mb * 1024 * 1024)
+    start = time.perf_counter()
+    index.bulk_load(sources)
+    build = time.perf_counter() - start
+    tracemalloc.start()
+    traced_index = PrefixIndex(args.budget_mb * 1024 * 1024)
+    traced_index.bulk_load(sources)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_index
+    print(f"built {len(index):,} suggestions from {len(sources):,} sources in {build:.2f}s")
+    print(f"memory: estimate {index.memory_bytes() / 1024 / 1024:.1f} MB, traced {traced / 1024 / 1024:.1f} MB, "
+          f"budget {args.budget_mb:g} MB")
+    if index.degraded or index.skipped:
+        print(f"over budget: {index.degraded} phrases by first word only, {index.skipped} left out")
+
+    # Every keystroke of a word: one to six characters
+    prefixes = []
+    for _ in range(args.queries):
+        word = normalize(rng.choice(words))
+        prefixes.append(word[:rng.randint(1, min(6, len(word)))])
+    for length in (1, 2, 3, 4):
+        selected = [prefix for prefix in prefixes if len(prefix) == length] or [prefixes[0][:length]]
+        timings = []
+        for prefix in selected:
+            index._cache.clear()
+            start = time.perf_counter()
+            index.suggest(prefix)
+            timings.append(time.perf_counter() - start)
+        report(f"{length}-char prefix, uncached", timings)
+
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix)
+        timings.append(time.perf_counter() - start)
+    report("mixed keystrokes", timings)
+
+    # An artwork update on the write path, followed by the keystroke that must see it
+    timings = []
+    for artwork_id in range(1, 501):
+        title = f"{rng.choice(words)} {rng.choice(words)} Edition"
+        start = time.perf_counter()
+        index.set_source(('artwork', artwork_id), (('title', title), ('artist', 'Bench Artist'), ('medium', 'Acrylic')))
+        index.suggest(normalize(title)[:3])
+        timings.append(time.perf_counter() - start)
+    report("update + suggest", timings)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark ticket check-in throughput (scans/sec)
+
+Usage:
+    python benchmarks/bench_checkin.py                       # in-memory index only, no database
+    python benchmarks/bench_checkin.py --exhibition 3        # end to end against MySQL
+
+The database mode REDEEMS every active, paid ticket of the exhibition - run it
+against a test database only.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import checkin
+from database import get_db_connection
+from ticket_codes import generate_ticket_code
+
+def report(label, scans, elapsed):
+    print(f"{label:<45} {scans:>9} scans  {elapsed:8.3f}s  {scans / elapsed:>12,.0f} scans/sec")
+
+def bench_in_memory(tickets, scans):
+    """Time the index-only path: format/check-character validation plus index lookup"""
+    exhibition_id = 'bench'
+    rows = [(i, generate_ticket_code(), 'used' if i % 2 else 'active', 'completed', 1) for i in range(tickets)]
+    checkin._indexes[exhibition_id] = checkin.build_checkin_index(rows)
+    index = checkin._indexes[exhibition_id]
+
+    used_codes = [row[1] for row in rows if row[2] == 'used']
+    active_codes = [row[1] for row in rows if row[2] == 'active']
+    forged_codes = [code[:-1] + ('0' if code[-1] != '0' else '1') for code in active_codes[:1000]]
+
+    for label, pool in (
+        ("rejected from memory: already used", used_codes),
+        ("rejected from memory: bad check character", forged_codes),
+        ("accepted by index (before the UPDATE)", active_codes),
+    ):
+        sample = [random.choice(pool) for _ in range(scans)]
+        start = time.perf_counter()
+        for code in sample:
+            checkin._precheck(index, code)
+        report(label, scans, time.perf_counter() - start)
+
+    checkin.drop_checkin_index(exhibition_id)
+
+def redeemable_codes(exhibition_id):
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+        SELECT ticket_code FROM exhibition_bookings
+        WHERE exhibition_id = %s AND status = 'active' AND payment_status = 'completed'
+        """, (exhibition_id,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        connection.close()
+
+def bench_database(exhibition_id, batch_size):
+    """Time single scans and offline batch sync against a real exhibition"""
+    codes = redeemable_codes(exhibition_id)
+    if len(codes) < 2:
+        print(f"Exhibition {exhibition_id} needs at least two active, paid bookings")
+        return
+
+    start = time.perf_counter()
+    checkin.load_checkin_index(exhibition_id)
+    print(f"Index preload: {time.perf_counter() - start:.3f}s")
+
+    half = len(codes) // 2
+    single, batched = codes[:half], codes[half:]
+
+    start = time.perf_counter()
+    for code in single:
+        checkin.check_in_ticket(exhibition_id, code)
+    report("single scans (conditional UPDATE each)", len(single), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for code in single:
+        checkin.check_in_ticket(exhibition_id, code)
+    report("repeat scans (rejected from memory)", len(single), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(batched), batch_size):
+        checkin.sync_offline_scans(exhibition_id, batched[i:i + batch_size])
+    report(f"offline sync (batches of {batch_size})", len(batched), time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=100000, help="synthetic tickets in the in-memory index")
+    parser.add_argument('--scans', type=int, default=200000, help="scans per in-memory scenario")
+    parser.add_argument('--exhibition', help="exhibition id to benchmark against MySQL")
+    parser.add_argument('--batch-size', type=int, default=200, help="scans per offline sync request")
+    args = parser.parse_args()
+
+    if args.exhibition:
+        bench_database(args.exhibition, args.batch_size)
+    else:
+        bench_in_memory(args.tickets, args.scans)
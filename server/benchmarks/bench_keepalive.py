@@ -0,0 +1,76 @@
+"""Measure connection setup cost for a dashboard's worth of API calls
+
+Usage:
+    python server.py &                                       # the server under test
+    python benchmarks/bench_keepalive.py                     # public catalog endpoints
+    python benchmarks/bench_keepalive.py --token <admin JWT> # plus the admin dashboard endpoints
+    python benchmarks/bench_keepalive.py --url http://staging:8000 --rounds 50
+
+Each round requests every path once, the way a dashboard page load does. The same
+requests are made twice: opening a new TCP connection per request (what every call
+cost with HTTP/1.0) and over one persistent HTTP/1.1 connection.
+"""
+import argparse
+import http.client
+import time
+from urllib.parse import urlparse
+
+PUBLIC_PATHS = ['/artworks', '/exhibitions']
+ADMIN_PATHS = ['/orders', '/tickets', '/messages', '/artists', '/reports?granularity=month']
+
+def run(host, port, paths, headers, rounds, keep_alive):
+    """Return (seconds, connections opened, responses) for rounds x paths requests"""
+    connections = 0
+    responses = 0
+    connection = None
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            if connection is None or not keep_alive:
+                if connection is not None:
+                    connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+                connection.connect()
+                connections += 1
+            request_headers = dict(headers)
+            if not keep_alive:
+                request_headers['Connection'] = 'close'
+            connection.request('GET', path, headers=request_headers)
+            response = connection.getresponse()
+            response.read()
+            responses += 1
+            if response.will_close:
+                connection.close()
+                connection = None
+    if connection is not None:
+        connection.close()
+    return time.perf_counter() - start, connections, responses
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000', help="server base URL")
+    parser.add_argument('--token', help="admin JWT; adds the admin dashboard endpoints")
+    parser.add_argument('--rounds', type=int, default=20, help="page loads to simulate")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    paths = list(PUBLIC_PATHS)
+    headers = {'Accept-Encoding': 'gzip'}
+    if args.token:
+        paths += ADMIN_PATHS
+        headers['Authorization'] = f"Bearer {args.token}"
+
+    # Warm the catalog cache so both runs see the same server-side work
+    run(url.hostname, url.port or 80, paths, headers, 1, True)
+
+    print(f"{args.rounds} page loads x {len(paths)} requests against {args.url}")
+    print(f"{'mode':<26} {'total ms':>9} {'ms/request':>11} {'connections':>12}")
+    results = {}
+    for label, keep_alive in (("new connection per request", False), ("persistent connection", True)):
+        seconds, connections, responses = run(url.hostname, url.port or 80, paths, headers, args.rounds, keep_alive)
+        results[keep_alive] = seconds
+        print(f"{label:<26} {seconds * 1000:>9.1f} {seconds * 1000 / responses:>11.2f} {connections:>12}")
+    print(f"speedup: {results[False] / results[True]:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare per-artwork recommendation scoring with the vectorized model
+
+Usage:
+    python benchmarks/bench_recommendations.py                     # 100k artworks, 20k users
+    python benchmarks/bench_recommendations.py --artworks 20000 --users 5000
+
+No database is needed: a catalog, orders and bookings are generated in memory. The
+per-artwork scorer is the client-side RecommendationEngine's scoring, ported as-is
+(minus the random term), which is what every "recommend" click used to run in the
+browser after downloading the whole catalog and the user's order history.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommendations import RecommendationModel
+
+MEDIUMS = ['Oil on canvas', 'Acrylic', 'Watercolour', 'Charcoal', 'Bronze', 'Digital print', 'Mixed media',
+           'Photography', 'Batik', 'Soapstone']
+
+def make_data(artworks, users, exhibitions, rng):
+    artists = [f"Artist {i}" for i in range(max(1, artworks // 50))]
+    catalog = [
+        (artwork_id, rng.choice(artists), rng.choice(MEDIUMS), round(rng.lognormvariate(9, 1), 2),
+         'sold' if rng.random() < 0.2 else 'available', rng.randint(0, 5), int(rng.paretovariate(1.2)) - 1)
+        for artwork_id in range(1, artworks + 1)
+    ]
+    orders = [(rng.randint(1, users), rng.randint(1, artworks)) for _ in range(users * 5)]
+    bookings = [(rng.randint(1, users), rng.randint(1, exhibitions)) for _ in range(users * 2)]
+    attendance = [(rng.randint(1, exhibitions), rng.choice(artists), rng.randint(1, 20)) for _ in range(exhibitions * 30)]
+    return catalog, orders, bookings, attendance
+
+def client_side(user_id, catalog, orders, count):
+    """RecommendationEngine.generatePersonalizedRecommendations, scoring every artwork in a loop"""
+    by_id = {row[0]: row for row in catalog}
+    history = [by_id[artwork_id] for order_user, artwork_id in orders if order_user == user_id]
+    artist_count = {}
+    medium_count = {}
+    for _, artist, medium, _, _, _, _ in history:
+        artist_count[artist] = artist_count.get(artist, 0) + 1
+        medium_count[medium] = medium_count.get(medium, 0) + 1
+    favourite_artists = sorted(artist_count, key=artist_count.get, reverse=True)
+    preferred_mediums = sorted(medium_count, key=medium_count.get, reverse=True)
+    prices = [row[3] for row in history]
+    ranges = []
+    if prices:
+        average = sum(prices) / len(prices)
+        ranges = [(average * 0.7, average * 1.5), (min(prices), max(prices))]
+
+    scored = []
+    for artwork in catalog:
+        _, artist, medium, price, status, _, _ = artwork
+        if status != 'available':
+            continue
+        score = 0
+        if artist in favourite_artists:
+            score += 50 - favourite_artists.index(artist) * 10
+        if medium in preferred_mediums:
+            score += 20 - preferred_mediums.index(medium) * 5
+        if any(low <= price <= high for low, high in ranges):
+            score += 15
+        if artist not in artist_count:
+            score += 5
+        scored.append((score, artwork))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [artwork for _, artwork in scored[:count]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artworks', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--exhibitions', type=int, default=200)
+    parser.add_argument('--samples', type=int, default=200, help="users to recommend for")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    catalog, orders, bookings, attendance = make_data(args.artworks, args.users, args.exhibitions, rng)
+    print(f"{len(catalog):,} artworks, {len(orders):,} orders, {len(bookings):,} bookings")
+
+    start = time.perf_counter()
+    model = RecommendationModel(catalog, orders, bookings, attendance)
+    print(f"batch build: {time.perf_counter() - start:.2f}s for {len(model.users):,} user profiles")
+
+    sample = [rng.randint(1, args.users) for _ in range(args.samples)]
+    start = time.perf_counter()
+    for user_id in sample:
+        model.rank(user_id)
+    vectorized = (time.perf_counter() - start) / len(sample)
+
+    client_sample = sample[:max(1, args.samples // 20)]
+    start = time.perf_counter()
+    for user_id in client_sample:
+        client_side(user_id, catalog, orders, 6)
+    looped = (time.perf_counter() - start) / len(client_sample)
+
+    print(f"{'per-artwork loop':<22} {looped * 1000:9.2f} ms/user")
+    print(f"{'vectorized model':<22} {vectorized * 1000:9.2f} ms/user  ({looped / vectorized:.0f}x)")
+
+if __name__ == '__main__':
+    main()
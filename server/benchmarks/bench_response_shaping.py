@@ -0,0 +1,102 @@
+"""Micro-benchmark: per-row pop()/rename chain vs compiled ResponseShape for exhibitions
+
+Usage:
+    python benchmarks/bench_response_shaping.py                 # 1k, 10k and 100k rows
+    python benchmarks/bench_response_shaping.py --sizes 500 5000 --repeat 20
+
+No database is needed; exhibition rows are generated in memory. The old shaping code
+is kept here verbatim (minus the base64 image handling, which both paths share).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import ResponseShape, iso_date, to_float
+
+COLUMNS = ('id', 'title', 'description', 'location', 'start_date', 'end_date',
+           'ticket_price', 'image_url', 'total_slots', 'available_slots', 'status')
+
+# Same mapping as exhibition.EXHIBITION_FIELDS (exhibition.py imports auth, which needs PyJWT)
+EXHIBITION_FIELDS = ResponseShape([
+    ('id', 'id', str),
+    ('title', 'title', None),
+    ('description', 'description', None),
+    ('location', 'location', None),
+    ('startDate', 'start_date', iso_date),
+    ('endDate', 'end_date', iso_date),
+    ('ticketPrice', 'ticket_price', to_float),
+    ('imageUrl', 'image_url', None),
+    ('totalSlots', 'total_slots', None),
+    ('availableSlots', 'available_slots', None),
+    ('status', 'status', None),
+])
+
+class BenchCursor:
+    column_names = COLUMNS
+
+def make_rows(count):
+    start = date(2024, 1, 1)
+    return [
+        (i, f"Exhibition {i}", "A survey of contemporary work", "Nairobi", start + timedelta(days=i % 365),
+         start + timedelta(days=i % 365 + 30), Decimal("1500.00"), f"/static/uploads/exhibition_{i}.jpg",
+         200, 200 - i % 200, 'upcoming')
+        for i in range(count)
+    ]
+
+def old_dict_from_row(row, cursor):
+    result = {cursor.column_names[i]: value for i, value in enumerate(row)}
+    for key, value in result.items():
+        if isinstance(value, Decimal):
+            result[key] = float(value)
+    return result
+
+def pop_chain(cursor, rows):
+    exhibitions = []
+    for row in rows:
+        exhibition = old_dict_from_row(row, cursor)
+        exhibition['id'] = str(exhibition['id'])
+        exhibition['startDate'] = exhibition.pop('start_date').isoformat()
+        exhibition['endDate'] = exhibition.pop('end_date').isoformat()
+        exhibition['ticketPrice'] = exhibition.pop('ticket_price')
+        image_url = exhibition.pop('image_url')
+        exhibition['imageUrl'] = image_url if image_url else "/static/uploads/default_exhibition.jpg"
+        exhibition['totalSlots'] = exhibition.pop('total_slots')
+        exhibition['availableSlots'] = exhibition.pop('available_slots')
+        exhibitions.append(exhibition)
+    return exhibitions
+
+def compiled_shape(cursor, rows):
+    return EXHIBITION_FIELDS.all(cursor, rows)
+
+def best_of(case, cursor, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case(cursor, rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="rows per run")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per case; the fastest is reported")
+    args = parser.parse_args()
+
+    cursor = BenchCursor()
+    print(f"{'rows':>8} {'pop chain ms':>13} {'compiled ms':>12} {'speedup':>8}")
+    for size in args.sizes:
+        rows = make_rows(size)
+        if pop_chain(cursor, rows) != compiled_shape(cursor, rows):
+            print(f"{size:>8} outputs differ")
+            continue
+        old = best_of(pop_chain, cursor, rows, args.repeat)
+        new = best_of(compiled_shape, cursor, rows, args.repeat)
+        print(f"{size:>8} {old * 1000:>13.2f} {new * 1000:>12.2f} {old / new:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Measure /search latency on a synthetic catalog
+
+Usage:
+    python benchmarks/bench_search.py                        # 100k artworks
+    python benchmarks/bench_search.py --artworks 20000 --queries 500
+
+No database is needed: artworks are generated in memory and added to a SearchIndex the
+same way the loader does. Descriptions draw words from a vocabulary with a Zipf-like
+distribution (a few words in most documents, a long tail in very few), and queries are
+drawn the same way, so common words are searched most. A handful of queries are also
+answered by a substring scan over every document, which is what filtering the full
+listing client-side (or a LIKE '%term%' query) costs.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex, ARTWORK_FIELD_WEIGHTS
+
+MEDIUMS = ['oil on canvas', 'acrylic', 'watercolour', 'charcoal', 'bronze sculpture', 'digital print',
+           'mixed media', 'photography', 'batik', 'soapstone carving']
+SYLLABLES = ['ka', 'mo', 'ri', 'sa', 'na', 'to', 'li', 'we', 'zu', 'ba', 'ni', 'ko', 'ma', 'ji', 'ru', 'ya']
+
+def make_vocabulary(size):
+    words = (''.join(parts) for length in (2, 3, 4) for parts in itertools.product(SYLLABLES, repeat=length))
+    return list(itertools.islice(words, size))
+
+def make_documents(count, vocabulary, rng):
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    artists = [f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}" for _ in range(max(1, count // 50))]
+    docs = []
+    for doc_id in range(1, count + 1):
+        docs.append((doc_id, {
+            'title': ' '.join(rng.choices(vocabulary, weights, k=rng.randint(2, 4))),
+            'artist': rng.choice(artists),
+            'medium': rng.choice(MEDIUMS),
+            'description': ' '.join(rng.choices(vocabulary, weights, k=rng.randint(10, 40))),
+        }))
+    return docs, weights
+
+def make_queries(count, vocabulary, weights, rng):
+    queries = []
+    for _ in range(count):
+        words = rng.choices(vocabulary, weights, k=2)
+        shape = rng.random()
+        if shape < 0.3:
+            queries.append(words[0])
+        elif shape < 0.6:
+            queries.append(' '.join(words))
+        else:
+            # Type-ahead: a finished word and the first letters of the next one
+            queries.append(f"{words[0]} {words[1][:rng.randint(1, 4)]}")
+    return queries
+
+def substring_scan(docs, query):
+    terms = query.lower().split()
+    matches = 0
+    for _, fields in docs:
+        text = ' '.join(value for value in fields.values() if value).lower()
+        if all(term in text for term in terms):
+            matches += 1
+    return matches
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def report(label, timings):
+    print(f"{label:<28} p50 {percentile(timings, 0.5):7.2f} ms  p95 {percentile(timings, 0.95):7.2f} ms"
+          f"  p99 {percentile(timings, 0.99):7.2f} ms  max {max(timings):7.2f} ms")
+
+def time_queries(index, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit=20)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artworks', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=30000, help="distinct description words")
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--scan-queries', type=int, default=20, help="queries also answered by a full scan")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(args.vocabulary)
+    docs, weights = make_documents(args.artworks, vocabulary, rng)
+    queries = make_queries(args.queries, vocabulary, weights, rng)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for doc_id, fields in docs:
+        index.add(doc_id, fields, ARTWORK_FIELD_WEIGHTS, {'title': fields['title']})
+    index.search(vocabulary[-1])
+    print(f"indexed {len(index):,} artworks in {time.perf_counter() - start:.2f}s")
+
+    report("first pass (scores computed)", time_queries(index, queries))
+    report("second pass (scores cached)", time_queries(index, queries))
+    report("most common word", time_queries(index, [f"{vocabulary[0]} {vocabulary[1]}"] * 50))
+
+    scan_timings = []
+    for query in queries[:args.scan_queries]:
+        start = time.perf_counter()
+        substring_scan(docs, query)
+        scan_timings.append((time.perf_counter() - start) * 1000)
+    report("substring scan", scan_timings)
+
+    # What an artwork update adds to the write path, and the first search after it
+    doc_id, fields = docs[0]
+    timings = []
+    for i in range(200):
+        start = time.perf_counter()
+        index.add(doc_id, dict(fields, title=f"{fields['title']} {vocabulary[i]}"), ARTWORK_FIELD_WEIGHTS, {})
+        index.search(queries[i])
+        timings.append((time.perf_counter() - start) * 1000)
+    report("update + search", timings)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Compare the old row-to-dict and JSON paths with serialization.py
+
+Usage:
+    python benchmarks/bench_serialization.py                       # 10k, 100k and 1M rows
+    python benchmarks/bench_serialization.py --sizes 10000 50000
+
+No database is needed: rows shaped like the /orders listing (ints, text, a DECIMAL
+amount and a DATETIME) are generated in memory and served by a stand-in cursor. The
+old helpers are kept here verbatim so the comparison can be rerun after changes.
+Install orjson to see the faster backend; the stdlib encoder is always measured too.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from serialization import rows_to_dicts
+
+# ---- previous implementations -------------------------------------------------------------
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super(DecimalEncoder, self).default(obj)
+
+def old_json_dumps(data):
+    return json.dumps(data, cls=DecimalEncoder)
+
+def old_dict_from_row(row, cursor):
+    result = {cursor.column_names[i]: value for i, value in enumerate(row)}
+    for key, value in result.items():
+        if isinstance(value, Decimal):
+            result[key] = float(value)
+    return result
+
+# ---- data -------------------------------------------------------------------------------
+
+class BenchCursor:
+    """Just enough of a MySQL cursor for the helpers under test"""
+
+    # (name, type_code): LONG=3, VAR_STRING=253, NEWDECIMAL=246, DATETIME=12
+    description = [
+        (name, type_code, None, None, None, None, True)
+        for name, type_code in [
+            ('id', 3), ('user_id', 3), ('artwork_id', 3), ('user_name', 253), ('item_title', 253),
+            ('total_amount', 246), ('payment_status', 253), ('order_date', 12),
+        ]
+    ]
+    column_names = tuple(column[0] for column in description)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+def make_rows(count):
+    start = datetime(2024, 1, 1)
+    statuses = ('pending', 'completed', 'failed')
+    return [
+        (i, i % 5000, i % 20000, f"Buyer {i % 5000}", f"Artwork {i % 20000}",
+         Decimal(f"{1000 + i % 9000}.50"), statuses[i % 3], start + timedelta(minutes=i))
+        for i in range(count)
+    ]
+
+# ---- cases ------------------------------------------------------------------------------
+
+def old_dict_from_row_case(cursor):
+    items = [old_dict_from_row(row, cursor) for row in cursor.fetchall()]
+    return old_json_dumps({"orders": items})
+
+def old_zip_round_trip_case(cursor):
+    # db_operations-style zip per row, then contact.py's json.loads(json_dumps(...)) before the response
+    items = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
+    result = json.loads(old_json_dumps({"orders": items}))
+    return old_json_dumps(result)
+
+def stdlib_materializer_case(cursor):
+    items = rows_to_dicts(cursor)
+    return json.dumps({"orders": items}, default=serialization._default, separators=(',', ':'), ensure_ascii=False)
+
+def materializer_case(cursor):
+    return serialization.json_dumps({"orders": rows_to_dicts(cursor)})
+
+CASES = [
+    ("dict_from_row + DecimalEncoder", old_dict_from_row_case),
+    ("zip per row + JSON round trip", old_zip_round_trip_case),
+    ("RowMaterializer + stdlib json", stdlib_materializer_case),
+]
+if serialization.JSON_BACKEND != 'json':
+    CASES.append((f"RowMaterializer + {serialization.JSON_BACKEND}", materializer_case))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help="row counts to serialize")
+    args = parser.parse_args()
+
+    print(f"JSON backend: {serialization.JSON_BACKEND}")
+    for size in args.sizes:
+        cursor = BenchCursor(make_rows(size))
+        # Every case must produce the same document
+        expected = json.loads(old_dict_from_row_case(cursor))
+        print()
+        print(f"{size} rows")
+        baseline = None
+        for label, case in CASES:
+            start = time.perf_counter()
+            output = case(cursor)
+            elapsed = time.perf_counter() - start
+            if json.loads(output) != expected:
+                print(f"  {label}: output differs from the original encoder")
+                continue
+            baseline = baseline or elapsed
+            print(f"  {label:<34} {elapsed * 1000:>9.1f} ms  {size / elapsed:>12,.0f} rows/s  {baseline / elapsed:>5.1f}x")
+        del cursor
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Time the artwork_neighbors build and compare a detail page's lookup with a catalog scan
+
+Usage:
+    python benchmarks/bench_similar_artworks.py                    # 100k artworks
+    python benchmarks/bench_similar_artworks.py --artworks 20000
+
+No database is needed: a catalog and orders are generated in memory. The scan is the
+frontend's generateSimilarArtworkRecommendations filter, which every detail page view ran
+over the whole catalog; the lookup reads a stored neighbour list the way the
+primary-key range read on artwork_neighbors does.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similar_artworks import ArtworkFeatures
+
+MEDIUMS = ['Oil on canvas', 'Acrylic', 'Watercolour', 'Charcoal', 'Bronze', 'Digital print', 'Mixed media',
+           'Photography', 'Batik', 'Soapstone']
+WORDS = ['sunset', 'market', 'savannah', 'portrait', 'river', 'city', 'dance', 'mother', 'harvest', 'rain',
+         'lion', 'coast', 'village', 'light', 'abstract', 'blue', 'gold', 'forest', 'drum', 'festival']
+
+def make_data(artworks, users, rng):
+    artists = [f"Artist {i}" for i in range(max(1, artworks // 50))]
+    catalog = [
+        (artwork_id, rng.choice(artists), rng.choice(MEDIUMS), round(rng.lognormvariate(9, 1), 2),
+         rng.randint(1960, 2025), ' '.join(rng.choices(WORDS, k=rng.randint(5, 30))),
+         'sold' if rng.random() < 0.2 else 'available')
+        for artwork_id in range(1, artworks + 1)
+    ]
+    orders = [(rng.randint(1, users), rng.randint(1, artworks)) for _ in range(users * 3)]
+    return catalog, orders
+
+def scan(current, catalog, count):
+    """generateSimilarArtworkRecommendations: filter the catalog, shuffle, take the first few"""
+    _, artist, medium, price, _, _, _ = current
+    matches = [
+        artwork for artwork in catalog
+        if artwork[0] != current[0] and artwork[6] == 'available'
+        and (artwork[1] == artist or artwork[2] == medium or abs(artwork[3] - price) < price * 0.5)
+    ]
+    random.shuffle(matches)
+    return matches[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artworks', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--views', type=int, default=200, help="detail pages to look up")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    catalog, orders = make_data(args.artworks, args.users, rng)
+    print(f"{len(catalog):,} artworks, {len(orders):,} orders")
+
+    start = time.perf_counter()
+    features = ArtworkFeatures(catalog, orders)
+    encoded = time.perf_counter() - start
+    table = {artwork_id: (neighbor_ids.tolist(), scores.tolist()) for artwork_id, neighbor_ids, scores in features.neighbors()}
+    built = time.perf_counter() - start
+    rows = sum(len(neighbor_ids) for neighbor_ids, _ in table.values())
+    print(f"build: features {encoded:.2f}s, {rows:,} neighbour rows in {built:.2f}s "
+          f"({features.features.nbytes / 1024 / 1024:.1f} MB of feature rows)")
+
+    new = (args.artworks + 1, 'Artist 1', 'Acrylic', 12000.0, 2024, 'gold festival drum', 'available')
+    start = time.perf_counter()
+    features.add(new)
+    features.similarity(features.row_of[new[0]])
+    print(f"new artwork scored against the catalog in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    views = [rng.randint(1, args.artworks) for _ in range(args.views)]
+    start = time.perf_counter()
+    for artwork_id in views:
+        table[artwork_id][0][:4]
+    lookup = (time.perf_counter() - start) / len(views)
+    scan_views = views[:max(1, args.views // 20)]
+    start = time.perf_counter()
+    for artwork_id in scan_views:
+        scan(catalog[artwork_id - 1], catalog, 4)
+    scanned = (time.perf_counter() - start) / len(scan_views)
+
+    print(f"{'catalog scan':<18} {scanned * 1000:10.3f} ms/view")
+    print(f"{'neighbour lookup':<18} {lookup * 1000:10.3f} ms/view")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare view counting with one shared lock and with the sharded counter
+
+Usage:
+    python benchmarks/bench_view_counters.py                 # 8 threads, 200k views each
+    python benchmarks/bench_view_counters.py --threads 32 --views 50000
+
+No database is needed: threads record views of random artworks the way concurrent detail
+page requests do, then the counts are drained as a flush would. The row-per-view
+figure is the number of UPDATEs the same traffic would have sent to MySQL.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from view_counters import ShardedCounter
+
+class LockedCounter:
+    """Every view takes the same lock"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + amount
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        return counts
+
+def run(counter, threads, views, artworks):
+    rngs = [random.Random(seed) for seed in range(threads)]
+    keys = [[('artwork', int(rng.paretovariate(1.1)) % artworks) for _ in range(views)] for rng in rngs]
+    workers = [threading.Thread(target=lambda ks=ks: [counter.add(key) for key in ks]) for ks in keys]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    recorded = time.perf_counter() - start
+    start = time.perf_counter()
+    rows = counter.drain()
+    drained = time.perf_counter() - start
+    assert sum(rows.values()) == threads * views
+    return recorded, drained, len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--views', type=int, default=200000, help="views recorded per thread")
+    parser.add_argument('--artworks', type=int, default=100000)
+    args = parser.parse_args()
+
+    total = args.threads * args.views
+    print(f"{total:,} views from {args.threads} threads")
+    for label, counter in (('one lock', LockedCounter()), ('sharded', ShardedCounter())):
+        recorded, drained, rows = run(counter, args.threads, args.views, args.artworks)
+        print(f"{label:<10} {total / recorded / 1e6:6.2f} M views/s  drain {drained * 1000:7.1f} ms  "
+              f"{rows:,} upsert rows instead of {total:,} row updates")
+
+if __name__ == '__main__':
+    main()
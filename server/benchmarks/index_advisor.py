@@ -0,0 +1,104 @@
+"""Profile the hot read paths against a seeded database and suggest missing indexes
+
+Usage:
+    python benchmarks/seed_data.py              # once, to get a realistically sized dataset
+    python benchmarks/index_advisor.py          # timings, EXPLAIN-based advice
+    python benchmarks/index_advisor.py --emit   # also print a MIGRATIONS entry for the advice
+
+Every statement goes through the profiled connections returned by get_db_connection,
+so the report covers exactly what the application sends to MySQL.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Must be set before database is imported - profiling is decided when the module loads
+os.environ['DB_PROFILE'] = '1'
+os.environ.setdefault('DB_SLOW_QUERY_MS', '1000000')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import query_profiler
+from database import get_db_connection, get_all_contact_messages
+from artwork import get_all_artworks
+from exhibition import get_all_exhibitions
+from mpesa import check_transaction_status
+from db_operations import get_all_artists, get_artist_artworks, get_artist_orders, get_all_tickets, get_user_orders
+from migrations import LATEST_VERSION
+
+def sample_ids(query, limit):
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, (limit,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        connection.close()
+
+def run_workload(repeat):
+    """Call each hot read path the way the HTTP handlers do"""
+    artist_ids = sample_ids("SELECT id FROM artists ORDER BY RAND() LIMIT %s", repeat)
+    user_ids = sample_ids("SELECT id FROM users ORDER BY RAND() LIMIT %s", repeat)
+    checkout_ids = sample_ids("SELECT checkout_request_id FROM mpesa_transactions ORDER BY RAND() LIMIT %s", repeat)
+    query_profiler.reset_query_stats()
+
+    paths = [
+        ("get_all_artworks", lambda i: get_all_artworks()),
+        ("get_all_exhibitions", lambda i: get_all_exhibitions()),
+        ("get_all_contact_messages", lambda i: get_all_contact_messages()),
+        ("get_all_artists", lambda i: get_all_artists()),
+        ("get_all_tickets", lambda i: get_all_tickets()),
+        ("get_artist_artworks", lambda i: get_artist_artworks(artist_ids[i % len(artist_ids)])),
+        ("get_artist_orders", lambda i: get_artist_orders(artist_ids[i % len(artist_ids)])),
+        ("get_user_orders", lambda i: get_user_orders(user_ids[i % len(user_ids)])),
+        ("check_transaction_status", lambda i: check_transaction_status(checkout_ids[i % len(checkout_ids)])),
+    ]
+
+    print(f"{'path':<28} {'calls':>6} {'mean ms':>10}")
+    for label, call in paths:
+        start = time.perf_counter()
+        for i in range(repeat):
+            call(i)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28} {repeat:>6} {elapsed * 1000 / repeat:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="calls per read path")
+    parser.add_argument('--top', type=int, default=15, help="slowest statements to report and EXPLAIN")
+    parser.add_argument('--emit', action='store_true', help="print a MIGRATIONS entry for the recommended indexes")
+    args = parser.parse_args()
+
+    run_workload(args.repeat)
+
+    print()
+    query_profiler.print_report(args.top)
+
+    connection = get_db_connection()
+    if connection is None:
+        print("Failed to connect to database")
+        return
+    try:
+        recommendations = query_profiler.recommend_indexes(connection, args.top)
+    finally:
+        connection.close()
+
+    print()
+    if not recommendations:
+        print("No missing indexes found for the captured statements")
+        return
+
+    print("Recommended indexes:")
+    for rec in recommendations:
+        print(f"  {rec['table']}({', '.join(rec['columns'])})  -- {rec['reason']}")
+        print(f"      {rec['sql'][:120]}")
+
+    if args.emit:
+        print()
+        print("Append to MIGRATIONS in migrations.py:")
+        print(query_profiler.format_migration(recommendations, LATEST_VERSION + 1))
+
+if __name__ == '__main__':
+    main()
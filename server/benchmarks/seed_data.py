@@ -0,0 +1,182 @@
+"""Fill a test database with a large synthetic dataset for benchmarks and the index advisor
+
+Usage:
+    python benchmarks/seed_data.py                    # default sizes
+    python benchmarks/seed_data.py --scale 10         # ten times the default sizes
+
+Rows are appended, never deleted - run it against a test database only.
+A fraction of artworks is inserted without artist_id, matched by artist name only,
+the way artworks created before artist accounts existed look.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+from ticket_codes import allocate_ticket_codes
+from artist_stats import backfill_artist_stats
+from sales_rollup import rebuild_rollup
+
+DEFAULT_SIZES = {
+    'users': 5000,
+    'artists': 500,
+    'artworks': 20000,
+    'exhibitions': 200,
+    'bookings': 50000,
+    'orders': 20000,
+    'messages': 10000,
+    'transactions': 30000,
+}
+
+# Placeholder hash - seeded accounts are not meant to be logged into
+PASSWORD_HASH = 'seeded$not-a-real-password-hash'
+
+MEDIUMS = ['Oil on canvas', 'Acrylic', 'Watercolour', 'Bronze', 'Charcoal', 'Mixed media', 'Photography']
+WORDS = ['Sunset', 'Savannah', 'Market', 'Rhythm', 'Echoes', 'River', 'Harvest', 'Dreams', 'Coast', 'Highlands']
+
+def random_date(days_back):
+    return datetime.now() - timedelta(days=random.uniform(0, days_back))
+
+def insert_in_batches(connection, cursor, label, query, rows, batch_size):
+    """Insert rows with executemany, committing every batch"""
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        cursor.executemany(query, rows[i:i + batch_size])
+        connection.commit()
+    print(f"  {label:<14} {len(rows):>9} rows  {time.perf_counter() - start:7.2f}s")
+
+def id_range(cursor, table, count):
+    """Ids of the newest rows in a table"""
+    cursor.execute(f"SELECT id FROM {table} ORDER BY id DESC LIMIT %s", (count,))
+    return [row[0] for row in cursor.fetchall()]
+
+def seed(sizes, batch_size, legacy_fraction):
+    connection = get_db_connection()
+    if connection is None:
+        print("Failed to connect to database")
+        return
+
+    cursor = connection.cursor()
+    tag = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    try:
+        print("Seeding:")
+        insert_in_batches(connection, cursor, 'users', """
+        INSERT INTO users (name, email, password, phone, created_at) VALUES (%s, %s, %s, %s, %s)
+        """, [
+            (f"User {i}", f"seed-{tag}-user{i}@example.com", PASSWORD_HASH, f"2547{i % 100000000:08d}", random_date(720))
+            for i in range(sizes['users'])
+        ], batch_size)
+        user_ids = id_range(cursor, 'users', sizes['users'])
+
+        artist_names = [f"Seed Artist {tag}-{i}" for i in range(sizes['artists'])]
+        insert_in_batches(connection, cursor, 'artists', """
+        INSERT INTO artists (name, email, password, bio, created_at) VALUES (%s, %s, %s, %s, %s)
+        """, [
+            (name, f"seed-{tag}-artist{i}@example.com", PASSWORD_HASH, "Seeded artist", random_date(720))
+            for i, name in enumerate(artist_names)
+        ], batch_size)
+        cursor.execute("SELECT id, name FROM artists WHERE email LIKE %s", (f"seed-{tag}-artist%",))
+        artist_id_by_name = {name: artist_id for artist_id, name in cursor.fetchall()}
+        artist_ids = [artist_id_by_name[name] for name in artist_names]
+
+        artwork_rows = []
+        for i in range(sizes['artworks']):
+            a = random.randrange(len(artist_ids))
+            artist_id = None if random.random() < legacy_fraction else artist_ids[a]
+            artwork_rows.append((
+                f"{random.choice(WORDS)} {random.choice(WORDS)} {i}", artist_names[a], artist_id,
+                "Seeded artwork", round(random.uniform(50, 5000), 2), random.choice(MEDIUMS),
+                random.randint(1990, 2024), 'sold' if random.random() < 0.2 else 'available', random_date(720)
+            ))
+        insert_in_batches(connection, cursor, 'artworks', """
+        INSERT INTO artworks (title, artist, artist_id, description, price, medium, year, status, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, artwork_rows, batch_size)
+        artwork_ids = id_range(cursor, 'artworks', sizes['artworks'])
+
+        exhibition_rows = []
+        for i in range(sizes['exhibitions']):
+            start = random_date(540).date()
+            exhibition_rows.append((
+                f"Seed Exhibition {i}", "Seeded exhibition", "Nairobi", start, start + timedelta(days=30),
+                round(random.uniform(200, 2000), 2), 500, 500, 'past' if start < datetime.now().date() else 'upcoming'
+            ))
+        insert_in_batches(connection, cursor, 'exhibitions', """
+        INSERT INTO exhibitions (title, description, location, start_date, end_date, ticket_price,
+                                 total_slots, available_slots, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, exhibition_rows, batch_size)
+        exhibition_ids = id_range(cursor, 'exhibitions', sizes['exhibitions'])
+
+        codes = []
+        while len(codes) < sizes['bookings']:
+            codes.extend(allocate_ticket_codes(min(1000, sizes['bookings'] - len(codes)), cursor))
+        insert_in_batches(connection, cursor, 'bookings', """
+        INSERT INTO exhibition_bookings (user_id, exhibition_id, name, email, phone, ticket_code, slots,
+                                         payment_status, status, booking_date, total_amount)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (random.choice(user_ids), random.choice(exhibition_ids), "Seed Visitor", "visitor@example.com",
+             "254700000000", code, random.randint(1, 4), random.choice(['completed', 'completed', 'pending', 'failed']),
+             random.choice(['active', 'active', 'used', 'cancelled']), random_date(540), round(random.uniform(200, 8000), 2))
+            for code in codes
+        ], batch_size)
+
+        insert_in_batches(connection, cursor, 'orders', """
+        INSERT INTO artwork_orders (user_id, artwork_id, name, email, phone, delivery_address,
+                                    payment_status, order_date, total_amount)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (random.choice(user_ids), random.choice(artwork_ids), "Seed Buyer", "buyer@example.com", "254700000000",
+             "Nairobi", random.choice(['completed', 'pending', 'failed']), random_date(540), round(random.uniform(50, 5000), 2))
+            for _ in range(sizes['orders'])
+        ], batch_size)
+
+        insert_in_batches(connection, cursor, 'messages', """
+        INSERT INTO contact_messages (name, email, phone, message, date, status, source)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [
+            ("Seed Sender", "sender@example.com", "254700000000", "Seeded message", random_date(720),
+             random.choice(['new', 'read', 'replied']), random.choice(['contact_form', 'whatsapp']))
+            for _ in range(sizes['messages'])
+        ], batch_size)
+
+        insert_in_batches(connection, cursor, 'transactions', """
+        INSERT INTO mpesa_transactions (checkout_request_id, merchant_request_id, order_type, order_id, user_id,
+                                        amount, phone_number, status, transaction_date)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (f"ws_CO_seed_{tag}_{i}", f"seed-{tag}-{i}", random.choice(['artwork', 'exhibition']),
+             random.randint(1, 1000), random.choice(user_ids), round(random.uniform(50, 5000), 2),
+             "254700000000", random.choice(['completed', 'pending', 'failed']), random_date(540))
+            for i in range(sizes['transactions'])
+        ], batch_size)
+
+        # Rows were inserted directly, so bring the denormalized counters and rollup in line
+        backfill_artist_stats()
+        rebuild_rollup()
+        print("Done")
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply every default table size")
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per INSERT batch")
+    parser.add_argument('--legacy-fraction', type=float, default=0.3,
+                        help="fraction of artworks inserted without artist_id")
+    args = parser.parse_args()
+
+    sizes = {table: max(1, int(size * args.scale)) for table, size in DEFAULT_SIZES.items()}
+    seed(sizes, args.batch_size, args.legacy_fraction)
+
+if __name__ == '__main__':
+    main()
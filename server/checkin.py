@@ -0,0 +1,296 @@
+import threading
+from database import get_db_connection
+from ticket_codes import normalize_ticket_code, is_valid_ticket_code
+
+# Largest number of bookings touched by one statement during a batch sync
+SYNC_CHUNK_SIZE = 500
+
+# Per-exhibition index of ticket code -> booking entry, loaded once and kept up to date by scans.
+# An entry is a list [booking_id, status, payment_status, slots] so it can be updated in place.
+_indexes = {}
+_index_lock = threading.Lock()
+
+BOOKING_ID, STATUS, PAYMENT_STATUS, SLOTS = range(4)
+
+def build_checkin_index(rows):
+    """Build a code -> entry index from (id, ticket_code, status, payment_status, slots) rows"""
+    index = {}
+    for booking_id, ticket_code, status, payment_status, slots in rows:
+        if ticket_code:
+            index[normalize_ticket_code(ticket_code)] = [booking_id, status, payment_status, slots]
+    return index
+
+def load_checkin_index(exhibition_id):
+    """(Re)load the check-in index for an exhibition from the database"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute("""
+        SELECT id, ticket_code, status, payment_status, slots
+        FROM exhibition_bookings
+        WHERE exhibition_id = %s
+        """, (exhibition_id,))
+        index = build_checkin_index(cursor.fetchall())
+
+        with _index_lock:
+            _indexes[str(exhibition_id)] = index
+
+        print(f"Loaded check-in index for exhibition {exhibition_id}: {len(index)} tickets")
+        return {"success": True, "tickets": len(index)}
+    except Exception as e:
+        print(f"Error loading check-in index: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def drop_checkin_index(exhibition_id):
+    """Forget the check-in index for an exhibition (e.g. once it has ended)"""
+    with _index_lock:
+        _indexes.pop(str(exhibition_id), None)
+
+def _get_index(exhibition_id):
+    """Return the index for an exhibition, loading it on first use"""
+    index = _indexes.get(str(exhibition_id))
+    if index is None:
+        result = load_checkin_index(exhibition_id)
+        if "error" in result:
+            return None
+        index = _indexes.get(str(exhibition_id))
+    return index
+
+def _fetch_booking(cursor, ticket_code):
+    """Look up a single booking by its (uniquely indexed) ticket code"""
+    cursor.execute("""
+    SELECT id, exhibition_id, status, payment_status, slots
+    FROM exhibition_bookings
+    WHERE ticket_code = %s
+    """, (ticket_code,))
+    return cursor.fetchone()
+
+def _result(ticket_code, admitted, reason, entry=None):
+    result = {"ticketCode": ticket_code, "admitted": admitted, "reason": reason}
+    if entry is not None:
+        result["bookingId"] = entry[BOOKING_ID]
+        result["slots"] = entry[SLOTS]
+    return result
+
+def _precheck(index, ticket_code):
+    """Validate a code against the in-memory index without touching the database
+
+    Returns (entry, rejection). A rejection is final; otherwise entry may be None
+    when the code is well formed but not in the index yet.
+    """
+    if not is_valid_ticket_code(ticket_code):
+        return None, _result(ticket_code, False, "invalid_code")
+
+    entry = index.get(ticket_code)
+    if entry is None:
+        return None, None
+    if entry[STATUS] == 'used':
+        return entry, _result(ticket_code, False, "already_used", entry)
+    if entry[STATUS] == 'cancelled':
+        return entry, _result(ticket_code, False, "cancelled", entry)
+    return entry, None
+
+def _rejection_reason(status, payment_status):
+    if status == 'used':
+        return "already_used"
+    if status == 'cancelled':
+        return "cancelled"
+    if payment_status != 'completed':
+        return "unpaid"
+    return None
+
+def check_in_ticket(exhibition_id, ticket_code):
+    """Redeem a single ticket at the door
+
+    Invalid codes and tickets the index already knows are used are rejected from
+    memory. Everything else is redeemed with one conditional UPDATE so two scanners
+    can never admit the same ticket twice.
+    """
+    ticket_code = normalize_ticket_code(ticket_code)
+    index = _get_index(exhibition_id)
+    if index is None:
+        return {"error": "Database connection failed"}
+
+    entry, rejection = _precheck(index, ticket_code)
+    if rejection:
+        return rejection
+
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        if entry is None:
+            # Booked after the index was loaded - one lookup on the unique ticket_code index
+            row = _fetch_booking(cursor, ticket_code)
+            if not row:
+                return _result(ticket_code, False, "not_found")
+            booking_id, row_exhibition_id, status, payment_status, slots = row
+            if str(row_exhibition_id) != str(exhibition_id):
+                return _result(ticket_code, False, "wrong_exhibition")
+            entry = [booking_id, status, payment_status, slots]
+            index[ticket_code] = entry
+
+        cursor.execute("""
+        UPDATE exhibition_bookings
+        SET status = 'used'
+        WHERE id = %s AND status = 'active' AND payment_status = 'completed'
+        """, (entry[BOOKING_ID],))
+        connection.commit()
+
+        if cursor.rowcount == 1:
+            entry[STATUS] = 'used'
+            entry[PAYMENT_STATUS] = 'completed'
+            return _result(ticket_code, True, "admitted", entry)
+
+        # Lost the race or the index was stale - refresh the entry from the database
+        row = _fetch_booking(cursor, ticket_code)
+        if not row:
+            index.pop(ticket_code, None)
+            return _result(ticket_code, False, "not_found")
+        entry[STATUS], entry[PAYMENT_STATUS] = row[2], row[3]
+        return _result(ticket_code, False, _rejection_reason(row[2], row[3]) or "not_admitted", entry)
+    except Exception as e:
+        print(f"Error checking in ticket {ticket_code}: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def sync_offline_scans(exhibition_id, scans):
+    """Apply a batch of scans buffered by an offline scanner
+
+    scans is a list of ticket codes or {"ticketCode": ...} objects in scan order.
+    Bookings are locked and redeemed in chunks inside one transaction; the first scan
+    of a code wins and later repeats are reported as duplicates.
+    """
+    index = _get_index(exhibition_id)
+    if index is None:
+        return {"error": "Database connection failed"}
+
+    results = [None] * len(scans)
+    pending = {}  # booking_id -> (position in results, ticket_code, entry)
+    unknown = {}  # ticket_code -> position in results
+    seen = set()
+
+    for position, scan in enumerate(scans):
+        raw_code = scan.get("ticketCode") if isinstance(scan, dict) else scan
+        ticket_code = normalize_ticket_code(raw_code)
+
+        if ticket_code in seen:
+            results[position] = _result(ticket_code, False, "duplicate_scan")
+            continue
+        seen.add(ticket_code)
+
+        entry, rejection = _precheck(index, ticket_code)
+        if rejection:
+            results[position] = rejection
+        elif entry is None:
+            unknown[ticket_code] = position
+        else:
+            pending[entry[BOOKING_ID]] = (position, ticket_code, entry)
+
+    if not pending and not unknown:
+        return {"results": results, "admitted": 0}
+
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+    admitted = 0
+
+    try:
+        # Resolve codes booked after the index was loaded
+        unknown_codes = list(unknown)
+        for start in range(0, len(unknown_codes), SYNC_CHUNK_SIZE):
+            chunk = unknown_codes[start:start + SYNC_CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+            SELECT id, ticket_code, status, payment_status, slots, exhibition_id
+            FROM exhibition_bookings
+            WHERE ticket_code IN ({placeholders})
+            """, tuple(chunk))
+            for booking_id, code, status, payment_status, slots, row_exhibition_id in cursor.fetchall():
+                code = normalize_ticket_code(code)
+                position = unknown.pop(code, None)
+                if position is None:
+                    continue
+                if str(row_exhibition_id) != str(exhibition_id):
+                    results[position] = _result(code, False, "wrong_exhibition")
+                    continue
+                entry = [booking_id, status, payment_status, slots]
+                index[code] = entry
+                pending[booking_id] = (position, code, entry)
+
+        for code, position in unknown.items():
+            results[position] = _result(code, False, "not_found")
+
+        booking_ids = list(pending)
+        for start in range(0, len(booking_ids), SYNC_CHUNK_SIZE):
+            chunk = booking_ids[start:start + SYNC_CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+
+            # Lock the rows so the redeemable set cannot change between the read and the UPDATE
+            cursor.execute(f"""
+            SELECT id, status, payment_status
+            FROM exhibition_bookings
+            WHERE id IN ({placeholders})
+            FOR UPDATE
+            """, tuple(chunk))
+
+            redeemable = []
+            for booking_id, status, payment_status in cursor.fetchall():
+                position, code, entry = pending[booking_id]
+                entry[STATUS], entry[PAYMENT_STATUS] = status, payment_status
+                reason = _rejection_reason(status, payment_status)
+                if reason:
+                    results[position] = _result(code, False, reason, entry)
+                else:
+                    redeemable.append(booking_id)
+
+            if redeemable:
+                placeholders = ', '.join(['%s'] * len(redeemable))
+                cursor.execute(f"""
+                UPDATE exhibition_bookings
+                SET status = 'used'
+                WHERE id IN ({placeholders}) AND status = 'active'
+                """, tuple(redeemable))
+                for booking_id in redeemable:
+                    position, code, entry = pending[booking_id]
+                    results[position] = _result(code, True, "admitted", entry)
+                admitted += len(redeemable)
+
+        connection.commit()
+
+        # Only now that the transaction is durable does the index learn about the redemptions
+        for booking_id in pending:
+            position, code, entry = pending[booking_id]
+            if results[position] and results[position]["admitted"]:
+                entry[STATUS] = 'used'
+            elif results[position] is None:
+                # Deleted between the index load and the sync
+                index.pop(code, None)
+                results[position] = _result(code, False, "not_found")
+
+        print(f"Synced {len(scans)} offline scans for exhibition {exhibition_id}: {admitted} admitted")
+        return {"results": results, "admitted": admitted}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error syncing offline scans: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
@@ -0,0 +1,90 @@
+"""Content-Encoding negotiation for API responses
+
+Responses of at least COMPRESSION_MIN_BYTES are compressed with the best encoding the
+client lists in Accept-Encoding: Brotli when the optional brotli package is installed
+(pip install brotli), otherwise gzip. Smaller bodies are sent as they are, since the
+encoding overhead would outweigh the saving. Streamed responses (exports) go through
+CompressingWriter, which compresses each piece as it is written.
+"""
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+# gzip level 6 is zlib's default trade-off; responses are compressed per request unless cached
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Encodings in order of preference when the client accepts several equally
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate_encoding(accept_encoding, size=None):
+    """Pick the Content-Encoding for a response, or None to send it uncompressed
+
+    size is the body length when known; bodies under COMPRESSION_MIN_BYTES are not compressed.
+    """
+    if not accept_encoding or (size is not None and size < COMPRESSION_MIN_BYTES):
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best = None
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+def compress(body, encoding):
+    """Compress a complete body"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+class CompressingWriter:
+    """File-like wrapper that compresses everything written through it
+
+    close() writes the end of the compressed stream but leaves the underlying writer open.
+    """
+
+    def __init__(self, out, encoding):
+        self.out = out
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            # wbits 16 + MAX_WBITS produces a gzip container
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    def write(self, data):
+        compressed = self._compress(data)
+        if compressed:
+            self.out.write(compressed)
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        self.out.write(self._finish())
@@ -1,7 +1,7 @@
 
 import hashlib
 import sys
-from db_setup import get_db_connection
+from database import get_db_connection
 from mysql.connector import Error
 
 def hash_password(password):
@@ -1,18 +1,15 @@
 
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 import mysql.connector
 from mysql.connector import Error
-import json
-from decimal import Decimal
-from datetime import datetime
-
-# Custom JSON encoder to handle Decimal types and datetime objects
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super(DecimalEncoder, self).default(obj)
+from query_profiler import PROFILE_ENABLED, wrap_connection
+# JSON encoding and row conversion live in serialization.py; json_dumps is re-exported for existing imports
+from serialization import json_dumps, row_to_dict, rows_to_dicts
 
 # Database connection configuration
 DB_CONFIG = {
@@ -22,29 +19,178 @@ DB_CONFIG = {
     'database': 'artgallery'
 }
 
-def get_db_connection():
-    """Create and return a database connection"""
+# Read replicas as "host" or "host:port", comma separated; same user, password and database as DB_CONFIG
+DB_REPLICAS = [entry.strip() for entry in os.environ.get('DB_REPLICAS', '').split(',') if entry.strip()]
+# A replica further behind the primary than this is not read from
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
+# Seconds between replica lag checks (a scheduled job)
+REPLICA_CHECK_SECONDS = float(os.environ.get('REPLICA_CHECK_SECONDS', '5'))
+# A replica whose last lag check is older than this is not read from (the job may be waiting for a worker)
+REPLICA_STALE_SECONDS = 2 * REPLICA_CHECK_SECONDS
+# Seconds_Behind_Source is whole seconds, so a replica is trusted this much less than it reports
+REPLICA_LAG_SLACK_SECONDS = 1
+
+class Replica:
+    """A read replica and how far it had caught up with the primary when last checked"""
+
+    def __init__(self, address):
+        host, _, port = address.partition(':')
+        self.address = address
+        self.config = dict(DB_CONFIG, host=host, **({'port': int(port)} if port else {}))
+        # Wall-clock time up to which the replica has applied the primary's writes; None = do not read from it
+        self.applied_until = None
+        self.lag = None
+        self.error = "Not checked yet"
+        self.checked_at = None
+
+    def usable_until(self, now):
+        """How far the replica had caught up, or None when it must not be read from (unhealthy or not checked lately)"""
+        if self.checked_at is None or now - self.checked_at > REPLICA_STALE_SECONDS:
+            return None
+        return self.applied_until
+
+    def status(self):
+        return {
+            "replica": self.address,
+            "lag": self.lag,
+            "usable": self.usable_until(time.time()) is not None,
+            "error": self.error,
+            "lastChecked": datetime.fromtimestamp(self.checked_at).isoformat() if self.checked_at else None,
+        }
+
+_replicas = [Replica(address) for address in DB_REPLICAS]
+_next_replica = itertools.count()
+
+# Per request thread: the session being served and the write time its reads must reflect
+_request = threading.local()
+# Session key -> time of its last write, kept until every usable replica must have caught up
+_session_writes = {}
+_session_lock = threading.Lock()
+
+def _connect(config):
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = mysql.connector.connect(**config)
         if connection.is_connected():
+            if PROFILE_ENABLED:
+                return wrap_connection(connection)
             return connection
     except Error as e:
-        print(f"Error connecting to MySQL: {e}")
+        print(f"Error connecting to MySQL ({config['host']}): {e}")
     return None
 
-# Helper function to safely encode JSON with Decimal and datetime values
-def json_dumps(data):
-    """Safely convert data to JSON string, handling Decimal and datetime types"""
-    return json.dumps(data, cls=DecimalEncoder)
+def _replica_connection():
+    """Connect to a replica that has caught up with the writes this thread must see, or return None"""
+    needed = getattr(_request, 'after', 0) + REPLICA_LAG_SLACK_SECONDS
+    now = time.time()
+    candidates = [
+        replica for replica in _replicas
+        if (replica.usable_until(now) or 0) >= needed
+    ]
+    if not candidates:
+        return None
+    replica = candidates[next(_next_replica) % len(candidates)]
+    connection = _connect(replica.config)
+    if connection is None:
+        # Stop reading from it until the next lag check finds it healthy
+        replica.applied_until = None
+        replica.error = "Connection failed"
+    return connection
+
+def get_db_connection(read_only=False):
+    """Create and return a database connection
+
+    Every module gets its connections here, so this is the one place they can be profiled (DB_PROFILE=1)
+    and routed. Functions that only read pass read_only=True to be served by a read replica
+    (DB_REPLICAS) when one has caught up with every write the caller must see: the current
+    session's own writes (see begin_request) and any wanted through reads_after(). Otherwise,
+    and whenever no replica is usable, the connection is to the primary.
+    """
+    if read_only and _replicas:
+        connection = _replica_connection()
+        if connection is not None:
+            return connection
+    return _connect(DB_CONFIG)
+
+def begin_request(session):
+    """Start serving a request for a session (a token or client address) on this thread
+
+    Read-only connections opened for it go to the primary until a replica has caught up with the
+    session's last write, so a user always reads their own writes.
+    """
+    _request.session = session
+    with _session_lock:
+        _request.after = _session_writes.get(session, 0)
+
+def end_request(wrote):
+    """Finish the current request; wrote=True records that the session may have changed data"""
+    session = getattr(_request, 'session', None)
+    _request.session = None
+    _request.after = 0
+    if not wrote or session is None or not _replicas:
+        return
+    now = time.time()
+    with _session_lock:
+        _session_writes[session] = now
+        if len(_session_writes) > 1000:
+            # Any usable replica was within the lag limit at a check no older than REPLICA_STALE_SECONDS,
+            # so older writes are visible on it
+            horizon = now - REPLICA_MAX_LAG_SECONDS - REPLICA_STALE_SECONDS - REPLICA_LAG_SLACK_SECONDS
+            for key in [key for key, written in _session_writes.items() if written < horizon]:
+                del _session_writes[key]
+
+@contextmanager
+def reads_after(timestamp):
+    """Make read-only connections opened inside the block reflect writes made up to timestamp (time.time())"""
+    previous = getattr(_request, 'after', 0)
+    _request.after = max(previous, timestamp)
+    try:
+        yield
+    finally:
+        _request.after = previous
+
+def _replication_lag(cursor):
+    """Seconds the replica is behind its source, or None when replication is not running"""
+    try:
+        cursor.execute("SHOW REPLICA STATUS")
+        column = 'Seconds_Behind_Source'
+    except Error:
+        # MySQL before 8.0.22
+        cursor.execute("SHOW SLAVE STATUS")
+        column = 'Seconds_Behind_Master'
+    rows = cursor.fetchall()
+    if not rows:
+        raise RuntimeError("Replication is not configured")
+    return dict(zip(cursor.column_names, rows[0])).get(column)
+
+def check_replicas():
+    """Measure each replica's lag and decide which ones reads may go to (a scheduled job)"""
+    for replica in _replicas:
+        checked = time.time()
+        replica.checked_at = checked
+        connection = _connect(replica.config)
+        if connection is None:
+            replica.applied_until, replica.lag, replica.error = None, None, "Connection failed"
+            continue
+        cursor = connection.cursor()
+        try:
+            lag = _replication_lag(cursor)
+            replica.lag = lag
+            if lag is None:
+                replica.applied_until, replica.error = None, "Replication is stopped"
+            elif lag > REPLICA_MAX_LAG_SECONDS:
+                replica.applied_until, replica.error = None, f"{lag}s behind the primary"
+            else:
+                replica.applied_until, replica.error = checked - lag, None
+        except Exception as e:
+            replica.applied_until, replica.lag, replica.error = None, None, str(e)
+        finally:
+            cursor.close()
+            connection.close()
+    return {"success": True, "replicas": [replica.status() for replica in _replicas]}
 
 def dict_from_row(row, cursor):
-    """Convert a database row to a dictionary"""
-    result = {cursor.column_names[i]: value for i, value in enumerate(row)}
-    # Convert Decimal objects to float for JSON serialization
-    for key, value in result.items():
-        if isinstance(value, Decimal):
-            result[key] = float(value)
-    return result
+    """Convert a database row to a dictionary, with DECIMAL values as float"""
+    return row_to_dict(cursor, row)
 
 # Contact message functions
 def save_contact_message(name, email, phone, message, source='contact_form'):
@@ -56,16 +202,6 @@ def save_contact_message(name, email, phone, message, source='contact_form'):
     try:
         cursor = connection.cursor()
         
-        # Check if contact_messages table has source column
-        cursor.execute("SHOW COLUMNS FROM contact_messages LIKE 'source'")
-        source_exists = cursor.fetchone()
-        
-        if not source_exists:
-            # Add source column if it doesn't exist
-            print("Adding source column to contact_messages table")
-            cursor.execute("ALTER TABLE contact_messages ADD COLUMN source VARCHAR(50) DEFAULT 'contact_form'")
-            connection.commit()
-        
         # Insert the message into the database
         query = """
         INSERT INTO contact_messages (name, email, phone, message, source, status)
@@ -103,12 +239,7 @@ def get_all_contact_messages():
         ORDER BY date DESC
         """
         cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        messages = []
-        for row in rows:
-            message_dict = dict_from_row(row, cursor)
-            messages.append(message_dict)
+        messages = rows_to_dicts(cursor)
         
         print(f"Retrieved {len(messages)} messages")
         return {"messages": messages}
@@ -1,14 +1,29 @@
-
+import itertools
 from database import get_db_connection
+from serialization import rows_to_dicts
 from decimal import Decimal
-import random
-import string
+from ticket_codes import execute_with_ticket_code, normalize_ticket_code, TICKET_CODE_PREFIX
+from datetime import datetime
+from artist_stats import order_added
+from sales_rollup import order_placed
+from recommendations import invalidate_user as invalidate_recommendations
+from archive import ARCHIVE_TABLES
+
+# Page size limits for paginated listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_page_cursor(timestamp, row_id):
+    """Encode the sort key of the last row on a page as an opaque cursor string"""
+    return f"{timestamp.isoformat()}_{row_id}"
 
-def generate_ticket_code():
-    """Generate a unique ticket code"""
-    prefix = 'TKT'
-    random_chars = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    return f"{prefix}-{random_chars}"
+def decode_page_cursor(cursor_value):
+    """Decode a cursor from encode_page_cursor into (timestamp, id), or None if malformed"""
+    try:
+        timestamp, row_id = cursor_value.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (AttributeError, ValueError):
+        return None
 
 def create_order(user_id, order_type, reference_id, amount):
     """Create a new order in the database"""
@@ -26,24 +41,29 @@ def create_order(user_id, order_type, reference_id, amount):
             VALUES (%s, %s, %s, %s)
             """
             cursor.execute(query, (user_id, reference_id, amount, 'pending'))
+            order_id = cursor.lastrowid
+            order_added(cursor, reference_id)
+            order_placed(cursor, 'artwork', order_id)
             connection.commit()
+            invalidate_recommendations(user_id)
             
-            order_id = cursor.lastrowid
             return {"success": True, "order_id": order_id}
         
         elif order_type == 'exhibition':
-            # Generate a ticket code for the exhibition booking
-            ticket_code = generate_ticket_code()
-            
-            # Store exhibition orders in exhibition_bookings table
+            # Store exhibition orders in exhibition_bookings table with a freshly allocated ticket code
             query = """
             INSERT INTO exhibition_bookings (user_id, exhibition_id, total_amount, payment_status, ticket_code, slots, status)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
-            cursor.execute(query, (user_id, reference_id, amount, 'pending', ticket_code, 1, 'active'))
+            ticket_code = execute_with_ticket_code(
+                cursor, query,
+                lambda code: (user_id, reference_id, amount, 'pending', code, 1, 'active')
+            )
+            order_id = cursor.lastrowid
+            order_placed(cursor, 'ticket', order_id)
             connection.commit()
+            invalidate_recommendations(user_id)
             
-            order_id = cursor.lastrowid
             return {"success": True, "order_id": order_id, "ticket_code": ticket_code}
         
         else:
@@ -65,18 +85,21 @@ def create_ticket(user_id, exhibition_id, slots):
     cursor = connection.cursor()
     
     try:
-        # Generate ticket code
-        ticket_code = generate_ticket_code()
-        
-        # Store tickets in exhibition_bookings table with the ticket_code field
+        # Store tickets in exhibition_bookings table; the unique index on ticket_code
+        # rejects collisions and execute_with_ticket_code retries with a new code
         query = """
         INSERT INTO exhibition_bookings (user_id, exhibition_id, ticket_code, slots, status)
         VALUES (%s, %s, %s, %s, %s)
         """
-        cursor.execute(query, (user_id, exhibition_id, ticket_code, slots, 'active'))
+        ticket_code = execute_with_ticket_code(
+            cursor, query,
+            lambda code: (user_id, exhibition_id, code, slots, 'active')
+        )
+        ticket_id = cursor.lastrowid
+        order_placed(cursor, 'ticket', ticket_id)
         connection.commit()
+        invalidate_recommendations(user_id)
         
-        ticket_id = cursor.lastrowid
         return {"success": True, "ticket_id": ticket_id, "ticket_code": ticket_code}
     except Exception as e:
         print(f"Error creating ticket: {e}")
@@ -104,7 +127,7 @@ def get_all_orders():
         ORDER BY ao.order_date DESC
         """
         cursor.execute(query)
-        artwork_orders = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
+        artwork_orders = rows_to_dicts(cursor)
         
         for order in artwork_orders:
             order['type'] = 'artwork'
@@ -119,8 +142,14 @@ def get_all_orders():
             cursor.close()
             connection.close()
 
-def get_all_tickets():
-    """Get all tickets from database"""
+def get_all_tickets(exhibition_id=None, status=None, date_from=None, date_to=None,
+                    ticket_code=None, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of tickets, newest first, optionally filtered
+
+    Pagination is keyset-based on (booking_date, id) so every page is an index range
+    scan on exhibition_bookings(booking_date) or (exhibition_id, booking_date), no
+    matter how deep the page is. date_from is inclusive and date_to exclusive.
+    """
     connection = get_db_connection()
     if connection is None:
         return {"error": "Database connection failed"}
@@ -128,8 +157,38 @@ def get_all_tickets():
     cursor = connection.cursor()
     
     try:
-        # Get exhibition bookings with start and end dates
-        query = """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        conditions = []
+        params = []
+        
+        if exhibition_id:
+            conditions.append("eb.exhibition_id = %s")
+            params.append(exhibition_id)
+        if status:
+            conditions.append("eb.status = %s")
+            params.append(status)
+        if date_from:
+            conditions.append("eb.booking_date >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("eb.booking_date < %s")
+            params.append(date_to)
+        if ticket_code:
+            # Prefix match so the unique ticket_code index can be used
+            ticket_code = normalize_ticket_code(ticket_code)
+            if not ticket_code.startswith(f"{TICKET_CODE_PREFIX}-"):
+                ticket_code = f"{TICKET_CODE_PREFIX}-{ticket_code}"
+            conditions.append("eb.ticket_code LIKE %s")
+            params.append(ticket_code.replace('%', '').replace('_', '') + '%')
+        if after:
+            position = decode_page_cursor(after)
+            if position is None:
+                return {"error": "Invalid cursor"}
+            conditions.append("(eb.booking_date < %s OR (eb.booking_date = %s AND eb.id < %s))")
+            params.extend([position[0], position[0], position[1]])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
         SELECT eb.id, eb.user_id, u.name as user_name, eb.exhibition_id, 
                e.title as exhibition_title, e.image_url as exhibition_image_url,
                eb.booking_date, eb.ticket_code, eb.slots, eb.status,
@@ -138,16 +197,21 @@ def get_all_tickets():
         FROM exhibition_bookings eb
         JOIN users u ON eb.user_id = u.id
         JOIN exhibitions e ON eb.exhibition_id = e.id
-        ORDER BY eb.booking_date DESC
+        {where}
+        ORDER BY eb.booking_date DESC, eb.id DESC
+        LIMIT %s
         """
-        cursor.execute(query)
+        # Fetch one extra row to find out whether another page exists
+        cursor.execute(query, tuple(params) + (limit + 1,))
+        rows = cursor.fetchall()
         
-        tickets = []
-        for row in cursor.fetchall():
-            ticket = dict(zip([col[0] for col in cursor.description], row))
-            tickets.append(ticket)
+        tickets = rows_to_dicts(cursor, rows[:limit])
+        next_cursor = None
+        if len(rows) > limit:
+            last = tickets[-1]
+            next_cursor = encode_page_cursor(last['booking_date'], last['id'])
             
-        return {"tickets": tickets}
+        return {"tickets": tickets, "nextCursor": next_cursor}
     except Exception as e:
         print(f"Error getting tickets: {e}")
         return {"error": str(e)}
@@ -156,8 +220,66 @@ def get_all_tickets():
             cursor.close()
             connection.close()
 
-def get_user_orders(user_id):
-    """Get all orders and bookings for a specific user"""
+# Each branch of the order-history UNION: (kind, SELECT ... FROM ... WHERE user_id = %s, date column, id column).
+# Every branch is read from the hot table and from its archive (HISTORY_TABLES);
+# rows are ordered by (date DESC, kind DESC, id DESC) across all of them.
+HISTORY_BRANCHES = [
+    ('exhibition', """
+        SELECT 'exhibition' as kind, eb.id, eb.booking_date as date, eb.exhibition_id as item_id,
+               e.title, NULL as artist, e.image_url, NULL as price, NULL as delivery_address,
+               e.location, eb.slots, eb.ticket_code, eb.total_amount, eb.status,
+               e.start_date as exhibition_start_date, e.end_date as exhibition_end_date
+        FROM {bookings} eb
+        JOIN exhibitions e ON eb.exhibition_id = e.id
+        WHERE eb.user_id = %s""", 'eb.booking_date', 'eb.id'),
+    ('artwork', """
+        SELECT 'artwork' as kind, ao.id, ao.order_date as date, ao.artwork_id as item_id,
+               a.title, a.artist, a.image_url, a.price, ao.delivery_address,
+               NULL as location, NULL as slots, NULL as ticket_code, ao.total_amount, ao.payment_status as status,
+               NULL as exhibition_start_date, NULL as exhibition_end_date
+        FROM {orders} ao
+        JOIN artworks a ON ao.artwork_id = a.id
+        WHERE ao.user_id = %s""", 'ao.order_date', 'ao.id'),
+]
+
+HISTORY_TABLES = [
+    {'bookings': 'exhibition_bookings', 'orders': 'artwork_orders'},
+    {'bookings': ARCHIVE_TABLES['exhibition_bookings'], 'orders': ARCHIVE_TABLES['artwork_orders']},
+]
+
+def _history_page_condition(kind, date_column, id_column, position):
+    """Keyset condition for one UNION branch, given the (date, kind, id) of the last row seen"""
+    last_date, last_kind, last_id = position
+    if kind < last_kind:
+        return f"{date_column} <= %s", [last_date]
+    if kind > last_kind:
+        return f"{date_column} < %s", [last_date]
+    return f"({date_column} < %s OR ({date_column} = %s AND {id_column} < %s))", [last_date, last_date, last_id]
+
+def _history_item(row):
+    """Shape a unified history row into the artwork order or booking the Profile page expects"""
+    (kind, row_id, date, item_id, title, artist, image_url, price, delivery_address,
+     location, slots, ticket_code, total_amount, status, start_date, end_date) = row
+    if kind == 'artwork':
+        return kind, {
+            "id": row_id, "artwork_id": item_id, "artworkTitle": title, "artist": artist,
+            "image_url": image_url, "date": date, "price": price, "deliveryFee": 0,
+            "totalAmount": total_amount, "status": status, "deliveryAddress": delivery_address
+        }
+    return kind, {
+        "id": row_id, "exhibitionId": item_id, "exhibitionTitle": title, "date": date,
+        "location": location, "slots": slots, "ticket_code": ticket_code,
+        "totalAmount": total_amount, "status": status, "image_url": image_url,
+        "exhibition_start_date": start_date, "exhibition_end_date": end_date
+    }
+
+def get_user_orders(user_id, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of a user's order history (artwork orders and exhibition bookings), newest first
+
+    Both tables and their archives are read in a single UNION ALL query. Each branch
+    is limited and keyset-filtered on its own (user_id, date) index before the merge,
+    so the cost of a page does not depend on how long the user's history is.
+    """
     connection = get_db_connection()
     if connection is None:
         print(f"Database connection failed for user {user_id}")
@@ -168,43 +290,48 @@ def get_user_orders(user_id):
     try:
         # Convert user_id to integer to ensure proper type matching
         user_id = int(user_id)
-        print(f"Getting orders for user_id: {user_id} (type: {type(user_id)})")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
         
-        # Get user's artwork orders
-        artwork_query = """
-        SELECT ao.id, ao.artwork_id, a.title as artworkTitle, a.artist, a.image_url,
-               ao.order_date as date, a.price, 0 as deliveryFee, 
-               ao.total_amount as totalAmount, 
-               ao.payment_status as status, ao.delivery_address as deliveryAddress
-        FROM artwork_orders ao
-        JOIN artworks a ON ao.artwork_id = a.id
-        WHERE ao.user_id = %s
-        ORDER BY ao.order_date DESC
-        """
-        print(f"Executing artwork query with user_id: {user_id}")
-        cursor.execute(artwork_query, (user_id,))
-        orders = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
-        print(f"Found {len(orders)} artwork orders for user {user_id}")
+        position = None
+        if after:
+            kind, _, page_cursor = after.partition(':')
+            decoded = decode_page_cursor(page_cursor)
+            if decoded is None or kind not in ('artwork', 'exhibition'):
+                return {"error": "Invalid cursor"}
+            position = (decoded[0], kind, decoded[1])
         
-        # Get user's exhibition bookings with start and end dates
-        booking_query = """
-        SELECT eb.id, eb.exhibition_id as exhibitionId, e.title as exhibitionTitle,
-               eb.booking_date as date, e.location, eb.slots, eb.ticket_code,
-               eb.total_amount as totalAmount, eb.status, e.image_url,
-               e.start_date as exhibition_start_date, e.end_date as exhibition_end_date
-        FROM exhibition_bookings eb
-        JOIN exhibitions e ON eb.exhibition_id = e.id
-        WHERE eb.user_id = %s
-        ORDER BY eb.booking_date DESC
-        """
-        print(f"Executing booking query with user_id: {user_id}")
-        cursor.execute(booking_query, (user_id,))
-        bookings = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
-        print(f"Found {len(bookings)} exhibition bookings for user {user_id}")
+        branches = []
+        params = []
+        for tables, (kind, select, date_column, id_column) in itertools.product(HISTORY_TABLES, HISTORY_BRANCHES):
+            sql = select.format(**tables)
+            params.append(user_id)
+            if position:
+                condition, condition_params = _history_page_condition(kind, date_column, id_column, position)
+                sql += f" AND {condition}"
+                params.extend(condition_params)
+            sql += f" ORDER BY {date_column} DESC, {id_column} DESC LIMIT %s"
+            params.append(limit + 1)
+            branches.append(f"({sql})")
+        
+        query = " UNION ALL ".join(branches) + " ORDER BY date DESC, kind DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
         
-        result = {"orders": orders, "bookings": bookings}
-        print(f"Final result for user {user_id}: {result}")
-        return result
+        orders = []
+        bookings = []
+        for row in rows[:limit]:
+            kind, item = _history_item(row)
+            (orders if kind == 'artwork' else bookings).append(item)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = f"{last[0]}:{encode_page_cursor(last[2], last[1])}"
+        
+        print(f"Found {len(orders)} artwork orders and {len(bookings)} bookings for user {user_id}")
+        return {"orders": orders, "bookings": bookings, "nextCursor": next_cursor}
         
     except Exception as e:
         print(f"Error getting user orders for user {user_id}: {e}")
@@ -216,7 +343,6 @@ def get_user_orders(user_id):
             cursor.close()
             connection.close()
 
-# ... keep existing code (get_artist_artworks, get_artist_orders, get_all_artists functions) the same
 def get_artist_artworks(artist_id):
     """Get all artworks for a specific artist"""
     connection = get_db_connection()
@@ -226,47 +352,17 @@ def get_artist_artworks(artist_id):
     cursor = connection.cursor()
     
     try:
-        # Debug to check the artist_id being used
-        print(f"Finding artworks for artist_id: {artist_id}")
-        
-        # Get all artworks where the artist_id matches or where the artist name matches
-        # the name associated with the artist_id
+        # Ownership is artist_id only (see artist_ownership); order_count is a counter on the row
         query = """
-        SELECT a.*, 
-               COALESCE((SELECT COUNT(*) FROM artwork_orders ao WHERE ao.artwork_id = a.id), 0) as order_count
+        SELECT a.*
         FROM artworks a
-        JOIN artists art ON art.id = %s
-        WHERE a.artist_id = %s OR a.artist = art.name
+        WHERE a.artist_id = %s
         ORDER BY a.created_at DESC
         """
-        cursor.execute(query, (artist_id, artist_id))
-        artworks = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
+        cursor.execute(query, (artist_id,))
+        artworks = rows_to_dicts(cursor)
         
-        print(f"Artist {artist_id} artworks query result: {artworks}")
-        
-        # If no results found, try an alternative query to find by artist name only
-        if not artworks:
-            print(f"No artworks found with artist_id={artist_id}, trying to find by artist name")
-            name_query = """
-            SELECT name FROM artists WHERE id = %s
-            """
-            cursor.execute(name_query, (artist_id,))
-            artist_name_row = cursor.fetchone()
-            
-            if artist_name_row:
-                artist_name = artist_name_row[0]
-                print(f"Found artist name: {artist_name}, searching artworks by this name")
-                
-                backup_query = """
-                SELECT a.*, 
-                       COALESCE((SELECT COUNT(*) FROM artwork_orders ao WHERE ao.artwork_id = a.id), 0) as order_count
-                FROM artworks a
-                WHERE a.artist = %s
-                ORDER BY a.created_at DESC
-                """
-                cursor.execute(backup_query, (artist_name,))
-                artworks = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
-                print(f"Backup query results: {artworks}")
+        print(f"Found {len(artworks)} artworks for artist {artist_id}")
         
         return {"artworks": artworks}
     except Exception as e:
@@ -286,19 +382,22 @@ def get_artist_orders(artist_id):
     cursor = connection.cursor()
     
     try:
-        # Get orders for both artist_id and artist name matches
-        query = """
+        # Orders for the artist's artworks, found through the artist_id index, archived ones included
+        select = """
         SELECT ao.*, a.title as artwork_title, u.name as buyer_name, u.email as buyer_email
-        FROM artwork_orders ao
+        FROM {orders} ao
         JOIN artworks a ON ao.artwork_id = a.id
         JOIN users u ON ao.user_id = u.id
-        WHERE a.artist_id = %s OR a.artist = (SELECT name FROM artists WHERE id = %s)
-        ORDER BY ao.order_date DESC
+        WHERE a.artist_id = %s
         """
+        query = (
+            select.format(orders='artwork_orders') + " UNION ALL " +
+            select.format(orders=ARCHIVE_TABLES['artwork_orders']) + " ORDER BY order_date DESC"
+        )
         cursor.execute(query, (artist_id, artist_id))
-        orders = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
+        orders = rows_to_dicts(cursor)
         
-        print(f"Artist {artist_id} orders query result: {orders}")
+        print(f"Found {len(orders)} orders for artist {artist_id}")
         
         return {"orders": orders}
     except Exception as e:
@@ -311,7 +410,7 @@ def get_artist_orders(artist_id):
 
 def get_all_artists():
     """Get all artists from database"""
-    connection = get_db_connection()
+    connection = get_db_connection(read_only=True)
     if connection is None:
         return {"error": "Database connection failed"}
     
@@ -320,12 +419,12 @@ def get_all_artists():
     try:
         query = """
         SELECT a.id, a.name, a.email, a.bio, a.profile_image_url, a.phone, a.created_at,
-               (SELECT COUNT(*) FROM artworks WHERE artist_id = a.id) as artwork_count
+               a.artwork_count, a.order_count, a.revenue
         FROM artists a
         ORDER BY a.created_at DESC
         """
         cursor.execute(query)
-        artists = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
+        artists = rows_to_dicts(cursor)
         
         return {"artists": artists}
     except Exception as e:
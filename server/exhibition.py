@@ -1,5 +1,9 @@
 
-from database import get_db_connection, dict_from_row, json_dumps
+from database import get_db_connection, json_dumps
+from serialization import ResponseShape, iso_date, to_float
+from response_cache import invalidate, EXHIBITIONS
+import search_index
+import autocomplete
 from auth import verify_token
 import json
 import os
@@ -10,6 +14,21 @@ from decimal import Decimal
 # Default exhibition image path
 DEFAULT_EXHIBITION_IMAGE = "/static/uploads/default_exhibition.jpg"
 
+# Exhibition JSON as the frontend expects it: (response field, column, conversion)
+EXHIBITION_FIELDS = ResponseShape([
+    ('id', 'id', str),
+    ('title', 'title', None),
+    ('description', 'description', None),
+    ('location', 'location', None),
+    ('startDate', 'start_date', iso_date),
+    ('endDate', 'end_date', iso_date),
+    ('ticketPrice', 'ticket_price', to_float),
+    ('imageUrl', 'image_url', None),
+    ('totalSlots', 'total_slots', None),
+    ('availableSlots', 'available_slots', None),
+    ('status', 'status', None),
+])
+
 # Ensure uploads directory exists
 def ensure_uploads_directory():
     """Create the uploads directory if it doesn't exist"""
@@ -70,9 +89,22 @@ def save_image_from_base64(base64_str, name_prefix="exhibition"):
         print(f"Error saving image: {e}")
         return DEFAULT_EXHIBITION_IMAGE
 
+def _resolve_image_url(exhibition):
+    """Move an inline base64 image out to a file, or fall back to the default image"""
+    image_url = exhibition['imageUrl']
+    if image_url and (image_url.startswith('data:') or 'base64' in image_url):
+        # Save the base64 image to a file and get its path
+        saved_path = save_image_from_base64(image_url)
+        exhibition['imageUrl'] = saved_path
+        # Also update the database with the new path
+        update_exhibition_image(exhibition['id'], saved_path)
+        print(f"Converted base64 image to file: {saved_path}")
+    elif not image_url:
+        exhibition['imageUrl'] = DEFAULT_EXHIBITION_IMAGE
+
 def get_all_exhibitions():
     """Get all exhibitions from the database"""
-    connection = get_db_connection()
+    connection = get_db_connection(read_only=True)
     if connection is None:
         return {"error": "Database connection failed"}
     
@@ -88,38 +120,9 @@ def get_all_exhibitions():
         cursor.execute(query)
         rows = cursor.fetchall()
         
-        exhibitions = []
-        for row in rows:
-            exhibition = dict_from_row(row, cursor)
-            
-            # Convert id to string to match frontend expectations
-            exhibition['id'] = str(exhibition['id'])
-            
-            # Convert dates to string format
-            exhibition['startDate'] = exhibition.pop('start_date').isoformat()
-            exhibition['endDate'] = exhibition.pop('end_date').isoformat()
-            
-            # Convert ticket_price to camelCase
-            exhibition['ticketPrice'] = exhibition.pop('ticket_price')
-            
-            # Convert image_url to camelCase and ensure it's valid
-            image_url = exhibition.pop('image_url')
-            # Convert base64 images to file paths
-            if image_url and (image_url.startswith('data:') or 'base64' in image_url):
-                # Save the base64 image to a file and get its path
-                saved_path = save_image_from_base64(image_url)
-                exhibition['imageUrl'] = saved_path
-                # Also update the database with the new path
-                update_exhibition_image(exhibition['id'], saved_path)
-                print(f"Converted base64 image to file: {saved_path}")
-            else:
-                exhibition['imageUrl'] = image_url if image_url else DEFAULT_EXHIBITION_IMAGE
-            
-            # Convert total_slots and available_slots to camelCase
-            exhibition['totalSlots'] = exhibition.pop('total_slots')
-            exhibition['availableSlots'] = exhibition.pop('available_slots')
-            
-            exhibitions.append(exhibition)
+        exhibitions = EXHIBITION_FIELDS.all(cursor, rows)
+        for exhibition in exhibitions:
+            _resolve_image_url(exhibition)
         
         return {"exhibitions": exhibitions}
     except Exception as e:
@@ -130,6 +133,43 @@ def get_all_exhibitions():
             cursor.close()
             connection.close()
 
+def get_trending_exhibitions(days, limit):
+    """Get the most viewed exhibitions over the last days (today included), with their view counts"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+    
+    cursor = connection.cursor()
+    
+    try:
+        query = """
+        SELECT e.id, e.title, e.description, e.location, e.start_date, e.end_date,
+               e.ticket_price, e.image_url, e.total_slots, e.available_slots, e.status,
+               SUM(v.views) AS views
+        FROM daily_view_counts v
+        JOIN exhibitions e ON e.id = v.item_id
+        WHERE v.kind = 'exhibition' AND v.day > CURDATE() - INTERVAL %s DAY
+        GROUP BY e.id
+        ORDER BY views DESC, e.id
+        LIMIT %s
+        """
+        cursor.execute(query, (days, limit))
+        rows = cursor.fetchall()
+        
+        exhibitions = EXHIBITION_FIELDS.all(cursor, rows)
+        for exhibition, row in zip(exhibitions, rows):
+            exhibition['views'] = int(row[-1])
+            _resolve_image_url(exhibition)
+        
+        return {"exhibitions": exhibitions, "days": days}
+    except Exception as e:
+        print(f"Error getting trending exhibitions: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
 def update_exhibition_image(exhibition_id, image_path):
     """Update the image_url in the database for an exhibition"""
     connection = get_db_connection()
@@ -176,34 +216,8 @@ def get_exhibition(exhibition_id):
         if not row:
             return {"error": "Exhibition not found"}
         
-        exhibition = dict_from_row(row, cursor)
-        
-        # Convert id to string to match frontend expectations
-        exhibition['id'] = str(exhibition['id'])
-        
-        # Convert dates to string format
-        exhibition['startDate'] = exhibition.pop('start_date').isoformat()
-        exhibition['endDate'] = exhibition.pop('end_date').isoformat()
-        
-        # Convert ticket_price to camelCase
-        exhibition['ticketPrice'] = exhibition.pop('ticket_price')
-        
-        # Convert image_url to camelCase and ensure it's valid
-        image_url = exhibition.pop('image_url')
-        # Convert base64 images to file paths
-        if image_url and (image_url.startswith('data:') or 'base64' in image_url):
-            # Save the base64 image to a file and get its path
-            saved_path = save_image_from_base64(image_url)
-            exhibition['imageUrl'] = saved_path
-            # Also update the database with the new path
-            update_exhibition_image(exhibition['id'], saved_path)
-            print(f"Converted base64 image to file: {saved_path}")
-        else:
-            exhibition['imageUrl'] = image_url if image_url else DEFAULT_EXHIBITION_IMAGE
-        
-        # Convert total_slots and available_slots to camelCase
-        exhibition['totalSlots'] = exhibition.pop('total_slots')
-        exhibition['availableSlots'] = exhibition.pop('available_slots')
+        exhibition = EXHIBITION_FIELDS.one(cursor, row)
+        _resolve_image_url(exhibition)
         
         return exhibition
     except Exception as e:
@@ -310,9 +324,12 @@ def create_exhibition(auth_header, exhibition_data):
             exhibition_data.get("status")
         ))
         connection.commit()
+        invalidate(EXHIBITIONS)
         
         # Return the newly created exhibition
         new_exhibition_id = cursor.lastrowid
+        search_index.exhibition_changed(new_exhibition_id)
+        autocomplete.exhibition_saved(new_exhibition_id, exhibition_data.get("title"))
         print(f"Exhibition created successfully with ID: {new_exhibition_id}")
         return get_exhibition(new_exhibition_id)
     except Exception as e:
@@ -376,6 +393,9 @@ def update_exhibition(auth_header, exhibition_id, exhibition_data):
             exhibition_id
         ))
         connection.commit()
+        invalidate(EXHIBITIONS)
+        search_index.exhibition_changed(exhibition_id)
+        autocomplete.exhibition_saved(exhibition_id, exhibition_data.get("title"))
         
         # Check if exhibition was found and updated
         if cursor.rowcount == 0:
@@ -448,6 +468,9 @@ def delete_exhibition(auth_header, exhibition_id):
         # Delete the exhibition
         cursor.execute("DELETE FROM exhibitions WHERE id = %s", (exhibition_id,))
         connection.commit()
+        invalidate(EXHIBITIONS)
+        search_index.exhibition_removed(exhibition_id)
+        autocomplete.exhibition_deleted(exhibition_id)
         
         return {"success": True, "message": f"Exhibition with ID {exhibition_id} deleted successfully"}
     except Exception as e:
@@ -457,3 +480,41 @@ def delete_exhibition(auth_header, exhibition_id):
         if connection.is_connected():
             cursor.close()
             connection.close()
+
+# Status implied by an exhibition's dates, as of the database's current date
+_STATUS_FROM_DATES = """
+CASE
+    WHEN end_date < CURDATE() THEN 'past'
+    WHEN start_date <= CURDATE() THEN 'ongoing'
+    ELSE 'upcoming'
+END
+"""
+
+def refresh_exhibition_statuses():
+    """Move every exhibition whose dates have been crossed to its new status in one UPDATE"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+    
+    cursor = connection.cursor()
+    
+    try:
+        cursor.execute(f"""
+        UPDATE exhibitions
+        SET status = {_STATUS_FROM_DATES}
+        WHERE status <> {_STATUS_FROM_DATES}
+        """)
+        updated = cursor.rowcount
+        connection.commit()
+        
+        if updated:
+            invalidate(EXHIBITIONS)
+            print(f"Exhibition statuses refreshed: {updated} changed")
+        return {"success": True, "updated": updated}
+    except Exception as e:
+        print(f"Error refreshing exhibition statuses: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
@@ -0,0 +1,186 @@
+"""Streaming CSV / NDJSON exports of orders, tickets and contact messages
+
+Rows are read from an unbuffered cursor EXPORT_BATCH_SIZE at a time and each batch is
+written out before the next one is fetched, so memory stays flat however many rows an
+export covers. The listing endpoints (/orders, /tickets, /messages) are unchanged.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from database import get_db_connection
+from serialization import RowMaterializer, json_dumps
+
+# Rows fetched from MySQL and written to the client per batch
+EXPORT_BATCH_SIZE = 1000
+
+# Content type and file extension for each export format
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+# Each export: SELECT (without WHERE/ORDER BY), its ORDER BY, and the filters it accepts
+# as {query parameter: SQL condition}
+EXPORTS = {
+    'orders': (
+        """
+        SELECT ao.id, ao.user_id, u.name as user_name, ao.artwork_id, a.title as item_title,
+               ao.total_amount, ao.payment_status, ao.order_date
+        FROM artwork_orders ao
+        JOIN users u ON ao.user_id = u.id
+        JOIN artworks a ON ao.artwork_id = a.id
+        """,
+        "ao.order_date DESC, ao.id DESC",
+        {
+            'paymentStatus': "ao.payment_status = %s",
+            'dateFrom': "ao.order_date >= %s",
+            'dateTo': "ao.order_date < %s",
+        },
+    ),
+    'tickets': (
+        """
+        SELECT eb.id, eb.user_id, u.name as user_name, eb.exhibition_id, e.title as exhibition_title,
+               eb.booking_date, eb.ticket_code, eb.slots, eb.status, eb.total_amount, eb.payment_status
+        FROM exhibition_bookings eb
+        JOIN users u ON eb.user_id = u.id
+        JOIN exhibitions e ON eb.exhibition_id = e.id
+        """,
+        "eb.booking_date DESC, eb.id DESC",
+        {
+            'exhibitionId': "eb.exhibition_id = %s",
+            'status': "eb.status = %s",
+            'paymentStatus': "eb.payment_status = %s",
+            'dateFrom': "eb.booking_date >= %s",
+            'dateTo': "eb.booking_date < %s",
+        },
+    ),
+    'messages': (
+        """
+        SELECT id, name, email, phone, message, source, status, date
+        FROM contact_messages
+        """,
+        "date DESC, id DESC",
+        {
+            'status': "status = %s",
+            'dateFrom': "date >= %s",
+            'dateTo': "date < %s",
+        },
+    ),
+}
+
+class ChunkedWriter:
+    """File-like wrapper that frames every write as an HTTP/1.1 chunk"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        """Send the terminating zero-length chunk"""
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _encode_csv(materializer, rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(materializer.columns)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode('utf-8')
+
+def _encode_ndjson(materializer, rows, header):
+    return ''.join(json_dumps(item) + '\n' for item in materializer.all(rows)).encode('utf-8')
+
+ENCODERS = {
+    'csv': _encode_csv,
+    'ndjson': _encode_ndjson,
+}
+
+def build_export_query(name, params):
+    """Return (sql, args) for an export, or an error dict for unknown exports"""
+    if name not in EXPORTS:
+        return {"error": f"Unknown export: {name}"}
+    select, order_by, filters = EXPORTS[name]
+    conditions = []
+    args = []
+    for param, condition in filters.items():
+        if params.get(param):
+            conditions.append(condition)
+            args.append(params[param])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{select} {where} ORDER BY {order_by}", tuple(args)
+
+def start_export(name, params=None):
+    """Open a connection and run an export's query; returns (connection, cursor) or an error dict
+
+    Call this before sending any response headers, so that an unreachable database or a
+    failing query can still be answered with an error response.
+    """
+    query = build_export_query(name, params or {})
+    if isinstance(query, dict):
+        return query
+    sql, args = query
+
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    # Unbuffered: rows stay on the server until fetchmany asks for them
+    cursor = connection.cursor(buffered=False)
+
+    try:
+        cursor.execute(sql, args)
+        return connection, cursor
+    except Exception as e:
+        print(f"Error starting {name} export: {e}")
+        connection.close()
+        return {"error": str(e)}
+
+def stream_export(name, export_format, out, export):
+    """Write every row of an export started by start_export to out, one batch at a time
+
+    Returns a summary dict and closes the export's connection. An error here can only be
+    reported by cutting the stream short, so callers should close the HTTP connection.
+    """
+    connection, cursor = export
+    encode = ENCODERS[export_format]
+    rows_written = 0
+
+    try:
+        # DECIMAL columns are known from the cursor description, so one mapping serves every batch
+        materializer = RowMaterializer(cursor)
+        # Send the CSV header even when there are no rows
+        if export_format == 'csv':
+            out.write(encode(materializer, [], True))
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            out.write(encode(materializer, rows, False))
+            rows_written += len(rows)
+        return {"success": True, "rows": rows_written}
+    except Exception as e:
+        print(f"Error streaming {name} export after {rows_written} rows: {e}")
+        # Unread rows would make cursor.close() fail; dropping the connection discards them
+        connection.close()
+        return {"error": str(e), "rows": rows_written}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
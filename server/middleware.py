@@ -4,19 +4,10 @@ import datetime
 import os
 from functools import wraps
 from http.server import BaseHTTPRequestHandler
-from decimal import Decimal
-import json
 
 # Get the secret key from environment or use a default (in production, always use environment variables)
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'afriart_default_secret_key')
 
-# Custom JSON encoder to handle Decimal types
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
-
 def generate_token(user_id, name, is_admin):
     """Generate a JWT token for authentication"""
     payload = {
@@ -124,8 +115,3 @@ def admin_required(handler_method):
         return handler_method(self, *args, **kwargs)
     
     return wrapper
-
-# Helper function to safely encode JSON with Decimal values
-def json_dumps(data):
-    """Safely convert data to JSON string, handling Decimal types"""
-    return json.dumps(data, cls=DecimalEncoder)
@@ -0,0 +1,677 @@
+"""Versioned schema migrations
+
+Each migration runs once per database and is recorded in the schema_version table.
+Run pending migrations at deploy time with:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied and pending migrations
+
+To change the schema, append a new (version, description, steps) entry to MIGRATIONS
+and update schema.sql to match. Never edit a migration that has already shipped.
+Steps never call application code, which keeps changing after the migration ships; data
+backfills are written out in full in this file as of their schema version.
+A step is either a SQL string or a callable taking a cursor. Steps that add columns
+or indexes use the idempotent helpers below, because databases created by the old
+initialize_database() may already have some of them.
+"""
+import secrets
+import sys
+import mysql.connector
+from mysql.connector import Error
+from database import DB_CONFIG, get_db_connection
+
+# Named lock that stops two deploys from migrating the same database at once
+MIGRATION_LOCK = 'afriart_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+def add_column(table, column, definition):
+    """Step that adds a column unless it already exists"""
+    def step(cursor):
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (table, column))
+        if cursor.fetchone()[0]:
+            return
+        print(f"  Adding column {table}.{column}")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+def add_index(table, index_name, columns, unique=False):
+    """Step that creates an index unless an index with that name already exists"""
+    def step(cursor):
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index_name))
+        if cursor.fetchone()[0]:
+            return
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        print(f"  Adding {kind.lower()} {index_name} on {table}({', '.join(columns)})")
+        cursor.execute(f"CREATE {kind} {index_name} ON {table} ({', '.join(columns)})")
+    return step
+
+def _run_backfill(description, backfill):
+    """Run backfill(connection, cursor) on its own connection, which commits chunk by chunk"""
+    connection = get_db_connection()
+    if connection is None:
+        raise Error(msg=f"{description} failed: database connection failed")
+
+    cursor = connection.cursor()
+
+    try:
+        backfill(connection, cursor)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+# The backfills below are frozen copies of the application code as of their migration's
+# schema version, so later changes to that code cannot change what an old migration does.
+
+def _ticket_code_v3():
+    """TKT- followed by 8 random Crockford base32 characters and a Luhn mod 32 check character"""
+    alphabet = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+    body = ''.join(secrets.choice(alphabet) for _ in range(8))
+    factor = 2
+    total = 0
+    for char in reversed(body):
+        addend = factor * alphabet.index(char)
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return f"TKT-{body}{alphabet[(32 - total % 32) % 32]}"
+
+def _reissue_duplicate_ticket_codes_v3(connection, cursor):
+    """Give every booking sharing its ticket code with an earlier booking a new, unused code"""
+    cursor.execute("""
+    SELECT eb.id, eb.ticket_code FROM exhibition_bookings eb
+    JOIN (
+        SELECT ticket_code, MIN(id) AS kept_id FROM exhibition_bookings
+        WHERE ticket_code IS NOT NULL
+        GROUP BY ticket_code
+        HAVING COUNT(*) > 1
+    ) duplicates ON duplicates.ticket_code = eb.ticket_code AND eb.id <> duplicates.kept_id
+    ORDER BY eb.id
+    """)
+    bookings = cursor.fetchall()
+
+    for booking_id, old_code in bookings:
+        while True:
+            code = _ticket_code_v3()
+            cursor.execute("SELECT 1 FROM exhibition_bookings WHERE ticket_code = %s LIMIT 1", (code,))
+            if not cursor.fetchone():
+                break
+        cursor.execute("UPDATE exhibition_bookings SET ticket_code = %s WHERE id = %s", (code, booking_id))
+        print(f"  Booking {booking_id}: duplicate ticket code {old_code} reissued as {code}")
+    connection.commit()
+
+def _reissue_duplicate_ticket_codes(cursor):
+    """Make existing ticket codes unique before the unique index is built; runs on its own connection"""
+    _run_backfill("Duplicate ticket code reissue", _reissue_duplicate_ticket_codes_v3)
+
+def _id_chunks(cursor, table, size):
+    """Yield (first_id, last_id) ranges covering a table"""
+    cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+    low, high = cursor.fetchone()
+    if low is None:
+        return
+    for start in range(low, high + 1, size):
+        yield start, start + size - 1
+
+def _count_artist_stats_v6(connection, cursor):
+    """Recount every artist and artwork counter, 500 rows per transaction, locking each chunk first"""
+    artworks_updated = 0
+    artists_updated = 0
+
+    for first_id, last_id in list(_id_chunks(cursor, 'artworks', 500)):
+        cursor.execute("SELECT id FROM artworks WHERE id BETWEEN %s AND %s FOR UPDATE", (first_id, last_id))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            connection.commit()
+            continue
+
+        cursor.execute("""
+        SELECT artwork_id, COUNT(*) FROM artwork_orders
+        WHERE artwork_id BETWEEN %s AND %s
+        GROUP BY artwork_id
+        """, (first_id, last_id))
+        counts = dict(cursor.fetchall())
+
+        cursor.executemany(
+            "UPDATE artworks SET order_count = %s WHERE id = %s",
+            [(counts.get(artwork_id, 0), artwork_id) for artwork_id in ids]
+        )
+        connection.commit()
+        artworks_updated += len(ids)
+
+    for first_id, last_id in list(_id_chunks(cursor, 'artists', 500)):
+        cursor.execute("SELECT id FROM artists WHERE id BETWEEN %s AND %s FOR UPDATE", (first_id, last_id))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            connection.commit()
+            continue
+
+        cursor.execute("""
+        SELECT artist_id, COUNT(*) FROM artworks
+        WHERE artist_id BETWEEN %s AND %s
+        GROUP BY artist_id
+        """, (first_id, last_id))
+        artwork_counts = dict(cursor.fetchall())
+
+        cursor.execute("""
+        SELECT a.artist_id, COUNT(*),
+               COALESCE(SUM(CASE WHEN ao.payment_status = 'completed' THEN ao.total_amount END), 0)
+        FROM artwork_orders ao
+        JOIN artworks a ON a.id = ao.artwork_id
+        WHERE a.artist_id BETWEEN %s AND %s
+        GROUP BY a.artist_id
+        """, (first_id, last_id))
+        order_totals = {artist_id: (count, revenue) for artist_id, count, revenue in cursor.fetchall()}
+
+        cursor.executemany("""
+        UPDATE artists SET artwork_count = %s, order_count = %s, revenue = %s WHERE id = %s
+        """, [
+            (artwork_counts.get(artist_id, 0), *order_totals.get(artist_id, (0, 0)), artist_id)
+            for artist_id in ids
+        ])
+        connection.commit()
+        artists_updated += len(ids)
+
+    print(f"  Backfilled counters for {artists_updated} artists and {artworks_updated} artworks")
+
+def _backfill_artist_counters(cursor):
+    """Fill the new counter columns; runs on its own connection, chunk by chunk"""
+    _run_backfill("Counter backfill", _count_artist_stats_v6)
+
+def _resolve_artist_ids_v7(connection, cursor):
+    """Assign each unowned artwork to the only artist with its artist name, and count it for them"""
+    assigned = 0
+    last_id = 0
+
+    while True:
+        cursor.execute("""
+        SELECT id, artist FROM artworks
+        WHERE artist_id IS NULL AND id > %s
+        ORDER BY id
+        LIMIT 1000
+        """, (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        names = list({name for _, name in rows if name})
+        ids_by_name = {}
+        if names:
+            placeholders = ', '.join(['%s'] * len(names))
+            cursor.execute(f"""
+            SELECT name, MIN(id) FROM artists
+            WHERE name IN ({placeholders})
+            GROUP BY name
+            HAVING COUNT(*) = 1
+            """, tuple(names))
+            ids_by_name = dict(cursor.fetchall())
+
+        for artwork_id, name in rows:
+            artist_id = ids_by_name.get(name)
+            if artist_id is None:
+                continue
+            cursor.execute(
+                "UPDATE artworks SET artist_id = %s WHERE id = %s AND artist_id IS NULL",
+                (artist_id, artwork_id)
+            )
+            if cursor.rowcount != 1:
+                continue
+            cursor.execute("""
+            SELECT a.order_count, COALESCE(SUM(ao.total_amount), 0)
+            FROM artworks a
+            LEFT JOIN artwork_orders ao ON ao.artwork_id = a.id AND ao.payment_status = 'completed'
+            WHERE a.id = %s
+            GROUP BY a.id, a.order_count
+            """, (artwork_id,))
+            order_count, revenue = cursor.fetchone()
+            cursor.execute("""
+            UPDATE artists
+            SET artwork_count = artwork_count + 1,
+                order_count = order_count + %s,
+                revenue = revenue + %s
+            WHERE id = %s
+            """, (order_count, revenue, artist_id))
+            assigned += 1
+        connection.commit()
+
+    print(f"  Assigned artist_id to {assigned} artworks")
+
+def _backfill_artist_ids(cursor):
+    """Resolve artist_id for artworks matched by name only; runs on its own connection"""
+    _run_backfill("artist_id backfill", _resolve_artist_ids_v7)
+
+def _fill_sales_rollup_v8(connection, cursor):
+    """Fill daily_sales_rollup from every order and booking in one transaction"""
+    cursor.execute("DELETE FROM daily_sales_rollup")
+    cursor.execute("""
+    INSERT INTO daily_sales_rollup (day, kind, exhibition_id, artist_id, orders, paid_orders, revenue, slots)
+    SELECT DATE(ao.order_date), 'artwork', 0, COALESCE(a.artist_id, 0),
+           COUNT(*),
+           SUM(ao.payment_status = 'completed'),
+           COALESCE(SUM(CASE WHEN ao.payment_status = 'completed' THEN ao.total_amount END), 0),
+           0
+    FROM artwork_orders ao
+    JOIN artworks a ON a.id = ao.artwork_id
+    GROUP BY DATE(ao.order_date), COALESCE(a.artist_id, 0)
+    """)
+    cursor.execute("""
+    INSERT INTO daily_sales_rollup (day, kind, exhibition_id, artist_id, orders, paid_orders, revenue, slots)
+    SELECT DATE(eb.booking_date), 'ticket', eb.exhibition_id, 0,
+           COUNT(*),
+           SUM(eb.payment_status = 'completed'),
+           COALESCE(SUM(CASE WHEN eb.payment_status = 'completed' THEN eb.total_amount END), 0),
+           COALESCE(SUM(CASE WHEN eb.payment_status = 'completed' THEN eb.slots END), 0)
+    FROM exhibition_bookings eb
+    GROUP BY DATE(eb.booking_date), eb.exhibition_id
+    """)
+    connection.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM daily_sales_rollup")
+    print(f"  Built sales rollup: {cursor.fetchone()[0]} rows")
+
+def _rebuild_sales_rollup(cursor):
+    """Build daily_sales_rollup from every existing order and booking"""
+    _run_backfill("Sales rollup rebuild", _fill_sales_rollup_v8)
+
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        phone VARCHAR(20),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admins (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS artists (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        bio TEXT,
+        profile_image_url VARCHAR(255),
+        phone VARCHAR(20),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS artworks (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        artist VARCHAR(255) NOT NULL,
+        artist_id INT,
+        description TEXT,
+        price DECIMAL(10, 2) NOT NULL,
+        dimensions VARCHAR(100),
+        medium VARCHAR(100),
+        year INT,
+        image_url VARCHAR(255),
+        status ENUM('available', 'sold') DEFAULT 'available',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (artist_id) REFERENCES artists(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS exhibitions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        location VARCHAR(255) NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        ticket_price DECIMAL(10, 2) NOT NULL,
+        image_url VARCHAR(255),
+        total_slots INT NOT NULL,
+        available_slots INT NOT NULL,
+        status ENUM('upcoming', 'ongoing', 'past') NOT NULL DEFAULT 'upcoming',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS artwork_orders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        artwork_id INT NOT NULL,
+        name VARCHAR(255),
+        email VARCHAR(255),
+        phone VARCHAR(20),
+        delivery_address TEXT,
+        payment_method ENUM('mpesa', 'card', 'bank') DEFAULT 'mpesa',
+        payment_status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
+        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total_amount DECIMAL(10, 2) NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (artwork_id) REFERENCES artworks(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS exhibition_bookings (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        exhibition_id INT NOT NULL,
+        name VARCHAR(255),
+        email VARCHAR(255),
+        phone VARCHAR(20),
+        ticket_code VARCHAR(50),
+        slots INT NOT NULL DEFAULT 1,
+        payment_method ENUM('mpesa', 'card', 'bank') DEFAULT 'mpesa',
+        payment_status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
+        status ENUM('active', 'used', 'cancelled') DEFAULT 'active',
+        booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total_amount DECIMAL(10, 2) NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (exhibition_id) REFERENCES exhibitions(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tickets (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        exhibition_id INT NOT NULL,
+        ticket_code VARCHAR(50) NOT NULL UNIQUE,
+        slots INT NOT NULL,
+        status ENUM('active', 'used', 'cancelled') NOT NULL DEFAULT 'active',
+        booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (exhibition_id) REFERENCES exhibitions(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        type ENUM('artwork', 'exhibition') NOT NULL,
+        reference_id INT NOT NULL,
+        amount DECIMAL(10, 2) NOT NULL,
+        status ENUM('pending', 'completed', 'cancelled') NOT NULL DEFAULT 'pending',
+        payment_method VARCHAR(50),
+        payment_status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS contact_messages (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        phone VARCHAR(20),
+        message TEXT NOT NULL,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status ENUM('new', 'read', 'replied') NOT NULL DEFAULT 'new',
+        source VARCHAR(50) DEFAULT 'contact_form'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS mpesa_transactions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        checkout_request_id VARCHAR(100) NOT NULL,
+        merchant_request_id VARCHAR(100) NOT NULL,
+        order_type VARCHAR(20) NOT NULL,
+        order_id INT NOT NULL,
+        user_id INT NOT NULL,
+        amount DECIMAL(10, 2) NOT NULL,
+        phone_number VARCHAR(20) NOT NULL,
+        result_code VARCHAR(10),
+        result_desc VARCHAR(255),
+        transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+]
+
+# (version, description, steps) - append only
+MIGRATIONS = [
+    (1, "Create base tables", BASE_TABLES),
+    (2, "Add columns missing from tables created by the old initialize_database", [
+        add_column('artworks', 'artist_id', "INT NULL AFTER artist"),
+        add_index('artworks', 'artist_id', ['artist_id']),
+        add_column('exhibition_bookings', 'ticket_code', "VARCHAR(50) NULL AFTER phone"),
+        add_column('exhibition_bookings', 'status', "ENUM('active', 'used', 'cancelled') DEFAULT 'active' AFTER payment_status"),
+        add_column('contact_messages', 'source', "VARCHAR(50) DEFAULT 'contact_form'"),
+    ]),
+    (3, "Make ticket codes unique", [
+        _reissue_duplicate_ticket_codes,
+        add_index('exhibition_bookings', 'ticket_code', ['ticket_code'], unique=True),
+    ]),
+    (4, "Index bookings and orders for paginated listings and order history", [
+        add_index('exhibition_bookings', 'idx_bookings_exhibition_date', ['exhibition_id', 'booking_date']),
+        add_index('exhibition_bookings', 'idx_bookings_user_date', ['user_id', 'booking_date']),
+        add_index('exhibition_bookings', 'idx_bookings_booking_date', ['booking_date']),
+        add_index('artwork_orders', 'idx_artwork_orders_user_date', ['user_id', 'order_date']),
+    ]),
+    (5, "Index catalog, inbox and payment lookups found by the query profiler", [
+        add_index('artworks', 'idx_artworks_created_at', ['created_at']),
+        add_index('artworks', 'idx_artworks_artist', ['artist']),
+        add_index('contact_messages', 'idx_contact_messages_date', ['date']),
+        add_index('mpesa_transactions', 'idx_mpesa_checkout_request', ['checkout_request_id']),
+    ]),
+    (6, "Add denormalized artist and artwork counters", [
+        add_column('artists', 'artwork_count', "INT NOT NULL DEFAULT 0"),
+        add_column('artists', 'order_count', "INT NOT NULL DEFAULT 0"),
+        add_column('artists', 'revenue', "DECIMAL(12, 2) NOT NULL DEFAULT 0"),
+        add_column('artworks', 'order_count', "INT NOT NULL DEFAULT 0"),
+        _backfill_artist_counters,
+    ]),
+    (7, "Resolve artworks.artist_id from artist names and index artist listings", [
+        add_index('artists', 'idx_artists_name', ['name']),
+        add_index('artworks', 'idx_artworks_artist_created', ['artist_id', 'created_at']),
+        _backfill_artist_ids,
+    ]),
+    (8, "Add the daily sales rollup behind /reports", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+            day DATE NOT NULL,
+            kind ENUM('artwork', 'ticket') NOT NULL,
+            exhibition_id INT NOT NULL DEFAULT 0,
+            artist_id INT NOT NULL DEFAULT 0,
+            orders INT NOT NULL DEFAULT 0,
+            paid_orders INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            slots INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, kind, exhibition_id, artist_id)
+        )
+        """,
+        _rebuild_sales_rollup,
+    ]),
+    (9, "Add the artwork_neighbors table behind /artworks/:id/similar", [
+        """
+        CREATE TABLE IF NOT EXISTS artwork_neighbors (
+            artwork_id INT NOT NULL,
+            neighbor_id INT NOT NULL,
+            score FLOAT NOT NULL,
+            PRIMARY KEY (artwork_id, neighbor_id),
+            INDEX idx_artwork_neighbors_neighbor (neighbor_id)
+        )
+        """,
+    ]),
+    (10, "Add daily page view counts for trending artworks and exhibitions", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_view_counts (
+            day DATE NOT NULL,
+            kind ENUM('artwork', 'exhibition') NOT NULL,
+            item_id INT NOT NULL,
+            views INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, day, item_id)
+        )
+        """,
+    ]),
+    (11, "Index pending M-Pesa transactions for the reconciliation job", [
+        add_index('mpesa_transactions', 'idx_mpesa_status_date', ['status', 'transaction_date']),
+    ]),
+    (12, "Index pending orders and bookings for the expiry job", [
+        add_index('artwork_orders', 'idx_artwork_orders_status_date', ['payment_status', 'order_date']),
+        add_index('exhibition_bookings', 'idx_bookings_status_date', ['payment_status', 'booking_date']),
+    ]),
+    (13, "Add archive tables for old bookings, artwork orders and M-Pesa transactions", [
+        "CREATE TABLE IF NOT EXISTS artwork_orders_archive LIKE artwork_orders",
+        "CREATE TABLE IF NOT EXISTS exhibition_bookings_archive LIKE exhibition_bookings",
+        "CREATE TABLE IF NOT EXISTS mpesa_transactions_archive LIKE mpesa_transactions",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _ensure_version_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+def _applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_version")
+    return {row[0] for row in cursor.fetchall()}
+
+def get_schema_version():
+    """Return the highest applied migration version, 0 if none, or None if the database is unreachable
+
+    This is a single indexed read and is safe to call at server startup.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        return None
+
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+        return row[0] or 0
+    except Error:
+        # schema_version does not exist yet - nothing has been migrated
+        return 0
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def check_schema_version():
+    """Warn at startup if the database is behind the code; returns True when up to date"""
+    version = get_schema_version()
+    if version is None:
+        print("Could not read schema version - database connection failed")
+        return False
+    if version < LATEST_VERSION:
+        print(f"WARNING: database schema is at version {version}, code expects {LATEST_VERSION}. "
+              f"Run 'python migrations.py' to apply pending migrations.")
+        return False
+    print(f"Database schema is up to date (version {version})")
+    return True
+
+def apply_pending_migrations():
+    """Apply every migration not yet recorded in schema_version, in order"""
+    connection = get_db_connection()
+    if connection is None:
+        print("Failed to connect to database")
+        return False
+
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            print("Another process is applying migrations - try again later")
+            return False
+
+        try:
+            _ensure_version_table(cursor)
+            applied = _applied_versions(cursor)
+            pending = [m for m in MIGRATIONS if m[0] not in applied]
+
+            if not pending:
+                print(f"No pending migrations (schema version {LATEST_VERSION})")
+                return True
+
+            for version, description, steps in pending:
+                print(f"Applying migration {version}: {description}")
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                # DDL commits implicitly in MySQL, so each migration is recorded as soon as its steps succeed
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+
+            print(f"Database migrated to version {LATEST_VERSION}")
+            return True
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchone()
+    except Error as e:
+        print(f"Error applying migrations: {e}")
+        return False
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def print_status():
+    """List applied and pending migrations"""
+    connection = get_db_connection()
+    if connection is None:
+        print("Failed to connect to database")
+        return
+
+    cursor = connection.cursor()
+
+    try:
+        _ensure_version_table(cursor)
+        applied = _applied_versions(cursor)
+        for version, description, _ in MIGRATIONS:
+            state = "applied" if version in applied else "pending"
+            print(f"{version:>4}  {state:<8} {description}")
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def create_database():
+    """Create the configured database if it doesn't exist"""
+    try:
+        conn = mysql.connector.connect(
+            host=DB_CONFIG['host'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password']
+        )
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
+        print(f"Database '{DB_CONFIG['database']}' created or already exists")
+        conn.close()
+    except Error as err:
+        print(f"Error creating database: {err}")
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        print_status()
+    else:
+        create_database()
+        sys.exit(0 if apply_pending_migrations() else 1)
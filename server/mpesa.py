@@ -3,8 +3,11 @@ import base64
 import json
 from datetime import datetime
 import time
-from db_setup import get_db_connection, dict_from_row
+from database import get_db_connection, dict_from_row
 from mysql.connector import Error
+from artist_stats import order_payment_changed
+from sales_rollup import payment_changed
+from response_cache import invalidate, ARTWORKS, EXHIBITIONS
 
 # M-Pesa API credentials
 CONSUMER_KEY = "sMwMwGZ8oOiSkNrUIrPbcCeWIO8UiQ3SV4CyX739uAyZVs1F"
@@ -14,6 +17,13 @@ PASSKEY = "bfb279f9aa9bdbcf158e97dd71a467cd2e0c893059b10f78e6b72ada1ed2c919"
 CALLBACK_URL = "https://webhook.site/3c1f62b5-4214-47d6-9f26-71c1f4b9c8f0"
 API_BASE_URL = "https://sandbox.safaricom.co.ke"
 
+# Pending transactions are queried once their callback is this late...
+RECONCILE_AFTER_MINUTES = 2
+# ...until they are this old; STK pushes expire long before then
+RECONCILE_WITHIN_HOURS = 24
+# Status queries per reconciliation run
+RECONCILE_BATCH_SIZE = 50
+
 def get_access_token():
     """Get OAuth access token from M-Pesa"""
     url = f"{API_BASE_URL}/oauth/v1/generate?grant_type=client_credentials"
@@ -214,6 +224,49 @@ def check_transaction_status(checkout_request_id):
             cursor.close()
             connection.close()
 
+def reconcile_pending_transactions():
+    """Query M-Pesa for pending transactions whose callback never arrived"""
+    connection = get_db_connection()
+    if not connection:
+        return {"error": "Database connection failed"}
+    
+    cursor = connection.cursor()
+    
+    try:
+        # Oldest first within the window, read from idx_mpesa_status_date
+        query = """
+        SELECT checkout_request_id, order_type, order_id FROM mpesa_transactions
+        WHERE status = 'pending'
+        AND transaction_date BETWEEN NOW() - INTERVAL %s HOUR AND NOW() - INTERVAL %s MINUTE
+        ORDER BY transaction_date
+        LIMIT %s
+        """
+        cursor.execute(query, (RECONCILE_WITHIN_HOURS, RECONCILE_AFTER_MINUTES, RECONCILE_BATCH_SIZE))
+        pending = cursor.fetchall()
+    except Exception as e:
+        print(f"Error reading pending transactions: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+    
+    counts = {"checked": len(pending), "completed": 0, "failed": 0, "pending": 0, "errors": 0}
+    for checkout_request_id, order_type, order_id in pending:
+        result = check_transaction_status(checkout_request_id)
+        status = result.get("status")
+        if "error" in result or status not in counts:
+            counts["errors"] += 1
+            continue
+        if status == "failed":
+            # The callback would have failed the order as well
+            update_order_status(order_type, order_id, "failed")
+        counts[status] += 1
+    
+    if pending:
+        print(f"Reconciled M-Pesa transactions: {counts}")
+    return {"success": True, **counts}
+
 def save_transaction_request(checkout_request_id, merchant_request_id, order_type, order_id, user_id, amount, phone_number):
     """Save M-Pesa transaction request to database"""
     connection = get_db_connection()
@@ -282,12 +335,23 @@ def update_order_status(order_type, order_id, payment_status):
     
     try:
         if order_type == "artwork":
+            # Lock the order so the revenue counters move exactly once per status change
+            cursor.execute("SELECT payment_status FROM artwork_orders WHERE id = %s FOR UPDATE", (order_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            previous_status = row[0]
             query = """
             UPDATE artwork_orders
             SET payment_status = %s
             WHERE id = %s
             """
         elif order_type == "exhibition":
+            cursor.execute("SELECT payment_status FROM exhibition_bookings WHERE id = %s FOR UPDATE", (order_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            previous_status = row[0]
             query = """
             UPDATE exhibition_bookings
             SET payment_status = %s
@@ -297,6 +361,9 @@ def update_order_status(order_type, order_id, payment_status):
             return False
         
         cursor.execute(query, (payment_status, order_id))
+        if order_type == "artwork":
+            order_payment_changed(cursor, order_id, previous_status, payment_status)
+        payment_changed(cursor, 'artwork' if order_type == "artwork" else 'ticket', order_id, previous_status, payment_status)
         connection.commit()
         
         # If it's an artwork order and payment is completed, update artwork status
@@ -309,6 +376,7 @@ def update_order_status(order_type, order_id, payment_status):
             """
             cursor.execute(query, (order_id,))
             connection.commit()
+            invalidate(ARTWORKS)
         
         # If it's an exhibition booking and payment is completed, update available slots
         if order_type == "exhibition" and payment_status == "completed":
@@ -320,6 +388,7 @@ def update_order_status(order_type, order_id, payment_status):
             """
             cursor.execute(query, (order_id,))
             connection.commit()
+            invalidate(EXHIBITIONS)
         
         return True
     except Error as e:
@@ -0,0 +1,101 @@
+"""Expiry of abandoned pending orders and bookings
+
+Every STK push creates a pending artwork order or booking, and one whose customer never
+pays stays pending for good. expire_abandoned_orders() marks pending artwork_orders,
+exhibition_bookings and mpesa_transactions older than ORDER_EXPIRY_HOURS as failed. Each
+table is walked oldest first through its (payment_status, date) index in chunks of
+EXPIRY_CHUNK_SIZE rows, one short transaction per chunk, so checkout writes wait at
+most for one chunk.
+
+Rows are marked rather than deleted: order counts and the sales rollup keep counting
+placed orders, and a payment that completes after all (a late callback) moves the row to
+completed through update_order_status as usual. The revenue helpers are still called per
+row so the counters stay consistent whatever the transition.
+
+The scheduler runs this hourly; to run it by hand:
+
+    python order_expiry.py
+"""
+import os
+from database import get_db_connection
+from artist_stats import order_payment_changed
+from sales_rollup import payment_changed
+
+# Pending rows older than this are treated as abandoned; later than M-Pesa reconciliation gives up
+ORDER_EXPIRY_HOURS = int(os.environ.get('ORDER_EXPIRY_HOURS', '48'))
+# Rows marked per transaction
+EXPIRY_CHUNK_SIZE = 500
+
+def _expire_chunk(cursor, table, date_column, hours):
+    """Mark one chunk of a table's abandoned rows failed; returns their ids"""
+    cursor.execute(f"""
+    SELECT id FROM {table}
+    WHERE payment_status = 'pending' AND {date_column} < NOW() - INTERVAL %s HOUR
+    ORDER BY {date_column}
+    LIMIT %s
+    FOR UPDATE
+    """, (hours, EXPIRY_CHUNK_SIZE))
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"UPDATE {table} SET payment_status = 'failed' WHERE id IN ({placeholders})", ids)
+    return ids
+
+def expire_abandoned_orders(hours=ORDER_EXPIRY_HOURS):
+    """Mark pending orders, bookings and M-Pesa transactions older than the given hours as failed"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+    counts = {"orders": 0, "bookings": 0, "transactions": 0}
+
+    try:
+        while True:
+            ids = _expire_chunk(cursor, 'artwork_orders', 'order_date', hours)
+            for order_id in ids:
+                order_payment_changed(cursor, order_id, 'pending', 'failed')
+                payment_changed(cursor, 'artwork', order_id, 'pending', 'failed')
+            connection.commit()
+            counts["orders"] += len(ids)
+            if len(ids) < EXPIRY_CHUNK_SIZE:
+                break
+
+        while True:
+            ids = _expire_chunk(cursor, 'exhibition_bookings', 'booking_date', hours)
+            for booking_id in ids:
+                payment_changed(cursor, 'ticket', booking_id, 'pending', 'failed')
+            connection.commit()
+            counts["bookings"] += len(ids)
+            if len(ids) < EXPIRY_CHUNK_SIZE:
+                break
+
+        # Same walk over idx_mpesa_status_date; the transaction's order was expired above
+        while True:
+            cursor.execute("""
+            UPDATE mpesa_transactions
+            SET status = 'failed', result_desc = 'Expired without a payment callback'
+            WHERE status = 'pending' AND transaction_date < NOW() - INTERVAL %s HOUR
+            ORDER BY transaction_date
+            LIMIT %s
+            """, (hours, EXPIRY_CHUNK_SIZE))
+            expired = cursor.rowcount
+            connection.commit()
+            counts["transactions"] += expired
+            if expired < EXPIRY_CHUNK_SIZE:
+                break
+
+        if any(counts.values()):
+            print(f"Expired abandoned orders: {counts}")
+        return {"success": True, **counts}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error expiring abandoned orders: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+if __name__ == "__main__":
+    print(expire_abandoned_orders())
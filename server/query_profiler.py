@@ -0,0 +1,251 @@
+"""Capture timings for every statement executed through get_db_connection and suggest indexes
+
+Profiling is off by default. Set DB_PROFILE=1 to wrap every connection handed out by
+database.get_db_connection; statements slower than DB_SLOW_QUERY_MS are logged as they run
+and per-statement totals are kept in memory. benchmarks/index_advisor.py drives the hot read
+paths against a seeded database and prints the report plus any index migrations to add.
+"""
+import os
+import re
+import threading
+import time
+
+PROFILE_ENABLED = os.environ.get('DB_PROFILE') == '1'
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', '100'))
+
+# normalized statement -> QueryStats
+_stats = {}
+_stats_lock = threading.Lock()
+
+class QueryStats:
+    """Running totals for one normalized statement"""
+
+    __slots__ = ('sql', 'calls', 'total_ms', 'max_ms', 'sample_params')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.sample_params = None
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement from different call sites is counted once"""
+    return ' '.join(sql.split())
+
+def _record(sql, params, elapsed_ms, new_call=True):
+    with _stats_lock:
+        stats = _stats.get(sql)
+        if stats is None:
+            stats = _stats[sql] = QueryStats(sql)
+        if new_call:
+            stats.calls += 1
+            if params is not None:
+                stats.sample_params = params
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+
+class ProfiledCursor:
+    """Cursor proxy timing execute and the fetches that read its result"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._last_sql = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, sql, params, call):
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _record(sql, params, elapsed_ms)
+            if elapsed_ms >= SLOW_QUERY_MS:
+                print(f"Slow query ({elapsed_ms:.1f} ms): {sql[:300]}")
+
+    def execute(self, operation, params=None, **kwargs):
+        self._last_sql = normalize_sql(operation)
+        if params is None:
+            return self._timed(self._last_sql, None, lambda: self._cursor.execute(operation, **kwargs))
+        return self._timed(self._last_sql, params, lambda: self._cursor.execute(operation, params, **kwargs))
+
+    def executemany(self, operation, seq_params):
+        self._last_sql = normalize_sql(operation)
+        return self._timed(self._last_sql, None, lambda: self._cursor.executemany(operation, seq_params))
+
+    def _fetch(self, method, *args):
+        # Unbuffered cursors read rows during fetch, so that time belongs to the statement too
+        start = time.perf_counter()
+        try:
+            return getattr(self._cursor, method)(*args)
+        finally:
+            if self._last_sql is not None:
+                _record(self._last_sql, None, (time.perf_counter() - start) * 1000, new_call=False)
+
+    def fetchone(self):
+        return self._fetch('fetchone')
+
+    def fetchmany(self, size=1):
+        return self._fetch('fetchmany', size)
+
+    def fetchall(self):
+        return self._fetch('fetchall')
+
+class ProfiledConnection:
+    """Connection proxy whose cursors are profiled"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._connection.cursor(*args, **kwargs))
+
+def wrap_connection(connection):
+    """Return a profiled proxy for a connection"""
+    return ProfiledConnection(connection)
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+
+def slowest_queries(limit=10):
+    """Statements ordered by total time spent in them"""
+    with _stats_lock:
+        stats = list(_stats.values())
+    return sorted(stats, key=lambda s: s.total_ms, reverse=True)[:limit]
+
+def print_report(limit=10):
+    """Print the statements that took the most total time"""
+    print(f"{'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  statement")
+    for stats in slowest_queries(limit):
+        print(f"{stats.calls:>7} {stats.total_ms:>10.1f} {stats.mean_ms:>9.2f} {stats.max_ms:>9.2f}  {stats.sql[:120]}")
+
+# Index advice
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|JOIN|LEFT|RIGHT|INNER|ON|ORDER|GROUP|LIMIT|UNION)(\w+))?', re.IGNORECASE)
+_EQUALITY = re.compile(r'\b(?:(\w+)\.)?(\w+)\s*=\s*%s', re.IGNORECASE)
+_ORDER_BY = re.compile(r'\bORDER BY\s+(.+?)(?:\bLIMIT\b|\)|$)', re.IGNORECASE)
+
+def _table_aliases(sql):
+    """Map each alias (and table name) in a statement to its table"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table.lower()] = table
+        if alias:
+            aliases[alias.lower()] = table
+    return aliases
+
+def _columns_for(sql, table):
+    """Equality-filter columns followed by ORDER BY columns that belong to a table"""
+    aliases = _table_aliases(sql)
+    single_table = len(set(aliases.values())) == 1
+
+    def owned(prefix):
+        if prefix:
+            return aliases.get(prefix.lower()) == table
+        return single_table
+
+    columns = []
+    where = sql.split(' ORDER BY ')[0]
+    for prefix, column in _EQUALITY.findall(where):
+        if owned(prefix) and column not in columns:
+            columns.append(column)
+
+    order = _ORDER_BY.search(sql)
+    if order:
+        for term in order.group(1).split(','):
+            ref = term.strip().split()[0] if term.strip() else ''
+            prefix, _, column = ref.rpartition('.')
+            if column and owned(prefix) and column not in columns:
+                columns.append(column)
+    return columns
+
+def _existing_index_prefixes(cursor, table):
+    """Leading column lists of every index already on a table"""
+    cursor.execute("""
+    SELECT index_name, column_name FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s
+    ORDER BY index_name, seq_in_index
+    """, (table,))
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name.lower())
+    return list(indexes.values())
+
+def explain(cursor, sql, params=None):
+    """Run EXPLAIN for a statement and return its plan rows as dicts"""
+    if params is None:
+        cursor.execute("EXPLAIN " + sql)
+    else:
+        cursor.execute("EXPLAIN " + sql, params)
+    names = cursor.column_names
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+def recommend_indexes(connection, limit=10):
+    """EXPLAIN the slowest captured SELECTs and suggest indexes for full scans and filesorts
+
+    Returns a list of {"table", "columns", "name", "reason", "sql"} dicts, one per distinct index.
+    """
+    cursor = connection.cursor()
+    recommendations = {}
+
+    try:
+        for stats in slowest_queries(limit):
+            if not stats.sql.upper().startswith('SELECT'):
+                continue
+            try:
+                plan = explain(cursor, stats.sql, stats.sample_params)
+            except Exception as e:
+                print(f"Could not EXPLAIN {stats.sql[:80]}: {e}")
+                continue
+
+            aliases = _table_aliases(stats.sql)
+            for step in plan:
+                table = aliases.get(str(step.get('table') or '').lower())
+                extra = step.get('Extra') or ''
+                if not table:
+                    continue
+                if step.get('type') != 'ALL' and 'Using filesort' not in extra:
+                    continue
+
+                columns = _columns_for(stats.sql, table)
+                if not columns:
+                    continue
+                existing = _existing_index_prefixes(cursor, table)
+                if any(index[:len(columns)] == [c.lower() for c in columns] for index in existing):
+                    continue
+
+                name = f"idx_{table}_{'_'.join(columns)}"
+                reason = "full table scan" if step.get('type') == 'ALL' else "filesort"
+                recommendations.setdefault(name, {
+                    "table": table,
+                    "columns": columns,
+                    "name": name,
+                    "reason": f"{reason}, {stats.calls} calls, {stats.total_ms:.1f} ms total",
+                    "sql": stats.sql,
+                })
+    finally:
+        cursor.close()
+
+    return list(recommendations.values())
+
+def format_migration(recommendations, version):
+    """Render recommendations as a MIGRATIONS entry to paste into migrations.py"""
+    lines = [f'    ({version}, "Add indexes suggested by the query profiler", [']
+    for rec in recommendations:
+        columns = ', '.join(f"'{c}'" for c in rec['columns'])
+        lines.append(f"        add_index('{rec['table']}', '{rec['name']}', [{columns}]),  # {rec['reason']}")
+    lines.append('    ]),')
+    return '\n'.join(lines)
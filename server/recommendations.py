@@ -0,0 +1,304 @@
+"""Personalized artwork recommendations (GET /recommendations/{user_id})
+
+A batch job reads the catalog, every artwork order and exhibition booking, and builds a
+RecommendationModel: the available artworks as NumPy arrays (artist, medium, log price,
+popularity from orders and recent page views) and, for each user with history, affinity vectors over artists and mediums
+plus the log-price range they buy in. Exhibition bookings add the artists that other
+visitors of the same exhibitions bought from. A request scores every available artwork
+for the user in a few vectorized operations and keeps the top ones.
+
+The model is rebuilt every RECOMMENDATION_REFRESH_SECONDS. Ranked lists are cached per
+user until the next rebuild or until the user places an order; artworks sold since the
+rebuild are dropped when the list is read.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from database import get_db_connection
+from artwork import get_artworks_by_ids
+
+# Seconds between rebuilds of the model
+RECOMMENDATION_REFRESH_SECONDS = float(os.environ.get('RECOMMENDATION_REFRESH_SECONDS', '900'))
+# Users whose ranked lists are kept in memory
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', '10000'))
+
+DEFAULT_RECOMMENDATIONS = 6
+MAX_RECOMMENDATIONS = 20
+# Ranked ids cached per user; more than are shown so sold artworks can be skipped
+CACHED_RANKING_DEPTH = 3 * MAX_RECOMMENDATIONS
+
+# Score weights: favourite artist, favourite medium, usual price range, an artist the
+# user has not bought from yet, and how often the artwork is ordered and viewed
+ARTIST_WEIGHT = 50.0
+MEDIUM_WEIGHT = 20.0
+PRICE_WEIGHT = 15.0
+DISCOVERY_WEIGHT = 5.0
+POPULARITY_WEIGHT = 10.0
+
+# Popularity counts an order as this many page views
+ORDER_VIEW_EQUIVALENT = 50
+# Days of page views that count towards popularity
+POPULARITY_VIEW_DAYS = 30
+
+# Share of artist affinity that comes from exhibitions the user booked
+BOOKING_AFFINITY_WEIGHT = 0.5
+# Narrowest price preference, in log-price units, for users with a single purchase
+MIN_PRICE_SPREAD = 0.35
+
+class RecommendationModel:
+    """Catalog arrays and per-user affinities from one batch run
+
+    artworks: (id, artist, medium, price, status, order_count, recent_views) rows
+    orders: (user_id, artwork_id) rows
+    bookings: (user_id, exhibition_id) rows
+    attendance: (exhibition_id, artist, orders) rows - artworks bought by each exhibition's visitors
+    """
+
+    def __init__(self, artworks, orders, bookings, attendance):
+        artist_codes = {}
+        medium_codes = {}
+        count = len(artworks)
+        ids = np.empty(count, dtype=np.int64)
+        artists = np.empty(count, dtype=np.int32)
+        mediums = np.empty(count, dtype=np.int32)
+        log_prices = np.empty(count, dtype=np.float64)
+        available = np.empty(count, dtype=bool)
+        interest = np.empty(count, dtype=np.float64)
+        for row, (artwork_id, artist, medium, price, status, order_count, views) in enumerate(artworks):
+            ids[row] = artwork_id
+            artists[row] = artist_codes.setdefault(artist, len(artist_codes))
+            mediums[row] = medium_codes.setdefault(medium, len(medium_codes))
+            log_prices[row] = np.log1p(float(price or 0))
+            available[row] = status == 'available'
+            interest[row] = (order_count or 0) * ORDER_VIEW_EQUIVALENT + (views or 0)
+        self.artist_count = max(len(artist_codes), 1)
+        self.medium_count = max(len(medium_codes), 1)
+
+        # Candidates: available artworks only, in arrays aligned with each other
+        self.ids = ids[available]
+        self.artists = artists[available]
+        self.mediums = mediums[available]
+        self.log_prices = log_prices[available]
+        popularity = np.log1p(interest[available])
+        self.popularity = popularity / popularity.max() if popularity.size and popularity.max() > 0 else popularity
+
+        # Users with no history get the most popular, then newest, available artworks
+        self.popular = self.ids[np.lexsort((-self.ids, -self.popularity))][:CACHED_RANKING_DEPTH].tolist()
+
+        self.users = {}
+        row_of = {artwork_id: row for row, artwork_id in enumerate(ids.tolist())}
+        order_users = np.array([user_id for user_id, artwork_id in orders if artwork_id in row_of], dtype=np.int64)
+        order_rows = np.array([row_of[artwork_id] for _, artwork_id in orders if artwork_id in row_of], dtype=np.int64)
+        booked = {}
+        for user_id, exhibition_id in bookings:
+            booked.setdefault(user_id, []).append(exhibition_id)
+        exhibition_artists = self._exhibition_affinities(attendance, artist_codes)
+
+        user_ids = np.unique(np.concatenate([order_users, np.array(list(booked), dtype=np.int64)]))
+        user_index = {user_id: position for position, user_id in enumerate(user_ids.tolist())}
+        dense_users = np.array([user_index[user_id] for user_id in order_users.tolist()], dtype=np.int64)
+
+        # Per-user counts of each artist and medium, found with one np.unique each
+        artist_pairs = self._pair_counts(dense_users, artists[order_rows], self.artist_count)
+        medium_pairs = self._pair_counts(dense_users, mediums[order_rows], self.medium_count)
+
+        # Mean and spread of the log prices each user paid
+        purchases = np.bincount(dense_users, minlength=len(user_ids)).astype(np.float64)
+        price_sum = np.bincount(dense_users, weights=log_prices[order_rows], minlength=len(user_ids))
+        price_squares = np.bincount(dense_users, weights=log_prices[order_rows] ** 2, minlength=len(user_ids))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            price_mean = price_sum / purchases
+            price_spread = np.sqrt(np.maximum(price_squares / purchases - price_mean ** 2, 0))
+        price_spread = np.maximum(np.nan_to_num(price_spread), MIN_PRICE_SPREAD)
+
+        ordered = {}
+        for user_position, row in zip(dense_users.tolist(), order_rows.tolist()):
+            ordered.setdefault(user_position, []).append(ids[row])
+
+        for position, user_id in enumerate(user_ids.tolist()):
+            artist_index, artist_weight = artist_pairs.get(position, (np.empty(0, np.int64), np.empty(0)))
+            if user_id in booked and exhibition_artists:
+                from_bookings = {}
+                for exhibition_id in booked[user_id]:
+                    for artist, share in exhibition_artists.get(exhibition_id, {}).items():
+                        from_bookings[artist] = from_bookings.get(artist, 0.0) + share
+                if from_bookings:
+                    merged = dict(zip(artist_index.tolist(), artist_weight.tolist()))
+                    top = max(from_bookings.values())
+                    for artist, share in from_bookings.items():
+                        merged[artist] = merged.get(artist, 0.0) + BOOKING_AFFINITY_WEIGHT * share / top
+                    artist_index = np.fromiter(merged.keys(), dtype=np.int64, count=len(merged))
+                    artist_weight = np.fromiter(merged.values(), dtype=np.float64, count=len(merged))
+                    artist_weight /= artist_weight.max()
+            medium_index, medium_weight = medium_pairs.get(position, (np.empty(0, np.int64), np.empty(0)))
+            has_prices = purchases[position] > 0
+            self.users[user_id] = (
+                artist_index, artist_weight, medium_index, medium_weight,
+                price_mean[position] if has_prices else None, price_spread[position],
+                np.array(ordered.get(position, ()), dtype=np.int64),
+            )
+
+    @staticmethod
+    def _pair_counts(users, codes, code_count):
+        """{user position: (codes, counts scaled so the user's top code is 1)}"""
+        if not users.size:
+            return {}
+        pairs, counts = np.unique(users * code_count + codes, return_counts=True)
+        pair_users = pairs // code_count
+        boundaries = np.flatnonzero(np.diff(pair_users)) + 1
+        result = {}
+        for user_pairs, user_counts in zip(np.split(pairs, boundaries), np.split(counts, boundaries)):
+            result[int(user_pairs[0] // code_count)] = (user_pairs % code_count, user_counts / user_counts.max())
+        return result
+
+    @staticmethod
+    def _exhibition_affinities(attendance, artist_codes):
+        """{exhibition id: {artist code: share of its visitors' orders}}"""
+        totals = {}
+        for exhibition_id, _, orders in attendance:
+            totals[exhibition_id] = totals.get(exhibition_id, 0) + orders
+        affinities = {}
+        for exhibition_id, artist, orders in attendance:
+            if artist in artist_codes and totals[exhibition_id]:
+                affinities.setdefault(exhibition_id, {})[artist_codes[artist]] = orders / totals[exhibition_id]
+        return affinities
+
+    def rank(self, user_id, depth=CACHED_RANKING_DEPTH):
+        """Ids of the best available artworks for a user, best first, and whether they are personalized"""
+        profile = self.users.get(user_id)
+        if profile is None or not self.ids.size:
+            return self.popular[:depth], False
+
+        artist_index, artist_weight, medium_index, medium_weight, price_mean, price_spread, ordered = profile
+        artist_affinity = np.zeros(self.artist_count)
+        artist_affinity[artist_index] = artist_weight
+        medium_affinity = np.zeros(self.medium_count)
+        medium_affinity[medium_index] = medium_weight
+
+        artist_scores = artist_affinity[self.artists]
+        scores = ARTIST_WEIGHT * artist_scores
+        scores += MEDIUM_WEIGHT * medium_affinity[self.mediums]
+        scores += DISCOVERY_WEIGHT * (artist_scores == 0)
+        scores += POPULARITY_WEIGHT * self.popularity
+        if price_mean is not None:
+            scores += PRICE_WEIGHT * np.exp(-0.5 * ((self.log_prices - price_mean) / price_spread) ** 2)
+        if ordered.size:
+            scores[np.isin(self.ids, ordered)] = -np.inf
+
+        depth = min(depth, scores.size)
+        top = np.argpartition(-scores, depth - 1)[:depth]
+        top = top[np.lexsort((-self.ids[top], -scores[top]))]
+        return self.ids[top[np.isfinite(scores[top])]].tolist(), True
+
+def _load_model():
+    """Read the catalog and order history and build a RecommendationModel"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute("""
+        SELECT a.id, a.artist, a.medium, a.price, a.status, a.order_count, COALESCE(v.views, 0)
+        FROM artworks a
+        LEFT JOIN (
+            SELECT item_id, SUM(views) AS views FROM daily_view_counts
+            WHERE kind = 'artwork' AND day > CURDATE() - INTERVAL %s DAY
+            GROUP BY item_id
+        ) v ON v.item_id = a.id
+        """, (POPULARITY_VIEW_DAYS,))
+        artworks = cursor.fetchall()
+        cursor.execute("SELECT user_id, artwork_id FROM artwork_orders WHERE payment_status <> 'failed'")
+        orders = cursor.fetchall()
+        cursor.execute("""
+        SELECT user_id, exhibition_id FROM exhibition_bookings
+        WHERE payment_status <> 'failed' AND status <> 'cancelled'
+        """)
+        bookings = cursor.fetchall()
+        # Artists whose works were bought by each exhibition's visitors
+        cursor.execute("""
+        SELECT b.exhibition_id, a.artist, COUNT(*)
+        FROM exhibition_bookings b
+        JOIN artwork_orders o ON o.user_id = b.user_id AND o.payment_status <> 'failed'
+        JOIN artworks a ON a.id = o.artwork_id
+        WHERE b.payment_status <> 'failed' AND b.status <> 'cancelled'
+        GROUP BY b.exhibition_id, a.artist
+        """)
+        attendance = cursor.fetchall()
+        return RecommendationModel(artworks, orders, bookings, attendance)
+    except Exception as e:
+        print(f"Error building recommendation model: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+_model = None
+_cache = OrderedDict()      # user id -> (ranked artwork ids, personalized), least recently used first
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+def refresh_model():
+    """Rebuild the model from the database and drop every cached ranking"""
+    global _model
+    with _refresh_lock:
+        start = time.monotonic()
+        model = _load_model()
+        if isinstance(model, dict):
+            return model
+        with _lock:
+            _model = model
+            _cache.clear()
+    print(f"Recommendation model built: {model.ids.size} available artworks, {len(model.users)} users "
+          f"in {time.monotonic() - start:.2f}s")
+    return {"success": True}
+
+def invalidate_user(user_id):
+    """Forget a user's cached ranking after they order or book"""
+    with _lock:
+        _cache.pop(int(user_id), None)
+
+def get_popular_artworks(limit=DEFAULT_RECOMMENDATIONS):
+    """The most popular available artworks, as recommended to users without history"""
+    limit = max(1, min(limit, MAX_RECOMMENDATIONS))
+    if _model is None:
+        result = refresh_model()
+        if "error" in result:
+            return result
+
+    result = get_artworks_by_ids(_model.popular, available_only=True)
+    if "error" in result:
+        return result
+    return {"recommendations": result["artworks"][:limit], "personalized": False}
+
+def get_recommendations(user_id, limit=DEFAULT_RECOMMENDATIONS):
+    """The user's top available artworks, shaped like /artworks entries"""
+    user_id = int(user_id)
+    limit = max(1, min(limit, MAX_RECOMMENDATIONS))
+    if _model is None:
+        result = refresh_model()
+        if "error" in result:
+            return result
+
+    with _lock:
+        cached = _cache.get(user_id)
+        if cached is not None:
+            _cache.move_to_end(user_id)
+        model = _model
+    if cached is None:
+        cached = model.rank(user_id)
+        with _lock:
+            if _model is model:
+                _cache[user_id] = cached
+                while len(_cache) > RECOMMENDATION_CACHE_SIZE:
+                    _cache.popitem(last=False)
+
+    ranked, personalized = cached
+    result = get_artworks_by_ids(ranked, available_only=True)
+    if "error" in result:
+        return result
+    return {"recommendations": result["artworks"][:limit], "personalized": personalized}
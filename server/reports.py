@@ -0,0 +1,125 @@
+from datetime import date, datetime, timedelta
+from database import get_db_connection
+from serialization import rows_to_dicts
+
+# Report periods and the SQL that maps a rollup day onto the start of its period
+PERIODS = {
+    'day': "r.day",
+    'week': "DATE_SUB(r.day, INTERVAL WEEKDAY(r.day) DAY)",
+    'month': "DATE_FORMAT(r.day, '%%Y-%%m-01')",
+}
+
+# Window reported when no dateFrom is given
+DEFAULT_REPORT_DAYS = 365
+
+_MEASURES = """
+SUM(CASE WHEN r.kind = 'artwork' THEN r.orders ELSE 0 END) as artwork_orders,
+SUM(CASE WHEN r.kind = 'artwork' THEN r.paid_orders ELSE 0 END) as artwork_sales,
+SUM(CASE WHEN r.kind = 'artwork' THEN r.revenue ELSE 0 END) as artwork_revenue,
+SUM(CASE WHEN r.kind = 'ticket' THEN r.orders ELSE 0 END) as ticket_bookings,
+SUM(CASE WHEN r.kind = 'ticket' THEN r.paid_orders ELSE 0 END) as ticket_sales,
+SUM(CASE WHEN r.kind = 'ticket' THEN r.revenue ELSE 0 END) as ticket_revenue,
+SUM(r.slots) as tickets_sold
+"""
+
+def _parse_date(value, default):
+    if not value:
+        return default
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+# SUM over integer columns comes back as DECIMAL; these are reported as whole numbers
+_COUNT_COLUMNS = ('artwork_orders', 'artwork_sales', 'ticket_bookings', 'ticket_sales', 'tickets_sold', 'orders', 'sales')
+
+def _rows(cursor):
+    rows = rows_to_dicts(cursor)
+    for item in rows:
+        for key in _COUNT_COLUMNS:
+            if key in item:
+                item[key] = int(item[key] or 0)
+        for key in item:
+            if key.endswith('revenue'):
+                item[key] = item[key] or 0.0
+    return rows
+
+def get_sales_report(granularity='day', date_from=None, date_to=None):
+    """Revenue, orders and ticket sales per period, per exhibition and per artist
+
+    Every figure comes from daily_sales_rollup, so the cost depends on the number of
+    days and exhibitions/artists in the range, not on the number of orders.
+    """
+    if granularity not in PERIODS:
+        return {"error": f"granularity must be one of: {', '.join(PERIODS)}"}
+
+    try:
+        date_to = _parse_date(date_to, date.today())
+        date_from = _parse_date(date_from, date_to - timedelta(days=DEFAULT_REPORT_DAYS - 1))
+    except ValueError:
+        return {"error": "Dates must be formatted as YYYY-MM-DD"}
+
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute(f"""
+        SELECT {PERIODS[granularity]} as period, {_MEASURES}
+        FROM daily_sales_rollup r
+        WHERE r.day BETWEEN %s AND %s
+        GROUP BY period
+        ORDER BY period
+        """, (date_from, date_to))
+        series = _rows(cursor)
+        for item in series:
+            item['period'] = str(item['period'])[:10]
+
+        cursor.execute(f"""
+        SELECT {_MEASURES}
+        FROM daily_sales_rollup r
+        WHERE r.day BETWEEN %s AND %s
+        """, (date_from, date_to))
+        totals = _rows(cursor)[0]
+        totals['total_revenue'] = totals['artwork_revenue'] + totals['ticket_revenue']
+
+        cursor.execute("""
+        SELECT r.exhibition_id, e.title as exhibition_title,
+               SUM(r.orders) as orders, SUM(r.paid_orders) as sales,
+               SUM(r.revenue) as revenue, SUM(r.slots) as tickets_sold
+        FROM daily_sales_rollup r
+        LEFT JOIN exhibitions e ON e.id = r.exhibition_id
+        WHERE r.day BETWEEN %s AND %s AND r.kind = 'ticket'
+        GROUP BY r.exhibition_id, e.title
+        ORDER BY revenue DESC
+        """, (date_from, date_to))
+        by_exhibition = _rows(cursor)
+
+        cursor.execute("""
+        SELECT r.artist_id, COALESCE(a.name, 'Unassigned') as artist_name,
+               SUM(r.orders) as orders, SUM(r.paid_orders) as sales, SUM(r.revenue) as revenue
+        FROM daily_sales_rollup r
+        LEFT JOIN artists a ON a.id = r.artist_id
+        WHERE r.day BETWEEN %s AND %s AND r.kind = 'artwork'
+        GROUP BY r.artist_id, a.name
+        ORDER BY revenue DESC
+        """, (date_from, date_to))
+        by_artist = _rows(cursor)
+
+        return {
+            "granularity": granularity,
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "totals": totals,
+            "series": series,
+            "by_exhibition": by_exhibition,
+            "by_artist": by_artist,
+        }
+    except Exception as e:
+        print(f"Error building sales report: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
@@ -0,0 +1,83 @@
+"""In-process cache of encoded catalog responses (/artworks, /exhibitions)
+
+The full listings are read on every page load but change rarely, so the encoded JSON is
+kept in memory together with each compressed variant produced for it; a cached gzip
+listing is compressed once and then served as-is. Writes that change a listing call
+invalidate() after they commit, and entries also expire after CATALOG_CACHE_TTL seconds
+in case the tables are edited outside the API. A listing rebuilt after an invalidation
+reads only from a replica that has caught up with that write (see database.reads_after),
+so a lagging replica cannot put the old listing back in the cache.
+"""
+import os
+import threading
+import time
+from serialization import json_bytes
+from compression import compress
+from database import reads_after
+
+# Seconds a cached listing may be served before it is rebuilt; 0 disables the cache
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', '60'))
+
+ARTWORKS = 'artworks'
+EXHIBITIONS = 'exhibitions'
+
+class CachedResponse:
+    """An encoded JSON body and the compressed variants made from it"""
+
+    def __init__(self, data):
+        self.data = data
+        self.body = json_bytes(data)
+        self.created = time.monotonic()
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        """Return the body for a Content-Encoding (None for identity), compressing it at most once"""
+        if encoding is None:
+            return self.body
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = self._variants[encoding] = compress(self.body, encoding)
+        return variant
+
+_entries = {}
+# Bumped by invalidate() so a listing built concurrently with a write is not stored
+_generations = {}
+# Wall-clock time of each key's last invalidation
+_invalidated = {}
+_lock = threading.Lock()
+
+def cached_response(key, build):
+    """Return the cached response for key, building it with build() when missing or expired
+
+    Results containing an "error" key are returned but not cached.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now - entry.created < CATALOG_CACHE_TTL:
+            return entry
+        generation = _generations.get(key, 0)
+        written = _invalidated.get(key, 0)
+
+    with reads_after(written):
+        data = build()
+    response = CachedResponse(data)
+    if isinstance(data, dict) and "error" in data:
+        return response
+
+    with _lock:
+        if _generations.get(key, 0) == generation and CATALOG_CACHE_TTL > 0:
+            _entries[key] = response
+    return response
+
+def invalidate(*keys):
+    """Drop cached listings after a write that changes them"""
+    with _lock:
+        for key in keys:
+            _entries.pop(key, None)
+            _generations[key] = _generations.get(key, 0) + 1
+            _invalidated[key] = time.time()
@@ -0,0 +1,144 @@
+"""Daily sales rollup behind the /reports API
+
+daily_sales_rollup holds one row per (day, kind, exhibition, artist) with the number of
+orders placed that day, how many of them have been paid, the paid revenue and (for tickets)
+the paid slots. kind is 'artwork' (artwork_orders, bucketed by artist) or 'ticket'
+(exhibition_bookings, bucketed by exhibition); the unused dimension is stored as 0.
+
+Like the artist counters, rows are adjusted by the write paths inside their own
+transaction, so report queries only ever scan the rollup. Orders are bucketed by the
+day they were placed, even when payment completes later. Rows moved to the archive tables
+(see archive.py) stay counted, and the rebuilds below read both. To rebuild a date range (or
+everything) from the source tables:
+
+    python sales_rollup.py [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+import argparse
+from datetime import datetime
+from database import get_db_connection
+from archive import with_archive
+
+_UPSERT = """
+INSERT INTO daily_sales_rollup (day, kind, exhibition_id, artist_id, orders, paid_orders, revenue, slots)
+{select}
+ON DUPLICATE KEY UPDATE
+    daily_sales_rollup.orders = daily_sales_rollup.orders + VALUES(orders),
+    daily_sales_rollup.paid_orders = daily_sales_rollup.paid_orders + VALUES(paid_orders),
+    daily_sales_rollup.revenue = daily_sales_rollup.revenue + VALUES(revenue),
+    daily_sales_rollup.slots = daily_sales_rollup.slots + VALUES(slots)
+"""
+
+# One order's contribution to its rollup row, scaled by %s (+1 or -1) for the order and paid columns
+_ARTWORK_ORDER = """
+SELECT DATE(ao.order_date), 'artwork', 0, COALESCE(a.artist_id, 0),
+       %s, %s, %s * ao.total_amount, 0
+FROM artwork_orders ao
+JOIN artworks a ON a.id = ao.artwork_id
+WHERE ao.id = %s
+"""
+
+_TICKET_ORDER = """
+SELECT DATE(eb.booking_date), 'ticket', eb.exhibition_id, 0,
+       %s, %s, %s * eb.total_amount, %s * eb.slots
+FROM exhibition_bookings eb
+WHERE eb.id = %s
+"""
+
+def order_placed(cursor, kind, order_id):
+    """Count a newly inserted artwork order ('artwork') or booking ('ticket')"""
+    if kind == 'artwork':
+        cursor.execute(_UPSERT.format(select=_ARTWORK_ORDER), (1, 0, 0, order_id))
+    else:
+        cursor.execute(_UPSERT.format(select=_TICKET_ORDER), (1, 0, 0, 0, order_id))
+
+def payment_changed(cursor, kind, order_id, old_status, new_status):
+    """Move an order into or out of the paid columns when its payment completes (or is reversed)"""
+    was_paid = old_status == 'completed'
+    is_paid = new_status == 'completed'
+    if was_paid == is_paid:
+        return
+    sign = 1 if is_paid else -1
+    if kind == 'artwork':
+        cursor.execute(_UPSERT.format(select=_ARTWORK_ORDER), (0, sign, sign, order_id))
+    else:
+        cursor.execute(_UPSERT.format(select=_TICKET_ORDER), (0, sign, sign, sign, order_id))
+
+def artwork_reassigned(cursor, artwork_id, old_artist_id, new_artist_id):
+    """Move an artwork's historical sales from one artist bucket to another"""
+    days = []
+    for table in with_archive('artwork_orders'):
+        cursor.execute(f"""
+        SELECT DATE(order_date), COUNT(*),
+               SUM(payment_status = 'completed'),
+               COALESCE(SUM(CASE WHEN payment_status = 'completed' THEN total_amount END), 0)
+        FROM {table}
+        WHERE artwork_id = %s
+        GROUP BY DATE(order_date)
+        """, (artwork_id,))
+        days.extend(cursor.fetchall())
+
+    for day, orders, paid_orders, revenue in days:
+        for artist_id, sign in ((old_artist_id or 0, -1), (new_artist_id or 0, 1)):
+            cursor.execute(_UPSERT.format(select="SELECT %s, 'artwork', 0, %s, %s, %s, %s, 0"), (
+                day, artist_id, sign * orders, sign * int(paid_orders or 0), sign * revenue
+            ))
+
+def rebuild_rollup(date_from=None, date_to=None):
+    """Recompute rollup rows for a date range (inclusive) from the source tables"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        low = date_from or '1970-01-01'
+        high = date_to or '2999-12-31'
+
+        # Rebuild in one transaction so reports never see a half-filled range;
+        # the archive tables are added on top of the hot ones by the upsert
+        cursor.execute("DELETE FROM daily_sales_rollup WHERE day BETWEEN %s AND %s", (low, high))
+        for orders in with_archive('artwork_orders'):
+            cursor.execute(_UPSERT.format(select=f"""
+            SELECT DATE(ao.order_date), 'artwork', 0, COALESCE(a.artist_id, 0),
+                   COUNT(*),
+                   SUM(ao.payment_status = 'completed'),
+                   COALESCE(SUM(CASE WHEN ao.payment_status = 'completed' THEN ao.total_amount END), 0),
+                   0
+            FROM {orders} ao
+            JOIN artworks a ON a.id = ao.artwork_id
+            WHERE ao.order_date >= %s AND ao.order_date < %s + INTERVAL 1 DAY
+            GROUP BY DATE(ao.order_date), COALESCE(a.artist_id, 0)
+            """), (low, high))
+        for bookings in with_archive('exhibition_bookings'):
+            cursor.execute(_UPSERT.format(select=f"""
+            SELECT DATE(eb.booking_date), 'ticket', eb.exhibition_id, 0,
+                   COUNT(*),
+                   SUM(eb.payment_status = 'completed'),
+                   COALESCE(SUM(CASE WHEN eb.payment_status = 'completed' THEN eb.total_amount END), 0),
+                   COALESCE(SUM(CASE WHEN eb.payment_status = 'completed' THEN eb.slots END), 0)
+            FROM {bookings} eb
+            WHERE eb.booking_date >= %s AND eb.booking_date < %s + INTERVAL 1 DAY
+            GROUP BY DATE(eb.booking_date), eb.exhibition_id
+            """), (low, high))
+        connection.commit()
+
+        cursor.execute("SELECT COUNT(*) FROM daily_sales_rollup WHERE day BETWEEN %s AND %s", (low, high))
+        rows = cursor.fetchone()[0]
+        print(f"Rebuilt sales rollup from {low} to {high}: {rows} rows")
+        return {"success": True, "rows": rows}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error rebuilding sales rollup: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup")
+    parser.add_argument('--from', dest='date_from', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date())
+    parser.add_argument('--to', dest='date_to', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date())
+    args = parser.parse_args()
+    rebuild_rollup(args.date_from, args.date_to)
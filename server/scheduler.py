@@ -0,0 +1,328 @@
+"""In-process scheduler for periodic maintenance jobs
+
+Jobs are registered with every() (a fixed interval) or cron() (a five-field cron
+expression in local time) and started by start(). One dispatcher thread sleeps until the
+next job is due and hands it to a pool of SCHEDULER_WORKERS threads, so a slow job does
+not hold up the others and periodic work never runs on a request thread. A job never
+overlaps itself: it is scheduled again only once its run has finished, from the finish
+time (interval jobs) or from the next matching minute (cron jobs). A job that raises, or
+returns a dict with an "error" key, is logged, counted as a failure and rescheduled as
+usual.
+
+Jobs that act on shared tables are registered with exclusive=True. Each run first takes
+the MySQL advisory lock 'afriart_job_<name>' without waiting; when another server
+process holds it the run is skipped, so with several processes behind a load balancer the
+job runs in one of them at a time. Jobs that only touch the process's own memory run in
+every process.
+
+metrics() reports per job: runs, failures, skipped runs, last and maximum duration, the
+last error or result, running totals of the counts in its results (rows expired, say) and
+the next run (served to admins as GET /jobs).
+
+server.main() registers the jobs and starts the scheduler:
+
+    scheduler.cron('exhibition-status', '0 0 * * *', refresh_exhibition_statuses, run_now=True, exclusive=True)
+    scheduler.every('view-counters', VIEW_FLUSH_SECONDS, flush_views)
+    scheduler.start()
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from database import get_db_connection
+
+# Threads running jobs; due jobs wait for a free one
+SCHEDULER_WORKERS = int(os.environ.get('SCHEDULER_WORKERS', '4'))
+
+# Advisory lock names are this prefix plus the job name
+JOB_LOCK_PREFIX = 'afriart_job_'
+
+class IntervalTrigger:
+    """Every given number of seconds"""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = float(seconds)
+
+    def next_after(self, now):
+        return now + self.seconds
+
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+class CronTrigger:
+    """Minute, hour, day of month, month and day of week, as in crontab
+
+    Fields accept *, numbers, ranges (1-5), lists (1,15) and steps (*/10, 8-18/2).
+    Days of week run from 0 (Sunday) to 6; 7 is also Sunday. As in cron, when both day
+    fields are restricted a day matching either of them matches.
+    """
+
+    _FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        values = [self._parse(part, low, high) for part, (low, high) in zip(parts, self._FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+        # Fail at registration rather than in the dispatcher
+        self.next_after(time.time())
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for item in field.split(','):
+            body, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if body == '*':
+                    start, end = low, high
+                elif '-' in body:
+                    start, end = (int(value) for value in body.split('-', 1))
+                else:
+                    start = int(body)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron field {field!r}")
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        # isoweekday() is Monday 1 .. Sunday 7
+        in_week = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day:
+            return in_week
+        if self._any_weekday:
+            return in_month
+        return in_month or in_week
+
+    def next_after(self, now):
+        moment = datetime.fromtimestamp(now).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skip whole months, days and hours that cannot match; give up after about five years
+        for _ in range(5 * 366 * 24):
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            minute = min((value for value in self.minutes if value >= moment.minute), default=None)
+            if minute is None:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            return moment.replace(minute=minute).timestamp()
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def __str__(self):
+        return f"cron {self.expression}"
+
+class Job:
+    """A named callable, its trigger and its run-time metrics"""
+
+    def __init__(self, name, func, trigger, exclusive=False):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.exclusive = exclusive
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_error = None
+        self.last_result = None
+        self.totals = {}
+
+    def metrics(self):
+        return {
+            "name": self.name,
+            "trigger": str(self.trigger),
+            "exclusive": self.exclusive,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "lastStarted": datetime.fromtimestamp(self.last_started).isoformat() if self.last_started else None,
+            "lastDuration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "averageDuration": round(self.total_duration / self.runs, 3) if self.runs else None,
+            "maxDuration": round(self.max_duration, 3),
+            "lastError": self.last_error,
+            "lastResult": self.last_result,
+            "totals": dict(self.totals),
+            "nextRun": datetime.fromtimestamp(self.next_run).isoformat() if self.next_run else None,
+        }
+
+class AdvisoryLock:
+    """A MySQL GET_LOCK held on its own connection for the length of a job run"""
+
+    def __init__(self, name):
+        self.name = JOB_LOCK_PREFIX + name
+        self.connection = None
+
+    def acquire(self):
+        """Take the lock without waiting; False when another process holds it"""
+        connection = get_db_connection()
+        if connection is None:
+            raise RuntimeError("Database connection failed")
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (self.name,))
+            acquired = cursor.fetchone()[0] == 1
+        finally:
+            cursor.close()
+        if acquired:
+            self.connection = connection
+        else:
+            connection.close()
+        return acquired
+
+    def release(self):
+        if self.connection is None:
+            return
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (self.name,))
+            cursor.fetchone()
+            cursor.close()
+        except Exception as e:
+            # Closing the connection releases the lock anyway
+            print(f"Error releasing lock {self.name}: {e}")
+        finally:
+            self.connection.close()
+            self.connection = None
+
+class Scheduler:
+    """Dispatches registered jobs to a bounded pool of worker threads"""
+
+    def __init__(self, workers=SCHEDULER_WORKERS):
+        self._workers = max(1, workers)
+        self._jobs = {}
+        self._queue = []
+        self._order = itertools.count()
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._pool = None
+        self._stopping = False
+
+    def every(self, name, seconds, func, run_now=False, exclusive=False):
+        """Run func every given number of seconds, starting after one interval (or at once with run_now)"""
+        return self._add(Job(name, func, IntervalTrigger(seconds), exclusive), run_now)
+
+    def cron(self, name, expression, func, run_now=False, exclusive=False):
+        """Run func at the minutes matching a cron expression (local time), and also at startup with run_now"""
+        return self._add(Job(name, func, CronTrigger(expression), exclusive), run_now)
+
+    def _add(self, job, run_now):
+        with self._wakeup:
+            if job.name in self._jobs:
+                raise ValueError(f"Job {job.name!r} is already scheduled")
+            now = time.time()
+            self._jobs[job.name] = job
+            self._push(job, now if run_now else job.trigger.next_after(now))
+        return job
+
+    def _push(self, job, when):
+        """Queue a job's next run; call with _wakeup held"""
+        job.next_run = when
+        heapq.heappush(self._queue, (when, next(self._order), job))
+        self._wakeup.notify()
+
+    def metrics(self):
+        """Run-time metrics of every job, soonest next run first"""
+        with self._wakeup:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.next_run or 0)
+            return {"workers": self._workers, "jobs": [job.metrics() for job in jobs]}
+
+    def start(self):
+        """Start the dispatcher thread and the worker pool (once)"""
+        if self._thread is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='job')
+            self._thread = threading.Thread(target=self._dispatch, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop dispatching and, with wait, let running jobs finish"""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+    def _dispatch(self):
+        while True:
+            with self._wakeup:
+                while not self._stopping and (not self._queue or self._queue[0][0] > time.time()):
+                    self._wakeup.wait(self._queue[0][0] - time.time() if self._queue else None)
+                if self._stopping:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                job.running = True
+                job.next_run = None
+            self._pool.submit(self._run, job)
+
+    def _run(self, job):
+        lock = AdvisoryLock(job.name) if job.exclusive else None
+        try:
+            if lock is not None and not lock.acquire():
+                job.skipped += 1
+                return
+            job.last_started = time.time()
+            started = time.monotonic()
+            try:
+                result = job.func()
+                failed = isinstance(result, dict) and "error" in result
+                job.last_error = result["error"] if failed else None
+                if failed:
+                    print(f"Scheduled job {job.name} failed: {result['error']}")
+                elif isinstance(result, dict):
+                    job.last_result = result
+                    for key, value in result.items():
+                        if isinstance(value, int) and not isinstance(value, bool):
+                            job.totals[key] = job.totals.get(key, 0) + value
+            except Exception as e:
+                failed = True
+                job.last_error = str(e)
+                print(f"Scheduled job {job.name} failed: {e}")
+            finally:
+                if lock is not None:
+                    lock.release()
+            elapsed = time.monotonic() - started
+            job.runs += 1
+            job.failures += failed
+            job.last_duration = elapsed
+            job.total_duration += elapsed
+            job.max_duration = max(job.max_duration, elapsed)
+            if elapsed > 1:
+                print(f"Scheduled job {job.name} took {elapsed:.1f}s")
+        except Exception as e:
+            # The lock could not be taken, most likely because the database is down
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"Scheduled job {job.name} could not start: {e}")
+        finally:
+            with self._wakeup:
+                job.running = False
+                if not self._stopping:
+                    self._push(job, job.trigger.next_after(time.time()))
+
+# The server's scheduler
+scheduler = Scheduler()
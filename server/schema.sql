@@ -1,3 +1,5 @@
+-- Reference copy of the current schema. Deployments apply it through migrations.py,
+-- which records each change in schema_version; keep this file in step with MIGRATIONS.
 
 -- Users table
 CREATE TABLE IF NOT EXISTS users (
@@ -27,7 +29,11 @@ CREATE TABLE IF NOT EXISTS artists (
     bio TEXT,
     profile_image_url VARCHAR(255),
     phone VARCHAR(20),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    artwork_count INT NOT NULL DEFAULT 0,
+    order_count INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_artists_name (name)
 );
 
 -- Artworks table
@@ -43,7 +49,11 @@ CREATE TABLE IF NOT EXISTS artworks (
     year INT,
     image_url VARCHAR(255),
     status ENUM('available', 'sold') DEFAULT 'available',
+    order_count INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_artworks_created_at (created_at),
+    INDEX idx_artworks_artist (artist),
+    INDEX idx_artworks_artist_created (artist_id, created_at),
     FOREIGN KEY (artist_id) REFERENCES artists(id)
 );
 
@@ -76,6 +86,8 @@ CREATE TABLE IF NOT EXISTS artwork_orders (
     payment_status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
     order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     total_amount DECIMAL(10, 2) NOT NULL,
+    INDEX idx_artwork_orders_user_date (user_id, order_date),
+    INDEX idx_artwork_orders_status_date (payment_status, order_date),
     FOREIGN KEY (user_id) REFERENCES users(id),
     FOREIGN KEY (artwork_id) REFERENCES artworks(id)
 );
@@ -88,13 +100,17 @@ CREATE TABLE IF NOT EXISTS exhibition_bookings (
     name VARCHAR(255),
     email VARCHAR(255),
     phone VARCHAR(20),
-    ticket_code VARCHAR(50),
+    ticket_code VARCHAR(50) UNIQUE,
     slots INT NOT NULL DEFAULT 1,
     payment_method ENUM('mpesa', 'card', 'bank') DEFAULT 'mpesa',
     payment_status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
     status ENUM('active', 'used', 'cancelled') DEFAULT 'active',
     booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     total_amount DECIMAL(10, 2) NOT NULL,
+    INDEX idx_bookings_exhibition_date (exhibition_id, booking_date),
+    INDEX idx_bookings_user_date (user_id, booking_date),
+    INDEX idx_bookings_booking_date (booking_date),
+    INDEX idx_bookings_status_date (payment_status, booking_date),
     FOREIGN KEY (user_id) REFERENCES users(id),
     FOREIGN KEY (exhibition_id) REFERENCES exhibitions(id)
 );
@@ -124,3 +140,71 @@ CREATE TABLE IF NOT EXISTS orders (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
+
+-- Contact messages table
+CREATE TABLE IF NOT EXISTS contact_messages (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    phone VARCHAR(20),
+    message TEXT NOT NULL,
+    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status ENUM('new', 'read', 'replied') NOT NULL DEFAULT 'new',
+    source VARCHAR(50) DEFAULT 'contact_form',
+    INDEX idx_contact_messages_date (date)
+);
+
+-- M-Pesa transactions table
+CREATE TABLE IF NOT EXISTS mpesa_transactions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    checkout_request_id VARCHAR(100) NOT NULL,
+    merchant_request_id VARCHAR(100) NOT NULL,
+    order_type VARCHAR(20) NOT NULL,
+    order_id INT NOT NULL,
+    user_id INT NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    phone_number VARCHAR(20) NOT NULL,
+    result_code VARCHAR(10),
+    result_desc VARCHAR(255),
+    transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status ENUM('pending', 'completed', 'failed') NOT NULL DEFAULT 'pending',
+    INDEX idx_mpesa_checkout_request (checkout_request_id),
+    INDEX idx_mpesa_status_date (status, transaction_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Daily sales rollup (maintained by sales_rollup.py, read by /reports)
+CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+    day DATE NOT NULL,
+    kind ENUM('artwork', 'ticket') NOT NULL,
+    exhibition_id INT NOT NULL DEFAULT 0,
+    artist_id INT NOT NULL DEFAULT 0,
+    orders INT NOT NULL DEFAULT 0,
+    paid_orders INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    slots INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, kind, exhibition_id, artist_id)
+);
+
+-- Most similar available artworks per artwork (built by similar_artworks.py, read by /artworks/:id/similar)
+CREATE TABLE IF NOT EXISTS artwork_neighbors (
+    artwork_id INT NOT NULL,
+    neighbor_id INT NOT NULL,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (artwork_id, neighbor_id),
+    INDEX idx_artwork_neighbors_neighbor (neighbor_id)
+);
+
+-- Page views per day and artwork or exhibition (flushed by view_counters.py, read by the trending endpoints)
+CREATE TABLE IF NOT EXISTS daily_view_counts (
+    day DATE NOT NULL,
+    kind ENUM('artwork', 'exhibition') NOT NULL,
+    item_id INT NOT NULL,
+    views INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, day, item_id)
+);
+
+-- Settled history moved out of the hot tables (by archive.py); same columns and indexes, no foreign keys
+CREATE TABLE IF NOT EXISTS artwork_orders_archive LIKE artwork_orders;
+CREATE TABLE IF NOT EXISTS exhibition_bookings_archive LIKE exhibition_bookings;
+CREATE TABLE IF NOT EXISTS mpesa_transactions_archive LIKE mpesa_transactions;
@@ -0,0 +1,378 @@
+"""In-process full-text index behind GET /search
+
+Artworks (title, artist, medium, description) and exhibitions (title, location,
+description) are tokenized into an inverted index: term -> {document: weighted term
+frequency}. Queries are ranked with BM25, every query term must match, and the last
+term also matches as a prefix so results follow the user while they type.
+
+The index is built from MySQL on the first search and then kept current by the write
+paths, which call artwork_changed / exhibition_changed / *_removed after they commit.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+from operator import itemgetter
+from database import get_db_connection
+
+# Relative weight of each field in a document's term frequencies
+ARTWORK_FIELD_WEIGHTS = {'title': 3.0, 'artist': 2.0, 'medium': 1.5, 'description': 1.0}
+EXHIBITION_FIELD_WEIGHTS = {'title': 3.0, 'location': 1.5, 'description': 1.0}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A prefix match scores this fraction of an exact match of the same term
+PREFIX_MATCH_WEIGHT = 0.6
+# Most terms one query prefix may expand to, so a one-letter prefix stays cheap
+PREFIX_EXPANSION_LIMIT = 64
+# Above this many new terms the sorted term list is rebuilt instead of inserted into
+TERM_MERGE_THRESHOLD = 256
+# Cached term scores are recomputed once the document count has changed by this fraction
+RESCORE_FRACTION = 0.1
+# Best-scoring documents kept per term; queries with many matches rank only these
+CHAMPION_LIST_SIZE = 500
+
+# Rows fetched per round trip while building the index
+LOAD_BATCH_SIZE = 1000
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Words too common to be worth indexing
+STOP_WORDS = frozenset("""
+a an and are as at be by for from in into is it of on or the this to with
+""".split())
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Lower-cased word tokens of a piece of text, without stop words"""
+    if not text:
+        return []
+    return [token for token in _TOKEN.findall(str(text).lower()) if token not in STOP_WORDS]
+
+class SearchIndex:
+    """Inverted index over one kind of document, with BM25 ranking
+
+    Each term's BM25 scores are computed on first use and then updated in place as
+    documents change. Matches are found with set operations; when there are many, only
+    documents among some term's CHAMPION_LIST_SIZE best are scored and ranked.
+    Methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}      # term -> {doc_id: weighted frequency}
+        self._impacts = {}       # term -> {doc_id: BM25 score of the term}, built on use
+        self._idf = {}           # term -> idf its cached scores were computed with
+        self._champions = {}     # term -> (doc_ids with its best scores, lowest of those scores)
+        self._terms = []         # sorted terms, for prefix lookups
+        self._new_terms = set()  # terms not yet merged into _terms
+        self._doc_terms = {}     # doc_id -> {term: weighted frequency}, to remove a document
+        self._doc_lengths = {}   # doc_id -> weighted length
+        self._total_length = 0.0
+        self._stored = {}        # doc_id -> fields returned with results
+        self._scored_at = 0      # document count the cached scores were computed with
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def add(self, doc_id, fields, weights, stored):
+        """Index (or re-index) a document"""
+        frequencies = {}
+        for field, weight in weights.items():
+            for term in tokenize(fields.get(field)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+        length = sum(frequencies.values())
+
+        with self._lock:
+            self._remove(doc_id)
+            self._doc_terms[doc_id] = frequencies
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            self._stored[doc_id] = stored
+            for term, frequency in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._new_terms.add(term)
+                postings[doc_id] = frequency
+                impacts = self._impacts.get(term)
+                if impacts is not None:
+                    score = impacts[doc_id] = self._bm25(self._idf[term], frequency, length)
+                    champions = self._champions.get(term)
+                    if champions is not None and score >= champions[1]:
+                        champions[0].add(doc_id)
+
+    def remove(self, doc_id):
+        """Drop a document from the index"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        frequencies = self._doc_terms.pop(doc_id, None)
+        if frequencies is None:
+            return
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if term in self._impacts:
+                del self._impacts[term][doc_id]
+                if term in self._champions:
+                    self._champions[term][0].discard(doc_id)
+            if not postings:
+                del self._postings[term]
+                self._impacts.pop(term, None)
+                self._idf.pop(term, None)
+                self._champions.pop(term, None)
+                if term in self._new_terms:
+                    self._new_terms.discard(term)
+                else:
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        self._stored.pop(doc_id, None)
+
+    def _sorted_terms(self):
+        # New terms are merged lazily: one sort after a bulk load, insort after single edits
+        if self._new_terms:
+            if len(self._new_terms) > TERM_MERGE_THRESHOLD:
+                self._terms = sorted(self._postings)
+            else:
+                for term in self._new_terms:
+                    bisect.insort(self._terms, term)
+            self._new_terms.clear()
+        return self._terms
+
+    def _expand_prefix(self, prefix):
+        terms = self._sorted_terms()
+        start = bisect.bisect_left(terms, prefix)
+        expansions = []
+        for term in terms[start:start + PREFIX_EXPANSION_LIMIT]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _bm25(self, idf, frequency, length):
+        average_length = self._total_length / len(self._doc_lengths)
+        return idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+
+    def _term_impacts(self, term):
+        impacts = self._impacts.get(term)
+        if impacts is None:
+            postings = self._postings[term]
+            doc_count = len(self._doc_lengths)
+            idf = self._idf[term] = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            base = BM25_K1 * (1 - BM25_B)
+            per_length = BM25_K1 * BM25_B * doc_count / self._total_length if self._total_length else 0.0
+            lengths = self._doc_lengths
+            impacts = self._impacts[term] = {
+                doc_id: idf * frequency * (BM25_K1 + 1) / (frequency + base + per_length * lengths[doc_id])
+                for doc_id, frequency in postings.items()
+            }
+        return impacts
+
+    def _champion_ids(self, term):
+        champions = self._champions.get(term)
+        if champions is None:
+            impacts = self._term_impacts(term)
+            if len(impacts) <= CHAMPION_LIST_SIZE:
+                champions = (set(impacts), 0.0)
+            else:
+                best = heapq.nlargest(CHAMPION_LIST_SIZE, impacts.items(), key=itemgetter(1))
+                champions = ({doc_id for doc_id, _ in best}, best[-1][1])
+            self._champions[term] = champions
+        return champions[0]
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+        """Return (total matches, ranked page of (score, doc_id, stored fields))
+
+        Every term of the query must match; the last one also matches as a prefix.
+        """
+        terms = tokenize(query)
+        with self._lock:
+            if not terms or not self._doc_lengths:
+                return 0, []
+
+            # Scores drift as the catalog grows or shrinks; recompute them past a threshold
+            doc_count = len(self._doc_lengths)
+            if abs(doc_count - self._scored_at) > self._scored_at * RESCORE_FRACTION:
+                self._impacts.clear()
+                self._idf.clear()
+                self._champions.clear()
+                self._scored_at = doc_count
+
+            *finished, last = terms
+            if any(term not in self._postings for term in finished):
+                return 0, []
+            variants = [(last, 1.0)] if last in self._postings else []
+            variants += [(term, PREFIX_MATCH_WEIGHT) for term in self._expand_prefix(last) if term != last]
+            if not variants:
+                return 0, []
+
+            # Documents containing every finished term (rarest first) and some completion of the last
+            required = sorted((self._term_impacts(term) for term in finished), key=len)
+            completions = [(self._term_impacts(term), weight) for term, weight in variants]
+            if required:
+                matched = set(required[0])
+                for impacts in required[1:]:
+                    matched.intersection_update(impacts)
+                matched = set().union(*(matched.intersection(impacts) for impacts, _ in completions))
+            else:
+                matched = set().union(*(impacts for impacts, _ in completions))
+            if not matched:
+                return 0, []
+
+            # With many matches, rank only those among some term's best-scoring documents
+            pool = matched
+            if len(matched) > CHAMPION_LIST_SIZE:
+                champions = set().union(*(self._champion_ids(term) for term in finished + [term for term, _ in variants]))
+                champions.intersection_update(matched)
+                if len(champions) >= offset + limit:
+                    pool = champions
+
+            # A document matching several completions of the last term counts its best one
+            scores = {}
+            for impacts, weight in completions:
+                for doc_id in pool.intersection(impacts):
+                    score = impacts[doc_id] * weight
+                    if score > scores.get(doc_id, 0.0):
+                        scores[doc_id] = score
+            for impacts in required:
+                for doc_id in scores:
+                    scores[doc_id] += impacts[doc_id]
+
+            top = heapq.nlargest(offset + limit, scores.items(), key=itemgetter(1))
+            return len(matched), [(score, doc_id, self._stored[doc_id]) for doc_id, score in top[offset:]]
+
+_indexes = {'artwork': SearchIndex(), 'exhibition': SearchIndex()}
+_loaded = False
+_load_lock = threading.Lock()
+
+def _image_url(image_url):
+    # Inline base64 images are converted to files on first read; never ship them in results
+    if not image_url or image_url.startswith('data:') or 'base64' in image_url:
+        return None
+    return image_url
+
+def _add_artwork(row):
+    artwork_id, title, artist, medium, description, image_url, price = row
+    _indexes['artwork'].add(artwork_id,
+                            {'title': title, 'artist': artist, 'medium': medium, 'description': description},
+                            ARTWORK_FIELD_WEIGHTS,
+                            {'title': title, 'artist': artist, 'medium': medium, 'imageUrl': _image_url(image_url),
+                             'price': float(price) if price is not None else None})
+
+def _add_exhibition(row):
+    exhibition_id, title, location, description, image_url, start_date, end_date = row
+    _indexes['exhibition'].add(exhibition_id,
+                               {'title': title, 'location': location, 'description': description},
+                               EXHIBITION_FIELD_WEIGHTS,
+                               {'title': title, 'location': location, 'imageUrl': _image_url(image_url),
+                                'startDate': start_date.isoformat() if start_date else None,
+                                'endDate': end_date.isoformat() if end_date else None})
+
+_SOURCES = {
+    'artwork': ("SELECT id, title, artist, medium, description, image_url, price FROM artworks", _add_artwork),
+    'exhibition': ("SELECT id, title, location, description, image_url, start_date, end_date FROM exhibitions", _add_exhibition),
+}
+
+def _load_documents(kinds=('artwork', 'exhibition'), doc_id=None):
+    """Read every artwork and exhibition into the index, or a single document of one kind"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        for kind in kinds:
+            query, add = _SOURCES[kind]
+            if doc_id is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(query + " WHERE id = %s", (doc_id,))
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    add(row)
+        return {"success": True}
+    except Exception as e:
+        print(f"Error loading search index: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def ensure_loaded():
+    """Build the index from the database if this process has not done so yet"""
+    global _loaded
+    if _loaded:
+        return {"success": True}
+    with _load_lock:
+        if _loaded:
+            return {"success": True}
+        result = _load_documents()
+        if "error" not in result:
+            _loaded = True
+            print(f"Search index built: {len(_indexes['artwork'])} artworks, {len(_indexes['exhibition'])} exhibitions")
+        return result
+
+def artwork_changed(artwork_id):
+    """Re-index an artwork after it was created or updated"""
+    with _load_lock:
+        if _loaded:
+            _load_documents(('artwork',), artwork_id)
+
+def artwork_removed(artwork_id):
+    """Drop a deleted artwork from the index"""
+    _indexes['artwork'].remove(int(artwork_id))
+
+def exhibition_changed(exhibition_id):
+    """Re-index an exhibition after it was created or updated"""
+    with _load_lock:
+        if _loaded:
+            _load_documents(('exhibition',), exhibition_id)
+
+def exhibition_removed(exhibition_id):
+    """Drop a deleted exhibition from the index"""
+    _indexes['exhibition'].remove(int(exhibition_id))
+
+def search_catalog(query, kind=None, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+    """Ranked artworks and/or exhibitions (kind) matching every word of query, the last as a prefix"""
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    offset = max(0, offset)
+
+    loaded = ensure_loaded()
+    if "error" in loaded:
+        return loaded
+
+    if kind:
+        total, kind_hits = _indexes[kind].search(query or '', limit, offset)
+        hits = [(score, kind, doc_id, stored) for score, doc_id, stored in kind_hits]
+    else:
+        # Each kind is ranked on its own; the two rankings are merged by score
+        total = 0
+        hits = []
+        for doc_kind, index in _indexes.items():
+            kind_total, kind_hits = index.search(query or '', offset + limit)
+            total += kind_total
+            hits += [(score, doc_kind, doc_id, stored) for score, doc_id, stored in kind_hits]
+        hits = heapq.nlargest(offset + limit, hits, key=itemgetter(0))[offset:]
+
+    return {
+        "query": query,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "results": [
+            dict(stored, id=str(doc_id), type=doc_kind, score=round(score, 4))
+            for score, doc_kind, doc_id, stored in hits
+        ],
+    }
@@ -0,0 +1,152 @@
+"""Shared row-to-dict conversion and JSON encoding
+
+RowMaterializer works out a result set's column names and which columns hold DECIMAL
+values once per cursor, then converts every row with the same mapping. json_dumps is the
+one JSON encoder for responses; it uses orjson when that package is installed (it is
+optional - pip install orjson) and the standard library otherwise, with the same output
+for the types MySQL returns (compact separators, non-ASCII text left as UTF-8).
+
+ResponseShape is for endpoints whose JSON uses different names or types than the
+table (camelCase, string ids, ISO dates); see EXHIBITION_FIELDS in exhibition.py.
+"""
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# MySQL DECIMAL and NEWDECIMAL field type codes, as reported in cursor.description
+DECIMAL_TYPE_CODES = (0, 246)
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+def _default(obj):
+    """Encode the non-JSON types MySQL hands back"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        # TIME columns
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    # orjson writes naive datetimes and dates exactly as isoformat() does
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def json_bytes(data):
+        """Encode data as UTF-8 JSON"""
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+
+    def json_dumps(data):
+        """Encode data as a JSON string, handling Decimal and date/time values"""
+        return json_bytes(data).decode('utf-8')
+else:
+    def json_dumps(data):
+        """Encode data as a JSON string, handling Decimal and date/time values"""
+        return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    def json_bytes(data):
+        """Encode data as UTF-8 JSON"""
+        return json_dumps(data).encode('utf-8')
+
+class RowMaterializer:
+    """Turns rows from one cursor into dicts, converting DECIMAL columns to float"""
+
+    def __init__(self, cursor, sample_row=None):
+        description = cursor.description or ()
+        self.columns = tuple(column[0] for column in description)
+        decimal_columns = {
+            index for index, column in enumerate(description) if column[1] in DECIMAL_TYPE_CODES
+        }
+        # Drivers that report no type codes still show Decimals in the data
+        if sample_row is not None:
+            decimal_columns.update(index for index, value in enumerate(sample_row) if isinstance(value, Decimal))
+        self.decimal_columns = tuple(sorted(decimal_columns))
+
+    def _convert(self, row):
+        row = list(row)
+        for index in self.decimal_columns:
+            value = row[index]
+            if value is not None:
+                row[index] = float(value)
+        return row
+
+    def one(self, row):
+        """Convert a single row"""
+        if self.decimal_columns:
+            row = self._convert(row)
+        return dict(zip(self.columns, row))
+
+    def all(self, rows):
+        """Convert a list of rows"""
+        columns = self.columns
+        if self.decimal_columns:
+            convert = self._convert
+            return [dict(zip(columns, convert(row))) for row in rows]
+        return [dict(zip(columns, row)) for row in rows]
+
+def rows_to_dicts(cursor, rows=None):
+    """Fetch (unless rows are given) and convert every row of the cursor's current result"""
+    if rows is None:
+        rows = cursor.fetchall()
+    if not rows:
+        return []
+    return RowMaterializer(cursor, rows[0]).all(rows)
+
+def row_to_dict(cursor, row):
+    """Convert one row of the cursor's current result"""
+    return RowMaterializer(cursor, row).one(row)
+
+def iso_date(value):
+    """date/datetime to ISO 8601, passing NULL through"""
+    return value.isoformat() if value is not None else None
+
+def to_float(value):
+    """DECIMAL to float, passing NULL through"""
+    return float(value) if value is not None else None
+
+class ResponseShape:
+    """Declarative mapping from result columns to response fields
+
+    fields is a sequence of (response_name, column, convert), convert being a function
+    or None. For each column layout the mapping is compiled once into a function that
+    reads the row tuple by index and returns the response dict in a single expression,
+    so rows are never built into a column-named dict and then renamed.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._compiled = {}
+
+    def compile(self, columns):
+        """Return the row transformer for rows with these columns"""
+        columns = tuple(columns)
+        shape = self._compiled.get(columns)
+        if shape is None:
+            positions = {column: index for index, column in enumerate(columns)}
+            namespace = {}
+            items = []
+            for number, (name, column, convert) in enumerate(self.fields):
+                if column not in positions:
+                    raise KeyError(f"Response field {name!r} needs column {column!r}, which the query does not select")
+                value = f"row[{positions[column]}]"
+                if convert is not None:
+                    namespace[f"convert_{number}"] = convert
+                    value = f"convert_{number}({value})"
+                items.append(f"{name!r}: {value}")
+            exec(f"def shape(row):\n    return {{{', '.join(items)}}}\n", namespace)
+            shape = self._compiled[columns] = namespace['shape']
+        return shape
+
+    def one(self, cursor, row):
+        """Shape a single row from the cursor's current result"""
+        return self.compile(cursor.column_names)(row)
+
+    def all(self, cursor, rows):
+        """Shape a list of rows from the cursor's current result"""
+        return list(map(self.compile(cursor.column_names), rows))
@@ -1,28 +1,60 @@
 import os
 import json
 import http.server
-import socketserver
 import urllib.parse
 import mimetypes
 from http import HTTPStatus
 from datetime import datetime
 from urllib.parse import parse_qs, urlparse
-from decimal import Decimal
 
 # Import modules
-from auth import register_user, login_user, login_admin, register_artist, login_artist
-from artwork import get_all_artworks, get_artwork, create_artwork, update_artwork, delete_artwork
-from exhibition import get_all_exhibitions, get_exhibition, create_exhibition, update_exhibition, delete_exhibition
-from contact import create_contact_message, get_messages, update_message, json_dumps
-from db_setup import initialize_database
+from auth import register_user, login_user, login_admin, register_artist, login_artist, purge_expired_2fa_codes
+from artwork import get_all_artworks, get_artwork, get_similar_artworks, get_trending_artworks, create_artwork, update_artwork, delete_artwork
+from similar_artworks import DEFAULT_SIMILAR, SIMILAR_FEATURES_REFRESH_SECONDS, load_features
+import view_counters
+from scheduler import scheduler
+from exhibition import get_all_exhibitions, get_exhibition, get_trending_exhibitions, create_exhibition, update_exhibition, delete_exhibition, refresh_exhibition_statuses
+from contact import create_contact_message, get_messages, update_message
+from serialization import json_dumps, json_bytes
+from compression import negotiate_encoding, compress, CompressingWriter
+from response_cache import cached_response, ARTWORKS, EXHIBITIONS
+from search_index import search_catalog, DEFAULT_SEARCH_LIMIT
+from autocomplete import get_suggestions, build as build_autocomplete, DEFAULT_SUGGESTION_LIMIT
+from recommendations import get_recommendations, get_popular_artworks, refresh_model, RECOMMENDATION_REFRESH_SECONDS, DEFAULT_RECOMMENDATIONS
+from migrations import check_schema_version, apply_pending_migrations
 from middleware import auth_required, admin_required, extract_auth_token, verify_token
-from mpesa import handle_stk_push_request, check_transaction_status, handle_mpesa_callback
-from db_operations import get_all_tickets, get_all_orders, get_artist_artworks, get_artist_orders, get_all_artists, get_user_orders
-from database import get_db_connection  # Add this import
+from order_expiry import expire_abandoned_orders
+from archive import archive_history
+from mpesa import handle_stk_push_request, check_transaction_status, handle_mpesa_callback, reconcile_pending_transactions
+from db_operations import get_all_tickets, get_all_orders, get_artist_artworks, get_artist_orders, get_all_artists, get_user_orders, DEFAULT_PAGE_SIZE
+from database import get_db_connection, begin_request, end_request, check_replicas, DB_REPLICAS, REPLICA_CHECK_SECONDS
+from reports import get_sales_report
+from exports import EXPORTS, FORMATS as EXPORT_FORMATS, ChunkedWriter, start_export, stream_export
+from checkin import load_checkin_index, check_in_ticket, sync_offline_scans
+from ticket_renderer import get_ticket_booking, render_ticket_pdf, stream_exhibition_tickets, shutdown_renderer
 
 # Define the port
 PORT = 8000
 
+# Keep-alive: idle seconds before a connection is closed, and responses per connection
+KEEPALIVE_TIMEOUT = int(os.environ.get('KEEPALIVE_TIMEOUT', '15'))
+KEEPALIVE_MAX_REQUESTS = int(os.environ.get('KEEPALIVE_MAX_REQUESTS', '100'))
+
+# Compressed JSON bodies at least this large are compressed while being written
+COMPRESSION_STREAM_BYTES = 1024 * 1024
+STREAM_WRITE_BYTES = 64 * 1024
+
+# Cron schedule (local time) on which exhibitions move to 'ongoing' or 'past', just after the date changes
+EXHIBITION_STATUS_CRON = '0 0 * * *'
+# Pending M-Pesa payments whose callback never came are queried every five minutes
+MPESA_RECONCILE_CRON = '*/5 * * * *'
+# Abandoned pending orders and bookings are expired hourly
+ORDER_EXPIRY_CRON = '15 * * * *'
+# Old settled bookings, orders and transactions move to the archive tables nightly
+ARCHIVE_CRON = '30 3 * * *'
+# Seconds between purges of expired 2FA codes
+TWO_FA_PURGE_SECONDS = 600
+
 # Ensure the static/uploads directory exists
 def ensure_uploads_directory():
     uploads_dir = os.path.join(os.path.dirname(__file__), "static", "uploads")
@@ -78,111 +110,175 @@ def create_default_exhibition_image():
 create_placeholder_svg()
 create_default_exhibition_image()
 
-# Custom JSON encoder to handle Decimal types
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super(DecimalEncoder, self).default(obj)
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    # Persistent connections: every response carries a Content-Length or is chunked
+    protocol_version = 'HTTP/1.1'
+    # Seconds a kept-alive connection may sit idle before it is closed
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body are separate writes; without TCP_NODELAY the body of a reused
+    # connection waits on the client's delayed ACK
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        super().setup()
+        self.requests_served = 0
+    
+    def parse_request(self):
+        """Parse the request line and headers, then tell the database layer whose request this is
 
-# Mock data for tickets (in a real app, this would come from a database)
-# We'll use this for demo purposes
-mock_tickets = [
-    {
-        "id": "ticket-001",
-        "userId": "user-123",
-        "userName": "John Doe",
-        "exhibitionId": "exhibition-1",
-        "exhibitionTitle": "Modern Art Showcase",
-        "bookingDate": "2025-04-20T14:00:00",
-        "ticketCode": "EXHB-001-123",
-        "slots": 2,
-        "status": "active"
-    },
-    {
-        "id": "ticket-002",
-        "userId": "user-456",
-        "userName": "Jane Smith",
-        "exhibitionId": "exhibition-2",
-        "exhibitionTitle": "Classical Paintings",
-        "bookingDate": "2025-04-21T10:30:00",
-        "ticketCode": "EXHB-002-456",
-        "slots": 1,
-        "status": "used"
-    },
-    {
-        "id": "ticket-003",
-        "userId": "user-789",
-        "userName": "Alex Johnson",
-        "exhibitionId": "exhibition-1",
-        "exhibitionTitle": "Modern Art Showcase",
-        "bookingDate": "2025-04-22T16:15:00",
-        "ticketCode": "EXHB-001-789",
-        "slots": 3,
-        "status": "cancelled"
-    }
-]
+        The session is the bearer token, or the client address for anonymous requests, so
+        catalog reads after a user's own change are not served by a lagging replica.
+        """
+        if not super().parse_request():
+            return False
+        begin_request(self.headers.get('Authorization') or self.client_address[0])
+        return True
+    
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        finally:
+            end_request(wrote=getattr(self, 'command', None) in ('POST', 'PUT', 'DELETE'))
+    
+    def send_response(self, code, message=None):
+        """Send the status line and tell the client whether the connection stays open
 
-# Function to get all tickets (mock implementation)
-def get_all_tickets(auth_header):
-    """Get all tickets (admin only)"""
-    print(f"Getting all tickets with auth header: {auth_header[:20]}... (truncated)")
+        A connection is closed after KEEPALIVE_MAX_REQUESTS responses so long-lived
+        clients are spread across threads rather than pinning one indefinitely.
+        """
+        super().send_response(code, message)
+        self.requests_served += 1
+        if self.close_connection:
+            return
+        if self.requests_served >= KEEPALIVE_MAX_REQUESTS:
+            self.send_header('Connection', 'close')
+            return
+        if self.request_version == 'HTTP/1.0':
+            self.send_header('Connection', 'keep-alive')
+        self.send_header('Keep-Alive', f'timeout={KEEPALIVE_TIMEOUT}, max={KEEPALIVE_MAX_REQUESTS - self.requests_served}')
     
-    # Extract and verify token - directly use the token from auth_header
-    token = extract_auth_token(auth_header)
-    if not token:
-        print("Authentication required - no token found")
-        return {"error": "Authentication required"}
+    def _set_response(self, status_code=200, content_type='application/json'):
+        """Send headers for a response without a body (JSON bodies go through _send_json)"""
+        self.send_response(status_code)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', '0')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.end_headers()
     
-    payload = verify_token(token)
-    if isinstance(payload, dict) and "error" in payload:
-        print(f"Authentication failed: {payload['error']}")
-        return {"error": payload["error"]}
+    def _set_download_response(self, content_type, filename, content_length):
+        """Send headers for a file download of known length (streamed downloads use _send_stream_response)"""
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Content-Length', str(content_length))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.send_header('Access-Control-Expose-Headers', 'Content-Disposition')
+        self.end_headers()
     
-    # Check if user is admin
-    if not payload.get("is_admin", False):
-        print("Access denied - not an admin user")
-        return {"error": "Unauthorized access: Admin privileges required"}
+    def _send_body(self, body, status_code=200, encoding=None, content_type='application/json'):
+        """Send a complete, already encoded body with its length"""
+        self.send_response(status_code)
+        self.send_header('Content-type', content_type)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.end_headers()
+        self.wfile.write(body)
     
-    print(f"Admin user authenticated, returning {len(mock_tickets)} tickets")
-    # Return tickets data
-    return {"tickets": mock_tickets}
+    def _send_json(self, data, status_code=200):
+        """Send a JSON response, compressed when the client accepts it and it is large enough
 
-# Function to generate exhibition ticket (mock implementation)
-def generate_ticket(booking_id, auth_header):
-    # Extract and verify token
-    token = extract_auth_token(auth_header)
-    if not token:
-        return {"error": "Authentication required"}
+        Bodies of COMPRESSION_STREAM_BYTES or more are compressed as they are written
+        instead of being compressed into a second full copy first.
+        """
+        body = json_bytes(data)
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'), len(body))
+        if encoding and len(body) >= COMPRESSION_STREAM_BYTES:
+            out = self._send_stream_response('application/json', encoding=encoding, status_code=status_code)
+            view = memoryview(body)
+            for start in range(0, len(body), STREAM_WRITE_BYTES):
+                out.write(view[start:start + STREAM_WRITE_BYTES])
+            self._end_stream(out)
+            return
+        self._send_body(compress(body, encoding) if encoding else body, status_code, encoding)
     
-    payload = verify_token(token)
-    if isinstance(payload, dict) and "error" in payload:
-        return {"error": payload["error"]}
+    def _send_cached(self, cached):
+        """Send a cached response, reusing its stored compressed variant"""
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'), len(cached.body))
+        self._send_body(cached.encoded(encoding), 200, encoding)
     
-    # In a real application, we would generate a PDF here
-    # For demo purposes, we'll return mock data
-    return {
-        "pdfData": "Mock PDF data for ticket " + booking_id,
-        "success": True
-    }
-
-class RequestHandler(http.server.BaseHTTPRequestHandler):
+    def _send_trending(self, parsed_url, kind, build):
+        """Send the most viewed artworks or exhibitions, cached like the catalog listings"""
+        params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+        try:
+            days = int(params.get('days', view_counters.DEFAULT_TRENDING_DAYS))
+            limit = int(params.get('limit', view_counters.DEFAULT_TRENDING_LIMIT))
+        except ValueError:
+            self._send_json({"error": "Invalid days or limit parameter"}, 400)
+            return
+        days = max(1, min(days, view_counters.MAX_TRENDING_DAYS))
+        limit = max(1, min(limit, view_counters.MAX_TRENDING_LIMIT))
+        
+        cached = cached_response(('trending', kind, days, limit), lambda: build(days, limit))
+        if "error" in cached.data:
+            self._send_json(cached.data, 500)
+            return
+        self._send_cached(cached)
     
-    def _set_response(self, status_code=200, content_type='application/json'):
+    def _send_stream_response(self, content_type, filename=None, encoding=None, status_code=200):
+        """Send headers for a body of unknown length and return the writer for it
+
+        HTTP/1.1 clients get chunked transfer encoding and keep the connection; HTTP/1.0
+        clients get a body that ends when the connection closes. With an encoding the writer
+        compresses as it goes. Finish the body with _end_stream, or set close_connection if
+        it has to be cut short.
+        """
+        chunked = self.request_version == 'HTTP/1.1'
+        if not chunked:
+            self.close_connection = True
         self.send_response(status_code)
         self.send_header('Content-type', content_type)
+        if filename:
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.send_header('Access-Control-Expose-Headers', 'Content-Disposition')
         self.end_headers()
+        out = ChunkedWriter(self.wfile) if chunked else self.wfile
+        return CompressingWriter(out, encoding) if encoding else out
+    
+    def _end_stream(self, out):
+        """Finish a body started with _send_stream_response"""
+        if isinstance(out, CompressingWriter):
+            out.close()
+            out = out.out
+        if isinstance(out, ChunkedWriter):
+            out.close()
+        else:
+            out.flush()
     
     def do_OPTIONS(self):
         self._set_response()
     
     def serve_static_file(self, file_path):
         """Serve a static file based on its MIME type"""
+        headers_sent = False
         try:
             # Check if file exists
             if not os.path.exists(file_path):
@@ -192,12 +288,10 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                     if os.path.exists(placeholder_path):
                         file_path = placeholder_path
                     else:
-                        self.send_response(404)
-                        self.end_headers()
+                        self._set_response(404)
                         return
                 else:
-                    self.send_response(404)
-                    self.end_headers()
+                    self._set_response(404)
                     return
                 
             # Determine the content type
@@ -213,6 +307,7 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             self.send_header('Content-type', content_type)
             self.send_header('Content-Length', str(file_size))
             self.end_headers()
+            headers_sent = True
             
             # Read and send the file
             with open(file_path, 'rb') as f:
@@ -220,8 +315,11 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 
         except Exception as e:
             print(f"Error serving static file: {e}")
-            self.send_response(500)
-            self.end_headers()
+            if headers_sent:
+                # The client expects the promised number of bytes; closing is the only way to signal failure
+                self.close_connection = True
+            else:
+                self._set_response(500)
     
     def do_GET(self):
         parsed_url = urllib.parse.urlparse(self.path)
@@ -245,32 +343,135 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
         # Handle API endpoints
         # Handle GET /artworks
         if path == '/artworks':
-            response = get_all_artworks()
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_cached(cached_response(ARTWORKS, get_all_artworks))
+            return
+        
+        # Handle GET /artworks/trending?days=&limit=
+        elif path == '/artworks/trending':
+            self._send_trending(parsed_url, view_counters.ARTWORK, get_trending_artworks)
             return
         
         # Handle GET /artworks/{id}
         elif path.startswith('/artworks/') and len(path.split('/')) == 3:
             artwork_id = path.split('/')[2]
             response = get_artwork(artwork_id)
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            if "error" not in response:
+                view_counters.record_view(view_counters.ARTWORK, response["id"])
+            self._send_json(response)
+            return
+        
+        # Handle GET /artworks/{id}/similar?limit=
+        elif path.startswith('/artworks/') and path.endswith('/similar') and len(path.split('/')) == 4:
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            try:
+                artwork_id = int(path.split('/')[2])
+                limit = int(params.get('limit', DEFAULT_SIMILAR))
+            except ValueError:
+                self._send_json({"error": "Invalid artwork id or limit parameter"}, 400)
+                return
+            
+            response = get_similar_artworks(artwork_id, limit)
+            if "error" in response:
+                self._send_json(response, 404 if response["error"] == "Artwork not found" else 500)
+                return
+            self._send_json(response)
             return
         
         # Handle GET /exhibitions
         elif path == '/exhibitions':
-            response = get_all_exhibitions()
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_cached(cached_response(EXHIBITIONS, get_all_exhibitions))
+            return
+        
+        # Handle GET /exhibitions/trending?days=&limit=
+        elif path == '/exhibitions/trending':
+            self._send_trending(parsed_url, view_counters.EXHIBITION, get_trending_exhibitions)
             return
         
         # Handle GET /exhibitions/{id}
         elif path.startswith('/exhibitions/') and len(path.split('/')) == 3:
             exhibition_id = path.split('/')[2]
             response = get_exhibition(exhibition_id)
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            if "error" not in response:
+                view_counters.record_view(view_counters.EXHIBITION, response["id"])
+            self._send_json(response)
+            return
+        
+        # Handle GET /search?q=...&type=artwork|exhibition&limit=&offset=
+        elif path == '/search':
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            kind = params.get('type') or None
+            if kind not in (None, 'artwork', 'exhibition'):
+                self._send_json({"error": "Invalid type parameter"}, 400)
+                return
+            try:
+                limit = int(params.get('limit', DEFAULT_SEARCH_LIMIT))
+                offset = int(params.get('offset', 0))
+            except ValueError:
+                self._send_json({"error": "Invalid limit or offset parameter"}, 400)
+                return
+            
+            response = search_catalog(params.get('q', ''), kind, limit, offset)
+            self._send_json(response, 500 if "error" in response else 200)
+            return
+        
+        # Handle GET /autocomplete?q=...&limit=
+        elif path == '/autocomplete':
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            try:
+                limit = int(params.get('limit', DEFAULT_SUGGESTION_LIMIT))
+            except ValueError:
+                self._send_json({"error": "Invalid limit parameter"}, 400)
+                return
+            
+            response = get_suggestions(params.get('q', ''), limit)
+            self._send_json(response, 500 if "error" in response else 200)
+            return
+        
+        # Handle GET /recommendations/popular?limit= - what users without history are recommended
+        elif path == '/recommendations/popular':
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            try:
+                limit = int(params.get('limit', DEFAULT_RECOMMENDATIONS))
+            except ValueError:
+                self._send_json({"error": "Invalid limit parameter"}, 400)
+                return
+            
+            response = get_popular_artworks(limit)
+            self._send_json(response, 500 if "error" in response else 200)
+            return
+        
+        # Handle GET /recommendations/{user_id}?limit=
+        elif path.startswith('/recommendations/') and len(path.split('/')) == 3:
+            user_id = path.split('/')[2]
+            
+            auth_header = self.headers.get('Authorization', '')
+            token = extract_auth_token(auth_header)
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
+                return
+            
+            payload = verify_token(token)
+            if isinstance(payload, dict) and "error" in payload:
+                self._send_json({"error": payload["error"]}, 401)
+                return
+            
+            # Users see their own recommendations; admins may look at anyone's. Artist ids share
+            # their range with user ids, so an artist token never counts as the user's own.
+            is_owner = not payload.get("is_artist", False) and str(payload.get("sub")) == user_id
+            if not payload.get("is_admin", False) and not is_owner:
+                self._send_json({"error": "Access denied - you can only view your own recommendations"}, 403)
+                return
+            
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            try:
+                user_id = int(user_id)
+                limit = int(params.get('limit', DEFAULT_RECOMMENDATIONS))
+            except ValueError:
+                self._send_json({"error": "Invalid user id or limit parameter"}, 400)
+                return
+            
+            response = get_recommendations(user_id, limit)
+            self._send_json(response, 500 if "error" in response else 200)
             return
         
         # Handle GET /user/{user_id}/orders - NEW ENDPOINT
@@ -283,15 +484,13 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             token = extract_auth_token(auth_header)
             if not token:
                 print("Authentication required - no token found")
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if isinstance(payload, dict) and "error" in payload:
                 print(f"Authentication failed: {payload['error']}")
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": payload["error"]}).encode())
+                self._send_json({"error": payload["error"]}, 401)
                 return
             
             # Check if user is requesting their own data or is admin
@@ -300,23 +499,26 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             
             if not is_admin and requesting_user_id != user_id:
                 print(f"Access denied - user {requesting_user_id} trying to access data for user {user_id}")
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Access denied - you can only view your own orders"}).encode())
+                self._send_json({"error": "Access denied - you can only view your own orders"}, 403)
                 return
             
             print(f"Authorized request for user {user_id} orders")
             
-            # Get user orders and bookings
-            response = get_user_orders(user_id)
-            print(f"User orders response: {response}")
+            # Get one page of the user's orders and bookings (query parameters: limit, cursor)
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            try:
+                limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+            except ValueError:
+                self._send_json({"error": "Invalid limit parameter"}, 400)
+                return
+            
+            response = get_user_orders(user_id, limit=limit, after=params.get('cursor'))
             
             if "error" in response:
-                self._set_response(500)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 400 if response["error"] == "Invalid cursor" else 500)
                 return
             
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Handle GET /messages (admin only)
@@ -330,15 +532,59 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             print(f"Get messages response: {response}")
             
             if "error" in response:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": response["error"]}).encode())
+                self._send_json({"error": response["error"]}, 401)
                 return
             
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
+            return
+            
+        # Handle GET /reports (admin only)
+        # Query parameters: granularity (day, week, month), dateFrom, dateTo (YYYY-MM-DD)
+        elif path == '/reports':
+            auth_header = self.headers.get('Authorization', '')
+            
+            # Verify admin access
+            token = extract_auth_token(auth_header)
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
+                return
+            
+            payload = verify_token(token)
+            if not payload.get("is_admin", False):
+                self._send_json({"error": "Admin access required"}, 403)
+                return
+            
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            response = get_sales_report(
+                granularity=params.get('granularity', 'day'),
+                date_from=params.get('dateFrom'),
+                date_to=params.get('dateTo')
+            )
+            
+            if "error" in response:
+                self._send_json(response, 500 if response["error"] == "Database connection failed" else 400)
+                return
+            
+            self._send_json(response)
+            return
+            
+        # Handle GET /jobs (admin only): scheduled job metrics
+        elif path == '/jobs':
+            token = extract_auth_token(self.headers.get('Authorization', ''))
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
+                return
+            
+            payload = verify_token(token)
+            if not payload.get("is_admin", False):
+                self._send_json({"error": "Admin access required"}, 403)
+                return
+            
+            self._send_json(scheduler.metrics())
             return
             
         # Handle GET /tickets (admin only)
+        # Query parameters: exhibitionId, status, dateFrom, dateTo, ticketCode, limit, cursor
         elif path == '/tickets':
             print("Processing GET /tickets request")
             auth_header = self.headers.get('Authorization', '')
@@ -346,21 +592,45 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             # Verify admin access
             token = extract_auth_token(auth_header)
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if not payload.get("is_admin", False):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Admin access required"}).encode())
+                self._send_json({"error": "Admin access required"}, 403)
                 return
             
-            # Get tickets from database
-            from db_operations import get_all_tickets
-            response = get_all_tickets()
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            
+            status = params.get('status')
+            if status and status not in ('active', 'used', 'cancelled'):
+                self._send_json({"error": "Invalid status filter"}, 400)
+                return
+            
+            try:
+                date_from = datetime.fromisoformat(params['dateFrom']) if params.get('dateFrom') else None
+                date_to = datetime.fromisoformat(params['dateTo']) if params.get('dateTo') else None
+                limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+            except ValueError:
+                self._send_json({"error": "Invalid date or limit parameter"}, 400)
+                return
+            
+            # Get one page of tickets from the database
+            response = get_all_tickets(
+                exhibition_id=params.get('exhibitionId'),
+                status=status,
+                date_from=date_from,
+                date_to=date_to,
+                ticket_code=params.get('ticketCode'),
+                limit=limit,
+                after=params.get('cursor')
+            )
+            
+            if "error" in response:
+                self._send_json(response, 400 if response["error"] == "Invalid cursor" else 500)
+                return
+            
+            self._send_json(response)
             return
         
         # Handle GET /orders (admin only)
@@ -371,21 +641,60 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             # Verify admin access
             token = extract_auth_token(auth_header)
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if not payload.get("is_admin", False):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Admin access required"}).encode())
+                self._send_json({"error": "Admin access required"}, 403)
                 return
             
             # Get orders from database
             from db_operations import get_all_orders
             response = get_all_orders()
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
+            return
+
+        # Handle GET /export/{orders|tickets|messages} (admin only) - every matching row as CSV or NDJSON
+        # Query parameters: format (csv, ndjson) and the filters listed for the export in exports.py
+        elif path.startswith('/export/') and len(path.split('/')) == 3:
+            export_name = path.split('/')[2]
+            auth_header = self.headers.get('Authorization', '')
+            
+            # Verify admin access
+            token = extract_auth_token(auth_header)
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
+                return
+            
+            payload = verify_token(token)
+            if not payload.get("is_admin", False):
+                self._send_json({"error": "Admin access required"}, 403)
+                return
+            
+            params = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+            export_format = params.get('format', 'csv')
+            if export_name not in EXPORTS or export_format not in EXPORT_FORMATS:
+                self._send_json({"error": "Unknown export or format"}, 404 if export_name not in EXPORTS else 400)
+                return
+            
+            # Connect and start the query before any headers go out, so failures get a JSON 500
+            export = start_export(export_name, params)
+            if isinstance(export, dict):
+                self._send_json({"error": export["error"]}, 500)
+                return
+            
+            content_type, extension = EXPORT_FORMATS[export_format]
+            filename = f"{export_name}_{datetime.now().strftime('%Y-%m-%d')}.{extension}"
+            encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+            out = self._send_stream_response(content_type, filename, encoding)
+            result = stream_export(export_name, export_format, out, export)
+            print(f"Export {export_name} ({export_format}) result: {result}")
+            # A failed export is left unterminated so the client sees it was cut short
+            if "error" in result:
+                self.close_connection = True
+            else:
+                self._end_stream(out)
             return
 
         # Handle GET /artists (admin only)
@@ -396,20 +705,17 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             # Verify admin access
             token = extract_auth_token(auth_header)
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if not payload.get("is_admin", False):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Admin access required"}).encode())
+                self._send_json({"error": "Admin access required"}, 403)
                 return
             
             # Get artists from database
             response = get_all_artists()
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
             
         # Handle GET /artist/artworks (artist only)
@@ -419,21 +725,18 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             # Verify artist access
             token = extract_auth_token(auth_header)
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if not payload.get("is_artist", False):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Artist access required"}).encode())
+                self._send_json({"error": "Artist access required"}, 403)
                 return
             
             # Get artworks by artist ID
             artist_id = payload.get("sub")
             response = get_artist_artworks(artist_id)
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
             
         # Handle GET /artist/orders (artist only)
@@ -443,44 +746,101 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             # Verify artist access
             token = extract_auth_token(auth_header)
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if not payload.get("is_artist", False):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Artist access required"}).encode())
+                self._send_json({"error": "Artist access required"}, 403)
                 return
             
             # Get orders for artworks by artist ID
             artist_id = payload.get("sub")
             response = get_artist_orders(artist_id)
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
             
-        # Handle GET /tickets/generate/{id} (generate ticket)
+        # Handle GET /tickets/generate/{id} (download a ticket PDF)
         elif path.startswith('/tickets/generate/') and len(path.split('/')) == 4:
             booking_id = path.split('/')[3]
             print(f"Processing generate ticket request for booking {booking_id}")
             auth_header = self.headers.get('Authorization', '')
             
-            # Generate ticket
-            response = generate_ticket(booking_id, auth_header)
+            token = extract_auth_token(auth_header)
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
+                return
             
-            if "error" in response:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": response["error"]}).encode())
+            payload = verify_token(token)
+            if isinstance(payload, dict) and "error" in payload:
+                self._send_json({"error": payload["error"]}, 401)
+                return
+            
+            ticket = get_ticket_booking(booking_id)
+            if "error" in ticket:
+                self._send_json({"error": ticket["error"]}, 404 if "not found" in ticket["error"] else 500)
+                return
+            
+            # Users may only download their own tickets; admins may download any
+            is_owner = not payload.get("is_artist", False) and str(payload.get("sub")) == str(ticket["user_id"])
+            if not (payload.get("is_admin", False) or is_owner):
+                self._send_json({"error": "Access denied - you can only download your own tickets"}, 403)
                 return
             
-            self._set_response()
-            self.wfile.write(json_dumps(response).encode())
+            # Only paid, uncancelled bookings get a scannable ticket, as in the exhibition's bulk PDF
+            if ticket["status"] == 'cancelled':
+                self._send_json({"error": "This booking has been cancelled"}, 409)
+                return
+            if ticket["payment_status"] != 'completed':
+                self._send_json({"error": "Payment for this booking has not completed"}, 402)
+                return
+            
+            try:
+                pdf = render_ticket_pdf(ticket)
+            except Exception as e:
+                print(f"Error rendering ticket {booking_id}: {e}")
+                self._send_json({"error": "Failed to render ticket"}, 500)
+                return
+            
+            filename = f"exhibition-ticket-{ticket['ticket_code'] or booking_id}.pdf"
+            self._set_download_response('application/pdf', filename, len(pdf))
+            self.wfile.write(pdf)
+            return
+        
+        # Handle GET /exhibitions/{id}/tickets (admin only) - every attendee's ticket in one PDF
+        elif path.startswith('/exhibitions/') and path.endswith('/tickets') and len(path.split('/')) == 4:
+            exhibition_id = path.split('/')[2]
+            auth_header = self.headers.get('Authorization', '')
+            
+            # Verify admin access
+            token = extract_auth_token(auth_header)
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
+                return
+            
+            payload = verify_token(token)
+            if not payload.get("is_admin", False):
+                self._send_json({"error": "Admin access required"}, 403)
+                return
+            
+            # Check the exhibition before the 200 goes out; errors after that can only close the stream
+            exhibition = get_exhibition(exhibition_id)
+            if "error" in exhibition:
+                self._send_json({"error": exhibition["error"]}, 404 if exhibition["error"] == "Exhibition not found" else 500)
+                return
+            
+            # Pages are streamed as they are rendered, so the length is not known up front
+            out = self._send_stream_response('application/pdf', f"exhibition-{exhibition_id}-tickets.pdf")
+            result = stream_exhibition_tickets(exhibition_id, out)
+            print(f"Exhibition {exhibition_id} ticket batch result: {result}")
+            if "error" in result:
+                self.close_connection = True
+            else:
+                self._end_stream(out)
             return
         
         # Default 404 response
-        self._set_response(404)
-        self.wfile.write(json_dumps({"error": "Resource not found"}).encode())
+        self._send_json({"error": "Resource not found"}, 404)
     
     def do_POST(self):
         # Get content length
@@ -503,6 +863,8 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             elif "multipart/form-data" in content_type:
                 # For multipart form data (like file uploads), will be handled in specific endpoints
                 print("Multipart form data detected, will handle in endpoint")
+                # No endpoint parses it yet; consume it so the next request on the connection starts cleanly
+                self.rfile.read(content_length)
             else:
                 # Handle plain form data (url-encoded)
                 form_data = self.rfile.read(content_length).decode('utf-8')
@@ -517,8 +879,7 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
         # Register user
         if path == '/register':
             if not post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Missing registration data"}).encode())
+                self._send_json({"error": "Missing registration data"}, 400)
                 return
             
             print(f"Registration data: {post_data}")
@@ -528,8 +889,7 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             missing_fields = [field for field in required_fields if field not in post_data]
             
             if missing_fields:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": f"Missing required fields: {', '.join(missing_fields)}"}).encode())
+                self._send_json({"error": f"Missing required fields: {', '.join(missing_fields)}"}, 400)
                 return
             
             # Register the user
@@ -541,18 +901,17 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             )
             
             if "error" in response:
-                self._set_response(400)
+                status_code = 400
             else:
-                self._set_response(201)
+                status_code = 201
             
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response, status_code)
             return
         
         # Register artist
         elif path == '/register-artist':
             if not post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Missing registration data"}).encode())
+                self._send_json({"error": "Missing registration data"}, 400)
                 return
             
             # Check required fields
@@ -560,8 +919,7 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             missing_fields = [field for field in required_fields if field not in post_data]
             
             if missing_fields:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": f"Missing required fields: {', '.join(missing_fields)}"}).encode())
+                self._send_json({"error": f"Missing required fields: {', '.join(missing_fields)}"}, 400)
                 return
             
             # Register the artist
@@ -574,99 +932,85 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             )
             
             if "error" in response:
-                self._set_response(400)
+                status_code = 400
             else:
-                self._set_response(201)
+                status_code = 201
             
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response, status_code)
             return
         
         # User login
         elif path == '/login':
             if not post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Missing login data"}).encode())
+                self._send_json({"error": "Missing login data"}, 400)
                 return
             
             # Check required fields
             if 'email' not in post_data or 'password' not in post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Email and password required"}).encode())
+                self._send_json({"error": "Email and password required"}, 400)
                 return
             
             # Login the user
             response = login_user(post_data['email'], post_data['password'])
             
             if "error" in response:
-                self._set_response(401)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 401)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Artist login
         elif path == '/artist-login':
             if not post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Missing login data"}).encode())
+                self._send_json({"error": "Missing login data"}, 400)
                 return
             
             # Check required fields
             if 'email' not in post_data or 'password' not in post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Email and password required"}).encode())
+                self._send_json({"error": "Email and password required"}, 400)
                 return
             
             # Login the artist
             response = login_artist(post_data['email'], post_data['password'])
             
             if "error" in response:
-                self._set_response(401)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 401)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Admin login - Fixed the endpoint
         elif path == '/admin-login':
             if not post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Missing login data"}).encode())
+                self._send_json({"error": "Missing login data"}, 400)
                 return
             
             # Check required fields
             if 'email' not in post_data or 'password' not in post_data:
-                self._set_response(400)
-                self.wfile.write(json_dumps({"error": "Email and password required"}).encode())
+                self._send_json({"error": "Email and password required"}, 400)
                 return
             
             # Login as admin
             response = login_admin(post_data['email'], post_data['password'])
             
             if "error" in response:
-                self._set_response(401)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 401)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Add 2FA endpoints for backward compatibility (though not used)
         elif path == '/send-2fa-code':
             # Return success for backward compatibility
-            self._set_response(200)
-            self.wfile.write(json_dumps({"success": True, "message": "2FA disabled"}).encode())
+            self._send_json({"success": True, "message": "2FA disabled"})
             return
             
         elif path == '/verify-2fa':
             # Return success for backward compatibility
-            self._set_response(200)
-            self.wfile.write(json_dumps({"verified": True}).encode())
+            self._send_json({"verified": True})
             return
         
         # Create artwork (admin or artist)
@@ -675,20 +1019,17 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             token = extract_auth_token(auth_header)
             
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if isinstance(payload, dict) and "error" in payload:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": payload["error"]}).encode())
+                self._send_json({"error": payload["error"]}, 401)
                 return
             
             # Check if user is admin or artist
             if not (payload.get("is_admin", False) or payload.get("is_artist", False)):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Unauthorized: Admin or artist privileges required"}).encode())
+                self._send_json({"error": "Unauthorized: Admin or artist privileges required"}, 403)
                 return
             
             # Add artist_id to the post_data if the request is from an artist
@@ -702,17 +1043,16 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 error_message = response["error"]
                 
                 if "Authentication" in error_message or "authorized" in error_message:
-                    self._set_response(401)
+                    status_code = 401
                 elif "Admin" in error_message:
-                    self._set_response(403)
+                    status_code = 403
                 else:
-                    self._set_response(400)
+                    status_code = 400
                     
-                self.wfile.write(json_dumps({"error": error_message}).encode())
+                self._send_json({"error": error_message}, status_code)
                 return
             
-            self._set_response(201)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response, 201)
             return
         
         # Create exhibition (admin only)
@@ -724,17 +1064,16 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 error_message = response["error"]
                 
                 if "Authentication" in error_message or "authorized" in error_message:
-                    self._set_response(401)
+                    status_code = 401
                 elif "Admin" in error_message:
-                    self._set_response(403)
+                    status_code = 403
                 else:
-                    self._set_response(400)
+                    status_code = 400
                     
-                self.wfile.write(json_dumps({"error": error_message}).encode())
+                self._send_json({"error": error_message}, status_code)
                 return
             
-            self._set_response(201)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response, 201)
             return
         
         # Create contact message
@@ -742,11 +1081,11 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             response = create_contact_message(post_data)
             
             if "error" in response:
-                self._set_response(400)
+                status_code = 400
             else:
-                self._set_response(201)
+                status_code = 201
             
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response, status_code)
             return
         
         # Update message status (admin only)
@@ -754,30 +1093,27 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             message_id = path.split('/')[2]
             token = extract_auth_token(self)
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if isinstance(payload, dict) and "error" in payload:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": payload["error"]}).encode())
+                self._send_json({"error": payload["error"]}, 401)
                 return
             
             # Check if user is admin
             if not payload.get("is_admin", False):
-                self._set_response(403)
-                self.wfile.write(json_dumps({"error": "Unauthorized access: Admin privileges required"}).encode())
+                self._send_json({"error": "Unauthorized access: Admin privileges required"}, 403)
                 return
             
             response = update_message(self.headers.get('Authorization', ''), message_id, post_data)
             
             if "error" in response:
-                self._set_response(400)
+                status_code = 400
             else:
-                self._set_response(200)
+                status_code = 200
             
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response, status_code)
             return
         
         # New M-Pesa STK Push endpoint
@@ -786,12 +1122,10 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             response = handle_stk_push_request(post_data)
             
             if "error" in response:
-                self._set_response(400)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 400)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
             
         # M-Pesa callback endpoint
@@ -800,12 +1134,10 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             response = handle_mpesa_callback(post_data)
             
             if "error" in response:
-                self._set_response(400)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 400)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
             
         # M-Pesa transaction status check endpoint
@@ -816,17 +1148,57 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             response = check_transaction_status(checkout_request_id)
             
             if "error" in response:
-                self._set_response(400)
-                self.wfile.write(json_dumps(response).encode())
+                self._send_json(response, 400)
+                return
+            
+            self._send_json(response)
+            return
+        
+        # Ticket check-in at the door (admin only)
+        # POST /checkin/{exhibition_id}          - redeem one scanned ticket code
+        # POST /checkin/{exhibition_id}/sync     - apply scans buffered by an offline scanner
+        # POST /checkin/{exhibition_id}/preload  - (re)load the exhibition's in-memory ticket index
+        elif path.startswith('/checkin/') and len(path.split('/')) in (3, 4):
+            parts = path.split('/')
+            exhibition_id = parts[2]
+            action = parts[3] if len(parts) == 4 else None
+            
+            token = extract_auth_token(self)
+            if not token:
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            payload = verify_token(token)
+            if isinstance(payload, dict) and "error" in payload:
+                self._send_json({"error": payload["error"]}, 401)
+                return
+            
+            if not payload.get("is_admin", False):
+                self._send_json({"error": "Unauthorized access: Admin privileges required"}, 403)
+                return
+            
+            if action is None:
+                if not post_data.get("ticketCode"):
+                    self._send_json({"error": "ticketCode is required"}, 400)
+                    return
+                response = check_in_ticket(exhibition_id, post_data["ticketCode"])
+            elif action == 'sync':
+                scans = post_data.get("scans")
+                if not isinstance(scans, list):
+                    self._send_json({"error": "scans must be a list"}, 400)
+                    return
+                response = sync_offline_scans(exhibition_id, scans)
+            elif action == 'preload':
+                response = load_checkin_index(exhibition_id)
+            else:
+                self._send_json({"error": "Resource not found"}, 404)
+                return
+            
+            self._send_json(response, 500 if "error" in response else 200)
             return
         
         # Default 404 response
-        self._set_response(404)
-        self.wfile.write(json_dumps({"error": "Resource not found"}).encode())
+        self._send_json({"error": "Resource not found"}, 404)
     
     def do_PUT(self):
         # Get content length
@@ -849,14 +1221,12 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             token = extract_auth_token(auth_header)
             
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if isinstance(payload, dict) and "error" in payload:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": payload["error"]}).encode())
+                self._send_json({"error": payload["error"]}, 401)
                 return
             
             # Check if user is admin or the artist who created the artwork
@@ -868,24 +1238,21 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 # Verify if the artist owns this artwork
                 connection = get_db_connection()
                 if connection is None:
-                    self._set_response(500)
-                    self.wfile.write(json_dumps({"error": "Database connection failed"}).encode())
+                    self._send_json({"error": "Database connection failed"}, 500)
                     return
                 
                 cursor = connection.cursor()
                 try:
-                    # Check both artist_id and artist name for ownership
+                    # Ownership is decided by artist_id alone
                     cursor.execute("""
-                        SELECT a.id FROM artworks a
-                        JOIN artists art ON art.id = %s
-                        WHERE a.id = %s AND (a.artist_id = %s OR a.artist = art.name)
-                    """, (artist_id, artwork_id, artist_id))
+                        SELECT id FROM artworks
+                        WHERE id = %s AND artist_id = %s
+                    """, (artwork_id, artist_id))
                     
                     result = cursor.fetchone()
                     
                     if not result:
-                        self._set_response(403)
-                        self.wfile.write(json_dumps({"error": "Unauthorized: You can only update your own artworks"}).encode())
+                        self._send_json({"error": "Unauthorized: You can only update your own artworks"}, 403)
                         return
                 finally:
                     cursor.close()
@@ -898,19 +1265,18 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 error_message = response["error"]
                 
                 if "Authentication" in error_message or "authorized" in error_message:
-                    self._set_response(401)
+                    status_code = 401
                 elif "Admin" in error_message:
-                    self._set_response(403)
+                    status_code = 403
                 elif "not found" in error_message:
-                    self._set_response(404)
+                    status_code = 404
                 else:
-                    self._set_response(400)
+                    status_code = 400
                     
-                self.wfile.write(json_dumps({"error": error_message}).encode())
+                self._send_json({"error": error_message}, status_code)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Update exhibition (admin only)
@@ -924,26 +1290,29 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 error_message = response["error"]
                 
                 if "Authentication" in error_message or "authorized" in error_message:
-                    self._set_response(401)
+                    status_code = 401
                 elif "Admin" in error_message:
-                    self._set_response(403)
+                    status_code = 403
                 elif "not found" in error_message:
-                    self._set_response(404)
+                    status_code = 404
                 else:
-                    self._set_response(400)
+                    status_code = 400
                     
-                self.wfile.write(json_dumps({"error": error_message}).encode())
+                self._send_json({"error": error_message}, status_code)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Default 404 response
-        self._set_response(404)
-        self.wfile.write(json_dumps({"error": "Resource not found"}).encode())
+        self._send_json({"error": "Resource not found"}, 404)
     
     def do_DELETE(self):
+        # DELETE requests carry no payload here; discard any so the connection can be reused
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length > 0:
+            self.rfile.read(content_length)
+        
         # Process based on path
         path = self.path
         
@@ -956,14 +1325,12 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             token = extract_auth_token(auth_header)
             
             if not token:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": "Authentication required"}).encode())
+                self._send_json({"error": "Authentication required"}, 401)
                 return
             
             payload = verify_token(token)
             if isinstance(payload, dict) and "error" in payload:
-                self._set_response(401)
-                self.wfile.write(json_dumps({"error": payload["error"]}).encode())
+                self._send_json({"error": payload["error"]}, 401)
                 return
             
             # Check if user is admin or the artist who created the artwork
@@ -975,24 +1342,21 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 # Verify if the artist owns this artwork
                 connection = get_db_connection()
                 if connection is None:
-                    self._set_response(500)
-                    self.wfile.write(json_dumps({"error": "Database connection failed"}).encode())
+                    self._send_json({"error": "Database connection failed"}, 500)
                     return
                 
                 cursor = connection.cursor()
                 try:
-                    # Check both artist_id and artist name for ownership
+                    # Ownership is decided by artist_id alone
                     cursor.execute("""
-                        SELECT a.id FROM artworks a
-                        JOIN artists art ON art.id = %s
-                        WHERE a.id = %s AND (a.artist_id = %s OR a.artist = art.name)
-                    """, (artist_id, artwork_id, artist_id))
+                        SELECT id FROM artworks
+                        WHERE id = %s AND artist_id = %s
+                    """, (artwork_id, artist_id))
                     
                     result = cursor.fetchone()
                     
                     if not result:
-                        self._set_response(403)
-                        self.wfile.write(json_dumps({"error": "Unauthorized: You can only delete your own artworks"}).encode())
+                        self._send_json({"error": "Unauthorized: You can only delete your own artworks"}, 403)
                         return
                 finally:
                     cursor.close()
@@ -1005,19 +1369,18 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 error_message = response["error"]
                 
                 if "Authentication" in error_message or "authorized" in error_message:
-                    self._set_response(401)
+                    status_code = 401
                 elif "Admin" in error_message:
-                    self._set_response(403)
+                    status_code = 403
                 elif "not found" in error_message:
-                    self._set_response(404)
+                    status_code = 404
                 else:
-                    self._set_response(400)
+                    status_code = 400
                     
-                self.wfile.write(json_dumps({"error": error_message}).encode())
+                self._send_json({"error": error_message}, status_code)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Delete exhibition (admin only)
@@ -1031,30 +1394,30 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
                 error_message = response["error"]
                 
                 if "Authentication" in error_message or "authorized" in error_message:
-                    self._set_response(401)
+                    status_code = 401
                 elif "Admin" in error_message:
-                    self._set_response(403)
+                    status_code = 403
                 elif "not found" in error_message:
-                    self._set_response(404)
+                    status_code = 404
                 else:
-                    self._set_response(400)
+                    status_code = 400
                     
-                self.wfile.write(json_dumps({"error": error_message}).encode())
+                self._send_json({"error": error_message}, status_code)
                 return
             
-            self._set_response(200)
-            self.wfile.write(json_dumps(response).encode())
+            self._send_json(response)
             return
         
         # Default 404 response
-        self._set_response(404)
-        self.wfile.write(json_dumps({"error": "Resource not found"}).encode())
+        self._send_json({"error": "Resource not found"}, 404)
 
 def main():
     """Start the server"""
-    # Initialize the database
-    print("Initializing database...")
-    initialize_database()
+    # Schema changes are applied by running migrations.py at deploy time; AUTO_MIGRATE=1 applies them on startup instead
+    if os.environ.get('AUTO_MIGRATE') == '1':
+        apply_pending_migrations()
+    else:
+        check_schema_version()
     
     # Create uploads directory if it doesn't exist
     ensure_uploads_directory()
@@ -1063,9 +1426,28 @@ def main():
     create_placeholder_svg()
     create_default_exhibition_image()
     
+    # Type-ahead suggestions are served from memory; if this fails the first request retries
+    build_autocomplete()
+    
+    # Periodic maintenance runs on the scheduler's worker threads, off the request threads.
+    # Exclusive jobs change shared rows and run in one server process at a time;
+    # the others keep this process's own memory in step
+    scheduler.cron('exhibition-status', EXHIBITION_STATUS_CRON, refresh_exhibition_statuses, run_now=True, exclusive=True)
+    scheduler.cron('mpesa-reconcile', MPESA_RECONCILE_CRON, reconcile_pending_transactions, exclusive=True)
+    scheduler.cron('order-expiry', ORDER_EXPIRY_CRON, expire_abandoned_orders, exclusive=True)
+    scheduler.cron('archive', ARCHIVE_CRON, archive_history, exclusive=True)
+    scheduler.every('view-counters', view_counters.VIEW_FLUSH_SECONDS, view_counters.flush_views)
+    scheduler.every('recommendations', RECOMMENDATION_REFRESH_SECONDS, refresh_model, run_now=True)
+    scheduler.every('similar-features', SIMILAR_FEATURES_REFRESH_SECONDS, load_features, run_now=True)
+    scheduler.every('2fa-purge', TWO_FA_PURGE_SECONDS, purge_expired_2fa_codes)
+    if DB_REPLICAS:
+        scheduler.every('replica-lag', REPLICA_CHECK_SECONDS, check_replicas, run_now=True)
+    scheduler.start()
+    
     # Create an HTTP server
     print(f"Starting server on port {PORT}...")
-    httpd = socketserver.ThreadingTCPServer(("", PORT), RequestHandler)
+    # One thread per connection; daemon threads so idle keep-alive connections do not hold up shutdown
+    httpd = http.server.ThreadingHTTPServer(("", PORT), RequestHandler)
     print(f"Server running on port {PORT}")
     
     try:
@@ -1074,6 +1456,9 @@ def main():
         print("\nShutting down server...")
     finally:
         httpd.server_close()
+        scheduler.stop()
+        view_counters.flush_views()
+        shutdown_renderer()
         print("Server closed")
 
 if __name__ == "__main__":
@@ -0,0 +1,431 @@
+"""Item-to-item "similar artworks" behind GET /artworks/{id}/similar
+
+artwork_neighbors holds, for every artwork, its SIMILAR_NEIGHBORS most similar available
+artworks and their scores, so a detail page reads a handful of rows by primary key
+whatever the size of the catalog. The table is built offline from artwork attributes
+and co-purchases in artwork_orders:
+
+    python similar_artworks.py
+
+A pair's similarity adds up a shared artist, a shared medium, closeness of price (on a
+log scale) and year, the cosine of their description term vectors (TF-IDF, hashed into
+TERM_DIMENSIONS) and the number of customers who bought both. Price, year and
+description are encoded as dense feature rows whose dot product gives their part of the
+score, so the build scores BUILD_BLOCK_ROWS artworks against the whole catalog with one
+matrix product and a few array comparisons per block.
+
+Artworks created through the API are scored against the catalog straight away and added
+to the neighbour lists they now belong in. The catalog features needed for that are
+loaded by load_features(), which the scheduler runs at startup and every
+SIMILAR_FEATURES_REFRESH_SECONDS, never on a request thread; until the first load a new
+artwork waits for the next build. Edits, and artworks sold since, are picked up by the
+next build (sold artworks are skipped when the table is read). Deleting an artwork
+deletes its rows in the same transaction.
+"""
+import argparse
+import math
+import os
+import threading
+import time
+import zlib
+import numpy as np
+from database import get_db_connection
+from search_index import tokenize
+
+# Neighbours stored per artwork; more than are shown so sold ones can be skipped
+SIMILAR_NEIGHBORS = 20
+DEFAULT_SIMILAR = 4
+MAX_SIMILAR = 12
+
+# Score weights: same artist, same medium, price and year closeness (1 when equal),
+# description cosine and co-purchases (1 at CO_PURCHASE_SATURATION shared customers)
+ARTIST_WEIGHT = 0.35
+MEDIUM_WEIGHT = 0.2
+PRICE_WEIGHT = 0.15
+YEAR_WEIGHT = 0.05
+DESCRIPTION_WEIGHT = 0.25
+CO_PURCHASE_WEIGHT = 0.4
+CO_PURCHASE_SATURATION = 3
+# Customers with more orders than this are left out of co-purchase pairs
+MAX_BASKET_SIZE = 50
+
+# Radial basis features spanning the catalog's log-price and year ranges
+PRICE_BANDS = 16
+MIN_PRICE_BAND_WIDTH = 0.25
+YEAR_BANDS = 12
+MIN_YEAR_BAND_WIDTH = 2.0
+# Width of the hashed description term vectors
+TERM_DIMENSIONS = 64
+
+# Pairs scoring less than this are not neighbours
+MIN_SIMILARITY = 0.05
+# Artworks scored per matrix product while building
+BUILD_BLOCK_ROWS = 512
+# Best-matching artworks a new artwork is offered to as a neighbour
+NEW_ARTWORK_REVERSE_CANDIDATES = 500
+# Rows per INSERT round trip while writing the table
+INSERT_BATCH_SIZE = 1000
+# Seconds between reloads of the catalog features new artworks are scored against
+SIMILAR_FEATURES_REFRESH_SECONDS = float(os.environ.get('SIMILAR_FEATURES_REFRESH_SECONDS', '3600'))
+
+def _rbf(values, centers, width):
+    """Unit-length radial basis rows: the dot product of two is exp(-(a - b)^2 / (4 width^2)), roughly"""
+    features = np.exp(-0.5 * ((values[:, None] - centers[None, :]) / width) ** 2)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return np.divide(features, norms, out=np.zeros_like(features), where=norms > 0)
+
+def _term_slot(term):
+    """Hashed dimension and sign of a description term (stable across processes)"""
+    digest = zlib.crc32(term.encode('utf-8'))
+    return digest % TERM_DIMENSIONS, 1.0 if digest >> 31 else -1.0
+
+class ArtworkFeatures:
+    """Codes and dense feature rows for every artwork in the catalog
+
+    artworks: (id, artist, medium, price, year, description, status) rows
+    orders: (user_id, artwork_id) rows, for co-purchases; none when only new artworks will be scored
+    """
+
+    def __init__(self, artworks, orders=()):
+        count = len(artworks)
+        self._artist_codes = {}
+        self._medium_codes = {}
+        self.ids = np.fromiter((row[0] for row in artworks), dtype=np.int64, count=count)
+        self.artists = np.fromiter((self._code(self._artist_codes, row[1]) for row in artworks), dtype=np.int32, count=count)
+        self.mediums = np.fromiter((self._code(self._medium_codes, row[2]) for row in artworks), dtype=np.int32, count=count)
+        self.available = np.fromiter((row[6] == 'available' for row in artworks), dtype=bool, count=count)
+        self.row_of = {artwork_id: row for row, artwork_id in enumerate(self.ids.tolist())}
+
+        log_prices = np.log1p(np.fromiter((float(row[3] or 0) for row in artworks), dtype=np.float64, count=count))
+        years = np.fromiter((row[4] or np.nan for row in artworks), dtype=np.float64, count=count)
+        self._price_centers, self._price_width = self._bands(log_prices, PRICE_BANDS, MIN_PRICE_BAND_WIDTH)
+        self._year_centers, self._year_width = self._bands(years[~np.isnan(years)], YEAR_BANDS, MIN_YEAR_BAND_WIDTH)
+
+        # Inverse document frequencies, kept to encode artworks added later the same way
+        documents = [tokenize(row[5]) for row in artworks]
+        frequencies = {}
+        for terms in documents:
+            for term in set(terms):
+                frequencies[term] = frequencies.get(term, 0) + 1
+        self._idf = {term: math.log((count + 1) / (frequency + 1)) + 1 for term, frequency in frequencies.items()}
+        self._default_idf = math.log(count + 1) + 1
+
+        self.features = self._encode(log_prices, years, documents)
+        self._co_purchases = self._pair_co_purchases(orders)
+
+    @staticmethod
+    def _code(codes, value):
+        """Small integer for an artist or medium; blank values never match each other"""
+        key = (value or '').strip().lower()
+        if not key:
+            return -1
+        return codes.setdefault(key, len(codes))
+
+    @staticmethod
+    def _bands(values, bands, min_width):
+        """Evenly spaced band centers across the values, and the band width"""
+        if not values.size:
+            return np.zeros(1), min_width
+        low, high = float(values.min()), float(values.max())
+        width = max((high - low) / (bands - 1), min_width)
+        return low + width * np.arange(bands), width
+
+    def _encode(self, log_prices, years, documents):
+        """Feature rows whose dot products give the price, year and description scores"""
+        price = _rbf(log_prices, self._price_centers, self._price_width)
+        year = _rbf(np.nan_to_num(years, nan=-1e9), self._year_centers, self._year_width)
+
+        terms = np.zeros((len(documents), TERM_DIMENSIONS))
+        for row, document in enumerate(documents):
+            counts = {}
+            for term in document:
+                counts[term] = counts.get(term, 0) + 1
+            for term, frequency in counts.items():
+                slot, sign = _term_slot(term)
+                terms[row, slot] += sign * (1 + math.log(frequency)) * self._idf.get(term, self._default_idf)
+        norms = np.linalg.norm(terms, axis=1, keepdims=True)
+        terms = np.divide(terms, norms, out=np.zeros_like(terms), where=norms > 0)
+
+        return np.hstack([
+            math.sqrt(PRICE_WEIGHT) * price,
+            math.sqrt(YEAR_WEIGHT) * year,
+            math.sqrt(DESCRIPTION_WEIGHT) * terms,
+        ]).astype(np.float32)
+
+    def _pair_co_purchases(self, orders):
+        """(rows, columns, scores) of every pair of artworks bought by the same customers, sorted by row"""
+        baskets = {}
+        for user_id, artwork_id in orders:
+            row = self.row_of.get(artwork_id)
+            if row is not None:
+                baskets.setdefault(user_id, set()).add(row)
+        pairs = {}
+        for rows in baskets.values():
+            if len(rows) < 2 or len(rows) > MAX_BASKET_SIZE:
+                continue
+            rows = sorted(rows)
+            for position, first in enumerate(rows):
+                for second in rows[position + 1:]:
+                    pairs[(first, second)] = pairs.get((first, second), 0) + 1
+        if not pairs:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+
+        keys = np.array(list(pairs.keys()), dtype=np.int64)
+        scores = CO_PURCHASE_WEIGHT * np.minimum(np.fromiter(pairs.values(), dtype=np.float32), CO_PURCHASE_SATURATION) / CO_PURCHASE_SATURATION
+        rows = np.concatenate([keys[:, 0], keys[:, 1]])
+        columns = np.concatenate([keys[:, 1], keys[:, 0]])
+        scores = np.concatenate([scores, scores])
+        order = np.argsort(rows, kind='stable')
+        return rows[order], columns[order], scores[order]
+
+    def __len__(self):
+        return self.ids.size
+
+    def similarity(self, row):
+        """Similarity of one artwork to every artwork, itself included, without co-purchases"""
+        scores = self.features @ self.features[row]
+        scores[(self.artists == self.artists[row]) & (self.artists >= 0)] += ARTIST_WEIGHT
+        scores[(self.mediums == self.mediums[row]) & (self.mediums >= 0)] += MEDIUM_WEIGHT
+        return scores
+
+    def neighbors(self, block_rows=BUILD_BLOCK_ROWS):
+        """Yield (artwork id, neighbour ids, scores) for every artwork, best neighbour first
+
+        Rows are scored a block at a time against the available artworks only. Shared
+        artists and mediums are added through per-code lists of candidate positions
+        rather than by comparing the whole block with every candidate.
+        """
+        candidates = np.flatnonzero(self.available)
+        depth = min(SIMILAR_NEIGHBORS, candidates.size)
+        if depth == 0:
+            return
+        candidate_features = np.ascontiguousarray(self.features[candidates].T)
+        position = np.full(len(self), -1, dtype=np.int64)
+        position[candidates] = np.arange(candidates.size)
+        groups = [
+            self._groups(self.artists[candidates], len(self._artist_codes)),
+            self._groups(self.mediums[candidates], len(self._medium_codes)),
+        ]
+
+        pair_rows, pair_columns, pair_scores = self._co_purchases
+        keep = position[pair_columns] >= 0
+        pair_rows, pair_columns, pair_scores = pair_rows[keep], position[pair_columns[keep]], pair_scores[keep]
+
+        for start in range(0, len(self), block_rows):
+            end = min(start + block_rows, len(self))
+            scores = self.features[start:end] @ candidate_features
+            for (order, bounds), codes, weight in zip(groups, (self.artists, self.mediums), (ARTIST_WEIGHT, MEDIUM_WEIGHT)):
+                for offset, code in enumerate(codes[start:end].tolist()):
+                    if code >= 0:
+                        scores[offset, order[bounds[code]:bounds[code + 1]]] += weight
+            low, high = np.searchsorted(pair_rows, [start, end])
+            scores[pair_rows[low:high] - start, pair_columns[low:high]] += pair_scores[low:high]
+            own = position[start:end]
+            scores[np.flatnonzero(own >= 0), own[own >= 0]] = -np.inf
+
+            top = np.argpartition(scores, -depth, axis=1)[:, -depth:]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.lexsort((top, -top_scores), axis=1)
+            top = candidates[np.take_along_axis(top, order, axis=1)]
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for offset in range(end - start):
+                keep = top_scores[offset] >= MIN_SIMILARITY
+                yield int(self.ids[start + offset]), self.ids[top[offset][keep]], top_scores[offset][keep]
+
+    @staticmethod
+    def _groups(codes, count):
+        """Positions sorted by code, and where the run of each code from 0 to count - 1 starts"""
+        order = np.argsort(codes, kind='stable')
+        return order, np.searchsorted(codes[order], np.arange(count + 1))
+
+    def add(self, artwork):
+        """Append a new (id, artist, medium, price, year, description, status) row"""
+        artwork_id, artist, medium, price, year, description, status = artwork
+        features = self._encode(
+            np.array([math.log1p(float(price or 0))]),
+            np.array([float(year) if year else np.nan]),
+            [tokenize(description)],
+        )
+        self.ids = np.append(self.ids, artwork_id)
+        self.artists = np.append(self.artists, np.int32(self._code(self._artist_codes, artist)))
+        self.mediums = np.append(self.mediums, np.int32(self._code(self._medium_codes, medium)))
+        self.available = np.append(self.available, status == 'available')
+        self.features = np.vstack([self.features, features])
+        self.row_of[artwork_id] = self.ids.size - 1
+
+    def remove(self, artwork_id):
+        """Stop offering a deleted artwork as a neighbour"""
+        row = self.row_of.get(artwork_id)
+        if row is not None:
+            self.available[row] = False
+
+_ARTWORK_COLUMNS = "id, artist, medium, price, year, description, status"
+
+_features = None    # ArtworkFeatures for scoring new artworks, set by load_features()
+_lock = threading.Lock()    # guards _features; never held around database I/O
+
+def _write_neighbors(cursor, rows):
+    """Insert (artwork_id, neighbor_id, score) rows in batches"""
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        cursor.executemany(
+            "INSERT INTO artwork_neighbors (artwork_id, neighbor_id, score) VALUES (%s, %s, %s)",
+            rows[start:start + INSERT_BATCH_SIZE]
+        )
+
+def rebuild_neighbors():
+    """Recompute artwork_neighbors for the whole catalog"""
+    global _features
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        start = time.monotonic()
+        cursor.execute(f"SELECT {_ARTWORK_COLUMNS} FROM artworks")
+        artworks = cursor.fetchall()
+        cursor.execute("SELECT user_id, artwork_id FROM artwork_orders WHERE payment_status <> 'failed'")
+        orders = cursor.fetchall()
+        features = ArtworkFeatures(artworks, orders)
+
+        rows = [
+            (artwork_id, neighbor_id, score)
+            for artwork_id, neighbor_ids, scores in features.neighbors()
+            for neighbor_id, score in zip(neighbor_ids.tolist(), scores.tolist())
+        ]
+        built = time.monotonic() - start
+
+        # Replace the table in one transaction so detail pages never see it half-filled
+        cursor.execute("DELETE FROM artwork_neighbors")
+        _write_neighbors(cursor, rows)
+        connection.commit()
+        with _lock:
+            if _features is not None:
+                _features = features
+
+        print(f"Rebuilt artwork neighbours: {len(rows)} rows for {len(features)} artworks "
+              f"(scored in {built:.2f}s, {time.monotonic() - start:.2f}s in total)")
+        return {"success": True, "rows": len(rows)}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error rebuilding artwork neighbours: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def load_features():
+    """Load the catalog features new artworks are scored against, replacing any loaded before"""
+    global _features
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        start = time.monotonic()
+        cursor.execute(f"SELECT {_ARTWORK_COLUMNS} FROM artworks")
+        features = ArtworkFeatures(cursor.fetchall())
+        with _lock:
+            _features = features
+        print(f"Loaded similar-artwork features for {len(features)} artworks in {time.monotonic() - start:.2f}s")
+        return {"success": True}
+    except Exception as e:
+        print(f"Error loading similar-artwork features: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def artwork_added(artwork_id):
+    """Score a newly created artwork against the catalog and add it to the neighbour lists it belongs in"""
+    artwork_id = int(artwork_id)
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute(f"SELECT {_ARTWORK_COLUMNS} FROM artworks WHERE id = %s", (artwork_id,))
+        artwork = cursor.fetchone()
+        if not artwork:
+            return {"error": "Artwork not found"}
+
+        with _lock:
+            if _features is None:
+                print(f"Similar-artwork features are not loaded yet; artwork {artwork_id} waits for the next build")
+                return {"error": "Similar-artwork features are not loaded yet"}
+            if artwork_id not in _features.row_of:
+                _features.add(artwork)
+            features = _features
+            row = features.row_of[artwork_id]
+            similarity = features.similarity(row)
+            similarity[row] = -np.inf
+            scores = np.where(features.available, similarity, -np.inf)
+            # Other artworks' lists only take the new one while it is for sale
+            reverse = similarity if features.available[row] else np.full(len(features), -np.inf)
+            ids = features.ids
+
+        own = np.argsort(-scores, kind='stable')[:SIMILAR_NEIGHBORS]
+        own = own[scores[own] >= MIN_SIMILARITY]
+        cursor.execute("DELETE FROM artwork_neighbors WHERE artwork_id = %s", (artwork_id,))
+        _write_neighbors(cursor, [(artwork_id, int(ids[column]), float(scores[column])) for column in own.tolist()])
+
+        candidates = np.argsort(-reverse, kind='stable')[:NEW_ARTWORK_REVERSE_CANDIDATES]
+        candidates = candidates[reverse[candidates] >= MIN_SIMILARITY]
+        offered = 0
+        if candidates.size:
+            candidate_ids = ids[candidates].tolist()
+            placeholders = ", ".join(["%s"] * len(candidate_ids))
+            cursor.execute(f"""
+            SELECT artwork_id, COUNT(*), MIN(score) FROM artwork_neighbors
+            WHERE artwork_id IN ({placeholders})
+            GROUP BY artwork_id
+            """, tuple(candidate_ids))
+            lists = {other_id: (size, weakest) for other_id, size, weakest in cursor.fetchall()}
+            for other_id, score in zip(candidate_ids, reverse[candidates].tolist()):
+                size, weakest = lists.get(other_id, (0, None))
+                if size >= SIMILAR_NEIGHBORS and score <= weakest:
+                    continue
+                cursor.execute(
+                    "INSERT INTO artwork_neighbors (artwork_id, neighbor_id, score) VALUES (%s, %s, %s)",
+                    (other_id, artwork_id, score)
+                )
+                if size >= SIMILAR_NEIGHBORS:
+                    cursor.execute(
+                        "DELETE FROM artwork_neighbors WHERE artwork_id = %s ORDER BY score LIMIT 1",
+                        (other_id,)
+                    )
+                offered += 1
+        connection.commit()
+        return {"success": True, "neighbors": int(own.size), "listed_in": offered}
+    except Exception as e:
+        connection.rollback()
+        print(f"Error adding artwork {artwork_id} to its neighbours: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def artwork_deleted(cursor, artwork_id):
+    """Drop a deleted artwork's neighbour rows, in the caller's transaction"""
+    cursor.execute(
+        "DELETE FROM artwork_neighbors WHERE artwork_id = %s OR neighbor_id = %s",
+        (artwork_id, artwork_id)
+    )
+
+def forget_artwork(artwork_id):
+    """Stop scoring new artworks against a deleted one; call after the delete commits"""
+    with _lock:
+        if _features is not None:
+            _features.remove(int(artwork_id))
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Rebuild the artwork_neighbors table").parse_args()
+    rebuild_neighbors()
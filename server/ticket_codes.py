@@ -0,0 +1,127 @@
+import re
+import secrets
+from mysql.connector import IntegrityError, errorcode
+
+# Crockford base32 alphabet - no I, L, O or U so codes read cleanly off a phone screen
+TICKET_CODE_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TICKET_CODE_PREFIX = "TKT"
+
+# Number of random characters in a code (the check character comes after these)
+TICKET_CODE_BODY_LENGTH = 8
+
+# How many times an insert is retried when the unique index reports a collision
+TICKET_CODE_MAX_ATTEMPTS = 5
+
+# Name of the unique index on exhibition_bookings.ticket_code
+TICKET_CODE_INDEX = 'ticket_code'
+
+# "Duplicate entry 'x' for key 'ticket_code'" (MySQL 8.0.19+ prefixes the table: 'exhibition_bookings.ticket_code')
+_DUPLICATE_KEY = re.compile(r"for key '(?:[^'.]*\.)?([^']*)'")
+
+_ALPHABET_INDEX = {char: i for i, char in enumerate(TICKET_CODE_ALPHABET)}
+
+# Codes issued before check characters were introduced: TKT- followed by 8 of [A-Z0-9]
+_LEGACY_ALPHABET = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
+
+def _check_character(body):
+    """Compute the Luhn mod N check character for a code body"""
+    base = len(TICKET_CODE_ALPHABET)
+    factor = 2
+    total = 0
+    for char in reversed(body):
+        addend = factor * _ALPHABET_INDEX[char]
+        total += addend // base + addend % base
+        factor = 1 if factor == 2 else 2
+    return TICKET_CODE_ALPHABET[(base - total % base) % base]
+
+def generate_ticket_code():
+    """Generate a ticket code from a CSPRNG with a trailing check character"""
+    body = ''.join(secrets.choice(TICKET_CODE_ALPHABET) for _ in range(TICKET_CODE_BODY_LENGTH))
+    return f"{TICKET_CODE_PREFIX}-{body}{_check_character(body)}"
+
+def normalize_ticket_code(code):
+    """Uppercase and trim a scanned or typed ticket code"""
+    if not code:
+        return ""
+    return str(code).strip().upper()
+
+def is_valid_ticket_code(code):
+    """Check the format and check character of a ticket code without touching the database
+
+    Legacy codes (issued without a check character) are accepted on format alone.
+    """
+    code = normalize_ticket_code(code)
+    prefix = f"{TICKET_CODE_PREFIX}-"
+    if not code.startswith(prefix):
+        return False
+
+    payload = code[len(prefix):]
+
+    if len(payload) == TICKET_CODE_BODY_LENGTH + 1:
+        body, check = payload[:-1], payload[-1]
+        if all(char in _ALPHABET_INDEX for char in payload):
+            return _check_character(body) == check
+
+    if len(payload) == TICKET_CODE_BODY_LENGTH:
+        return all(char in _LEGACY_ALPHABET for char in payload)
+
+    return False
+
+def allocate_ticket_codes(count, cursor=None):
+    """Pre-allocate a block of distinct ticket codes for batch issuance
+
+    Codes are unique within the block. When a cursor is given, the block is also
+    checked against exhibition_bookings and its archive in one indexed IN query and
+    any codes already in use are replaced. The unique index remains the final guard
+    against a concurrent writer taking the same code.
+    """
+    if count <= 0:
+        return []
+
+    codes = set()
+    while len(codes) < count:
+        codes.add(generate_ticket_code())
+
+    if cursor is None:
+        return list(codes)
+
+    while True:
+        placeholders = ', '.join(['%s'] * len(codes))
+        cursor.execute(
+            f"SELECT ticket_code FROM exhibition_bookings WHERE ticket_code IN ({placeholders}) "
+            f"UNION ALL SELECT ticket_code FROM exhibition_bookings_archive WHERE ticket_code IN ({placeholders})",
+            tuple(codes) * 2
+        )
+        taken = {row[0] for row in cursor.fetchall()}
+        if not taken:
+            return list(codes)
+
+        print(f"Replacing {len(taken)} pre-allocated ticket codes already in use")
+        codes -= taken
+        while len(codes) < count:
+            codes.add(generate_ticket_code())
+
+def _is_ticket_code_collision(error):
+    """True when an IntegrityError is a duplicate on the ticket_code index rather than another key"""
+    if error.errno != errorcode.ER_DUP_ENTRY:
+        return False
+    match = _DUPLICATE_KEY.search(error.msg or '')
+    return match is not None and match.group(1) == TICKET_CODE_INDEX
+
+def execute_with_ticket_code(cursor, query, make_params):
+    """Run an INSERT that carries a fresh ticket code, retrying on unique-index collisions
+
+    make_params is called with the candidate code and must return the query parameters.
+    Returns the ticket code that was stored.
+    """
+    for attempt in range(TICKET_CODE_MAX_ATTEMPTS):
+        ticket_code = generate_ticket_code()
+        try:
+            cursor.execute(query, make_params(ticket_code))
+            return ticket_code
+        except IntegrityError as e:
+            if not _is_ticket_code_collision(e):
+                raise
+            print(f"Ticket code collision on {ticket_code} (attempt {attempt + 1}), retrying")
+
+    raise RuntimeError("Could not allocate a unique ticket code")
@@ -0,0 +1,325 @@
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from database import get_db_connection, dict_from_row
+from archive import with_archive
+
+# QR codes are drawn when the qrcode package is installed; otherwise the ticket
+# code is printed in a large monospace font so it can still be typed in at the door
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+
+# Number of worker processes used for rendering (defaults to one per CPU)
+RENDER_WORKERS = int(os.environ.get('TICKET_RENDER_WORKERS', os.cpu_count() or 2))
+
+# Seconds an HTTP thread waits for a single ticket to render
+RENDER_TIMEOUT = 30
+
+# Rendered single-ticket PDFs kept in memory, least recently used evicted first
+CACHE_MAX_ENTRIES = 512
+
+# Bookings rendered per batch when streaming an exhibition's attendee list
+BATCH_SIZE = 64
+
+# A4 portrait, in points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# {bookings} is exhibition_bookings or its archive table
+TICKET_QUERY = """
+SELECT eb.id, eb.user_id, u.name as user_name, eb.exhibition_id,
+       e.title as exhibition_title, e.location, e.start_date, e.end_date,
+       eb.booking_date, eb.ticket_code, eb.slots, eb.status, eb.payment_status
+FROM {bookings} eb
+JOIN users u ON eb.user_id = u.id
+JOIN exhibitions e ON eb.exhibition_id = e.id
+"""
+
+def _get_executor():
+    """Create the rendering process pool on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            print(f"Starting ticket renderer with {RENDER_WORKERS} worker processes")
+            # Spawn rather than fork: the server is multi-threaded and forked children could inherit held locks
+            _executor = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def shutdown_renderer():
+    """Stop the rendering process pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+def _ticket_from_row(row, cursor):
+    """Turn a booking row into a plain dict of strings that can be sent to a worker process"""
+    ticket = dict_from_row(row, cursor)
+    for key in ('start_date', 'end_date', 'booking_date'):
+        value = ticket.get(key)
+        ticket[key] = value.strftime('%B %d, %Y') if value else 'TBD'
+    return ticket
+
+def get_ticket_booking(booking_id):
+    """Load the booking details printed on a ticket"""
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+
+    try:
+        # Tickets for long-past exhibitions may have been archived
+        for bookings in with_archive('exhibition_bookings'):
+            cursor.execute(TICKET_QUERY.format(bookings=bookings) + " WHERE eb.id = %s", (booking_id,))
+            row = cursor.fetchone()
+            if row:
+                break
+        else:
+            return {"error": "Booking not found"}
+
+        return _ticket_from_row(row, cursor)
+    except Exception as e:
+        print(f"Error loading ticket booking: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def _pdf_text(text):
+    """Escape a value for use inside a PDF string literal"""
+    text = str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+def _qr_operators(data, x, y, size):
+    """Draw a QR code as filled rectangles, one per horizontal run of dark modules"""
+    qr = qrcode.QRCode(border=0, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    module = size / len(matrix)
+    ops = ["0 0 0 rg"]
+    for r, cells in enumerate(matrix):
+        top = y + size - (r + 1) * module
+        c = 0
+        while c < len(cells):
+            if not cells[c]:
+                c += 1
+                continue
+            start = c
+            while c < len(cells) and cells[c]:
+                c += 1
+            ops.append(f"{x + start * module:.2f} {top:.2f} {(c - start) * module:.2f} {module:.2f} re")
+    ops.append("f")
+    return ops
+
+def render_ticket_page(ticket):
+    """Build the PDF content stream for one ticket page (runs in a worker process)"""
+    ops = []
+
+    def text(x, y, font, size, value, gray=0.2):
+        ops.append(f"BT /{font} {size} Tf {gray} g {x} {y} Td ({_pdf_text(value)}) Tj ET")
+
+    text(180, 780, 'F2', 24, 'EXHIBITION TICKET', 0)
+    text(210, 758, 'F1', 12, 'Gallery Management System', 0.4)
+
+    # Ticket border
+    ops.append("0.6 w 0 G 40 300 515 430 re S")
+
+    rows = [
+        ('User:', ticket['user_name']),
+        ('Exhibition:', ticket['exhibition_title']),
+        ('Start Date:', ticket['start_date']),
+        ('End Date:', ticket['end_date']),
+        ('Booking Date:', ticket['booking_date']),
+        ('Location:', ticket['location']),
+        ('Slots:', ticket['slots']),
+        ('Status:', str(ticket['status'] or '').upper()),
+    ]
+    y = 690
+    for label, value in rows:
+        text(60, y, 'F1', 12, label, 0.4)
+        text(170, y, 'F1', 12, value)
+        y -= 26
+
+    code = ticket['ticket_code'] or f"TKT-{ticket['id']}"
+    if qrcode is not None:
+        ops.extend(_qr_operators(code, 415, 560, 120))
+        text(60, 340, 'F3', 16, code, 0)
+    else:
+        text(60, 340, 'F3', 28, code, 0)
+
+    text(60, 270, 'F1', 10, 'Please present this ticket at the exhibition entrance', 0.4)
+    text(60, 255, 'F1', 10, f"Generated on {datetime.now().strftime('%B %d, %Y %I:%M %p')}", 0.4)
+
+    return "\n".join(ops).encode('latin-1')
+
+class PdfStreamWriter:
+    """Write a PDF object by object to a binary stream, tracking offsets for the xref table
+
+    The page tree is written last so pages can be streamed without knowing how many there will be.
+    """
+
+    FONTS = (
+        ('F1', 'Helvetica'),
+        ('F2', 'Helvetica-Bold'),
+        ('F3', 'Courier-Bold'),
+    )
+
+    # Object numbers: 1 catalog, 2 page tree, then fonts, then a page/content pair per page
+    CATALOG_OBJ = 1
+    PAGES_OBJ = 2
+
+    def __init__(self, out):
+        self.out = out
+        self.offsets = {}
+        self.position = 0
+        self.page_objs = []
+        self.next_obj = 3 + len(self.FONTS)
+
+    @property
+    def pages_written(self):
+        return len(self.page_objs)
+
+    def _write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+    def _object(self, number, body):
+        self.offsets[number] = self.position
+        self._write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def begin(self):
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(self.CATALOG_OBJ, f"<< /Type /Catalog /Pages {self.PAGES_OBJ} 0 R >>".encode())
+        for i, (_, base_font) in enumerate(self.FONTS):
+            self._object(3 + i, f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>".encode())
+
+    def add_page(self, content):
+        page_obj, content_obj = self.next_obj, self.next_obj + 1
+        self.next_obj += 2
+        self._object(page_obj, f"<< /Type /Page /Parent {self.PAGES_OBJ} 0 R /Contents {content_obj} 0 R >>".encode())
+        self._object(content_obj, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+        self.page_objs.append(page_obj)
+
+    def finish(self):
+        kids = ' '.join(f"{number} 0 R" for number in self.page_objs)
+        font_refs = ' '.join(f"/{name} {3 + i} 0 R" for i, (name, _) in enumerate(self.FONTS))
+        self._object(
+            self.PAGES_OBJ,
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_objs)} "
+            f"/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] /Resources << /Font << {font_refs} >> >> >>".encode()
+        )
+
+        xref_position = self.position
+        size = self.next_obj
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self.offsets[number]:010d} 00000 n \n" for number in range(1, size))
+        lines.append(f"trailer\n<< /Size {size} /Root {self.CATALOG_OBJ} 0 R >>\nstartxref\n{xref_position}\n%%EOF\n")
+        self._write(''.join(lines).encode())
+
+class _BytesSink:
+    """Minimal in-memory stream for building a whole PDF inside a worker process"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+def build_ticket_pdf(ticket):
+    """Render a complete single-ticket PDF (runs in a worker process)"""
+    sink = _BytesSink()
+    writer = PdfStreamWriter(sink)
+    writer.begin()
+    writer.add_page(render_ticket_page(ticket))
+    writer.finish()
+    return sink.getvalue()
+
+def _cache_get(key):
+    with _cache_lock:
+        pdf = _cache.get(key)
+        if pdf is not None:
+            _cache.move_to_end(key)
+        return pdf
+
+def _cache_put(key, pdf):
+    with _cache_lock:
+        _cache[key] = pdf
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def render_ticket_pdf(ticket):
+    """Return the PDF for a booking, rendering it in the process pool on a cache miss
+
+    The cache key includes the booking status so a ticket re-renders once it is used or cancelled.
+    """
+    key = (str(ticket['id']), ticket['status'])
+    pdf = _cache_get(key)
+    if pdf is not None:
+        return pdf
+
+    pdf = _get_executor().submit(build_ticket_pdf, ticket).result(timeout=RENDER_TIMEOUT)
+    _cache_put(key, pdf)
+    return pdf
+
+def stream_exhibition_tickets(exhibition_id, out):
+    """Render every attendee's ticket for an exhibition into one multi-page PDF written to out
+
+    Bookings are read and rendered BATCH_SIZE at a time so memory stays bounded;
+    pages are written to the stream as soon as each batch comes back from the pool.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        return {"error": "Database connection failed"}
+
+    cursor = connection.cursor()
+    writer = PdfStreamWriter(out)
+
+    try:
+        cursor.execute(TICKET_QUERY.format(bookings='exhibition_bookings') + """
+        WHERE eb.exhibition_id = %s AND eb.payment_status = 'completed' AND eb.status <> 'cancelled'
+        ORDER BY eb.id
+        """, (exhibition_id,))
+
+        writer.begin()
+        executor = _get_executor()
+
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            tickets = [_ticket_from_row(row, cursor) for row in rows]
+            for content in executor.map(render_ticket_page, tickets):
+                writer.add_page(content)
+
+        writer.finish()
+        return {"success": True, "pages": writer.pages_written}
+    except Exception as e:
+        print(f"Error streaming exhibition tickets: {e}")
+        return {"error": str(e)}
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
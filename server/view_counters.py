@@ -0,0 +1,112 @@
+"""Write-behind page view counters for artworks and exhibitions
+
+Detail page views are counted in memory and written to daily_view_counts in batched
+upserts every VIEW_FLUSH_SECONDS, so a popular artwork costs one row update per flush
+rather than one per view. Counts are spread over VIEW_COUNTER_SHARDS dictionaries, each
+with its own lock; each thread is given a shard in turn the first time it counts a view,
+so concurrent requests rarely wait on each other. A flush empties every shard and sums the deltas per (day, kind, id); deltas
+that fail to write are put back for the next flush.
+
+daily_view_counts keeps one row per day and item, which the trending endpoints and the
+recommendation model sum over a recent window. Views counted since the last flush are
+not visible to them yet, and views still in memory are lost if the process is killed
+(a normal shutdown flushes).
+"""
+import itertools
+import os
+import threading
+from datetime import date
+from database import get_db_connection
+
+# Seconds between flushes of the in-memory counts
+VIEW_FLUSH_SECONDS = float(os.environ.get('VIEW_FLUSH_SECONDS', '30'))
+# Independent counter dictionaries; more means less lock contention between request threads
+VIEW_COUNTER_SHARDS = int(os.environ.get('VIEW_COUNTER_SHARDS', '16'))
+
+ARTWORK = 'artwork'
+EXHIBITION = 'exhibition'
+
+# Rows per upsert round trip while flushing
+FLUSH_BATCH_SIZE = 500
+
+DEFAULT_TRENDING_DAYS = 7
+MAX_TRENDING_DAYS = 90
+DEFAULT_TRENDING_LIMIT = 10
+MAX_TRENDING_LIMIT = 50
+
+_UPSERT = """
+INSERT INTO daily_view_counts (day, kind, item_id, views) VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE views = views + VALUES(views)
+"""
+
+class ShardedCounter:
+    """Counts per key, split across shards so threads increment without a shared lock"""
+
+    def __init__(self, shards=VIEW_COUNTER_SHARDS):
+        self._shards = [({}, threading.Lock()) for _ in range(max(1, shards))]
+        # Thread idents are aligned addresses, so ident % shards would put every thread on one
+        # shard; threads are numbered instead, and keep their number in thread-local storage
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+
+    def add(self, key, amount=1):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = next(self._next_shard) % len(self._shards)
+        counts, lock = self._shards[shard]
+        with lock:
+            counts[key] = counts.get(key, 0) + amount
+
+    def drain(self):
+        """Take every count accumulated so far, summed across shards, and reset them"""
+        totals = {}
+        for counts, lock in self._shards:
+            with lock:
+                taken = counts.copy()
+                counts.clear()
+            for key, amount in taken.items():
+                totals[key] = totals.get(key, 0) + amount
+        return totals
+
+    def pending(self):
+        """Number of distinct keys waiting to be drained"""
+        return sum(len(counts) for counts, _ in self._shards)
+
+_counter = ShardedCounter()
+_flush_lock = threading.Lock()
+
+def record_view(kind, item_id):
+    """Count one view of an artwork or exhibition detail page"""
+    _counter.add((date.today(), kind, int(item_id)))
+
+def flush_views():
+    """Write the counts accumulated since the last flush"""
+    with _flush_lock:
+        deltas = _counter.drain()
+        if not deltas:
+            return {"success": True, "rows": 0}
+
+        connection = get_db_connection()
+        if connection is None:
+            for key, amount in deltas.items():
+                _counter.add(key, amount)
+            return {"error": "Database connection failed"}
+
+        cursor = connection.cursor()
+
+        try:
+            rows = [(day, kind, item_id, amount) for (day, kind, item_id), amount in sorted(deltas.items())]
+            for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                cursor.executemany(_UPSERT, rows[start:start + FLUSH_BATCH_SIZE])
+            connection.commit()
+            return {"success": True, "rows": len(rows)}
+        except Exception as e:
+            connection.rollback()
+            for key, amount in deltas.items():
+                _counter.add(key, amount)
+            print(f"Error flushing view counts ({len(deltas)} pending): {e}")
+            return {"error": str(e)}
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
@@ -4,7 +4,6 @@ import { Link } from 'react-router-dom';
 import { ArrowRight, Sparkles, User } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import ArtworkCard from '@/components/ArtworkCard';
-import { getAllArtworks } from '@/services/api';
 import { Artwork } from '@/types';
 import { useToast } from '@/hooks/use-toast';
 import { useAuth } from '@/contexts/AuthContext';
@@ -21,8 +20,6 @@ const ArtworkRecommendations = () => {
     const fetchAndGenerateRecommendations = async () => {
       try {
         setLoading(true);
-        const allArtworks = await getAllArtworks();
-        console.log("Fetched artworks for recommendations:", allArtworks.length);
         
         let recommendations: Artwork[] = [];
         let personalized = false;
@@ -32,18 +29,13 @@ const ArtworkRecommendations = () => {
           console.log("Generating personalized recommendations for user:", currentUser.id);
           recommendations = await RecommendationEngine.generatePersonalizedRecommendations(
             currentUser.id, 
-            allArtworks, 
             3
           );
           personalized = true;
         } else {
           // Fallback to general recommendations
           console.log("Generating general recommendations");
-          recommendations = RecommendationEngine.generateSimilarArtworkRecommendations(
-            allArtworks[0] || {} as Artwork, 
-            allArtworks, 
-            3
-          );
+          recommendations = await RecommendationEngine.generateGeneralRecommendations(3);
         }
         
         setRecommendedArtworks(recommendations);
@@ -6,6 +6,7 @@ import { useToast } from '@/hooks/use-toast';
 import AdminLayout from '@/components/AdminLayout';
 import { Loader2, User } from 'lucide-react';
 import { ArtistData } from '@/services/api';
+import { formatPrice } from '@/utils/formatters';
 import {
   Table,
   TableBody,
@@ -147,6 +148,8 @@ const AdminArtists = () => {
                   <TableHead>Email</TableHead>
                   <TableHead>Phone</TableHead>
                   <TableHead>Artworks</TableHead>
+                  <TableHead>Orders</TableHead>
+                  <TableHead>Revenue</TableHead>
                   <TableHead>Joined</TableHead>
                 </TableRow>
               </TableHeader>
@@ -165,6 +168,8 @@ const AdminArtists = () => {
                     <TableCell>{artist.email}</TableCell>
                     <TableCell>{artist.phone || 'Not provided'}</TableCell>
                     <TableCell>{artist.artwork_count}</TableCell>
+                    <TableCell>{artist.order_count}</TableCell>
+                    <TableCell>{formatPrice(Number(artist.revenue))}</TableCell>
                     <TableCell>{formatDate(artist.created_at)}</TableCell>
                   </TableRow>
                 ))}
@@ -6,7 +6,7 @@ import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { FileText, Download, TrendingUp, Users, Calendar, ShoppingBag, Ticket } from 'lucide-react';
 import { useToast } from "@/hooks/use-toast";
-import { getAllArtworks, getAllExhibitions, getAllTickets, authFetch } from '@/services/api';
+import { getAllArtworks, getAllExhibitions, getSalesReport, downloadExport } from '@/services/api';
 import { format } from 'date-fns';
 
 const AdminReports = () => {
@@ -24,18 +24,26 @@ const AdminReports = () => {
     queryFn: getAllExhibitions,
   });
 
-  const { data: ticketsData } = useQuery({
-    queryKey: ['tickets'],
-    queryFn: getAllTickets,
+  // Totals and the monthly breakdown are aggregated by the server; full order and
+  // ticket lists are only downloaded when their CSV is requested
+  const { data: salesReport } = useQuery({
+    queryKey: ['sales-report', 'month'],
+    queryFn: () => getSalesReport({ granularity: 'month' }),
   });
 
-  const { data: ordersData } = useQuery({
-    queryKey: ['orders'],
-    queryFn: async () => {
-      const response = await authFetch('/orders');
-      return response;
-    },
-  });
+  const totals = salesReport?.totals;
+
+  const saveBlob = (blob: Blob, filename: string) => {
+    const link = document.createElement('a');
+    const url = URL.createObjectURL(blob);
+    link.setAttribute('href', url);
+    link.setAttribute('download', `${filename}_${format(new Date(), 'yyyy-MM-dd')}.csv`);
+    link.style.visibility = 'hidden';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+    URL.revokeObjectURL(url);
+  };
 
   const generateCSV = (data: any[], filename: string, headers: string[]) => {
     const csvContent = [
@@ -46,15 +54,7 @@ const AdminReports = () => {
       }).join(','))
     ].join('\n');
 
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    link.setAttribute('href', url);
-    link.setAttribute('download', `${filename}_${format(new Date(), 'yyyy-MM-dd')}.csv`);
-    link.style.visibility = 'hidden';
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
+    saveBlob(new Blob([csvContent], { type: 'text/csv;charset=utf-8;' }), filename);
   };
 
   const generateReport = async (reportType: string) => {
@@ -63,15 +63,8 @@ const AdminReports = () => {
     try {
       switch (reportType) {
         case 'sales':
-          const salesData = ordersData?.orders?.map((order: any) => ({
-            order_id: order.id,
-            customer_name: order.user_name,
-            item_title: order.item_title,
-            total_amount: order.total_amount,
-            payment_status: order.payment_status,
-            order_date: format(new Date(order.order_date), 'yyyy-MM-dd'),
-          })) || [];
-          generateCSV(salesData, 'sales_report', ['Order ID', 'Customer Name', 'Item Title', 'Total Amount', 'Payment Status', 'Order Date']);
+          // Every order, streamed from the server rather than built in the browser
+          saveBlob(await downloadExport('orders'), 'sales_report');
           break;
 
         case 'artworks':
@@ -101,44 +94,42 @@ const AdminReports = () => {
           break;
 
         case 'tickets':
-          const ticketData = ticketsData?.tickets?.map((ticket: any) => ({
-            user_name: ticket.user_name,
-            exhibition_title: ticket.exhibition_title,
-            booking_date: format(new Date(ticket.booking_date), 'yyyy-MM-dd'),
-            slots: ticket.slots,
-            status: ticket.status,
-            total_amount: ticket.total_amount,
-          })) || [];
-          generateCSV(ticketData, 'tickets_report', ['User Name', 'Exhibition Title', 'Booking Date', 'Slots', 'Status', 'Total Amount']);
+          saveBlob(await downloadExport('tickets'), 'tickets_report');
           break;
 
         case 'financial':
-          const totalSales = ordersData?.orders?.reduce((sum: number, order: any) => 
-            order.payment_status === 'completed' ? sum + (order.total_amount || 0) : sum, 0) || 0;
-          const totalTickets = ticketsData?.tickets?.reduce((sum: number, ticket: any) => 
-            sum + (ticket.total_amount || 0), 0) || 0;
-          
+          const report = salesReport || await getSalesReport({ granularity: 'month' });
           const financialData = [
             {
               category: 'Artwork Sales',
-              total_revenue: totalSales,
-              count: ordersData?.orders?.filter((o: any) => o.payment_status === 'completed').length || 0,
+              period: 'Total',
+              total_revenue: report.totals.artwork_revenue,
+              count: report.totals.artwork_sales,
               report_date: format(new Date(), 'yyyy-MM-dd'),
             },
             {
               category: 'Exhibition Tickets',
-              total_revenue: totalTickets,
-              count: ticketsData?.tickets?.length || 0,
+              period: 'Total',
+              total_revenue: report.totals.ticket_revenue,
+              count: report.totals.ticket_sales,
               report_date: format(new Date(), 'yyyy-MM-dd'),
             },
             {
               category: 'Total Revenue',
-              total_revenue: totalSales + totalTickets,
-              count: (ordersData?.orders?.length || 0) + (ticketsData?.tickets?.length || 0),
+              period: 'Total',
+              total_revenue: report.totals.total_revenue,
+              count: report.totals.artwork_sales + report.totals.ticket_sales,
+              report_date: format(new Date(), 'yyyy-MM-dd'),
+            },
+            ...report.series.map((row) => ({
+              category: 'Monthly Revenue',
+              period: row.period.slice(0, 7),
+              total_revenue: row.artwork_revenue + row.ticket_revenue,
+              count: row.artwork_sales + row.ticket_sales,
               report_date: format(new Date(), 'yyyy-MM-dd'),
-            }
+            })),
           ];
-          generateCSV(financialData, 'financial_report', ['Category', 'Total Revenue', 'Count', 'Report Date']);
+          generateCSV(financialData, 'financial_report', ['Category', 'Period', 'Total Revenue', 'Count', 'Report Date']);
           break;
       }
 
@@ -165,7 +156,7 @@ const AdminReports = () => {
       description: 'Complete sales data including orders, payments, and customer information',
       icon: ShoppingBag,
       color: 'bg-green-500',
-      dataCount: ordersData?.orders?.length || 0,
+      dataCount: totals?.artwork_orders || 0,
     },
     {
       id: 'artworks',
@@ -189,7 +180,7 @@ const AdminReports = () => {
       description: 'Exhibition ticket bookings and attendance data',
       icon: Ticket,
       color: 'bg-orange-500',
-      dataCount: ticketsData?.tickets?.length || 0,
+      dataCount: totals?.ticket_bookings || 0,
     },
     {
       id: 'financial',
@@ -197,7 +188,7 @@ const AdminReports = () => {
       description: 'Revenue analysis from sales and ticket bookings',
       icon: TrendingUp,
       color: 'bg-red-500',
-      dataCount: ((ordersData?.orders?.length || 0) + (ticketsData?.tickets?.length || 0)),
+      dataCount: salesReport?.series?.length || 0,
     },
   ];
 
@@ -245,10 +236,15 @@ const AdminReports = () => {
       <div className="mt-12">
         <Card className="p-6">
           <h2 className="text-2xl font-semibold mb-4">Quick Stats</h2>
+          {salesReport && (
+            <p className="text-sm text-gray-500 mb-4">
+              Sales from {salesReport.date_from} to {salesReport.date_to}
+            </p>
+          )}
           <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
             <div className="text-center">
               <div className="text-3xl font-bold text-green-600">
-                {ordersData?.orders?.filter((o: any) => o.payment_status === 'completed').length || 0}
+                {totals?.artwork_sales || 0}
               </div>
               <div className="text-sm text-gray-600">Completed Sales</div>
             </div>
@@ -261,7 +257,7 @@ const AdminReports = () => {
               <div className="text-sm text-gray-600">Active Exhibitions</div>
             </div>
             <div className="text-center">
-              <div className="text-3xl font-bold text-orange-600">{ticketsData?.tickets?.length || 0}</div>
+              <div className="text-3xl font-bold text-orange-600">{totals?.ticket_bookings || 0}</div>
               <div className="text-sm text-gray-600">Tickets Booked</div>
             </div>
           </div>
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { useQuery } from '@tanstack/react-query';
-import { isAdmin, getAllTickets } from '@/services/api';
+import { useInfiniteQuery, keepPreviousData } from '@tanstack/react-query';
+import { isAdmin, getTicketsPage } from '@/services/api';
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
 import { Card } from "@/components/ui/card";
@@ -52,10 +52,28 @@ const AdminTickets = () => {
     console.log("Admin tickets page loaded, user is admin");
   }, [navigate]);
 
-  const { data, isLoading, error } = useQuery({
-    queryKey: ['tickets'],
-    queryFn: getAllTickets,
+  // Tickets are paginated server-side; searching by code is a prefix match on the server
+  const ticketCodeFilter = searchTerm.trim();
+  const {
+    data: pages,
+    isLoading,
+    error,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
+    queryKey: ['tickets', 'paged', ticketCodeFilter],
+    queryFn: ({ pageParam }) => getTicketsPage({ ticketCode: ticketCodeFilter, cursor: pageParam }),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.nextCursor || null,
+    // Keep showing the current list while a new search loads so the search box stays mounted
+    placeholderData: keepPreviousData,
   });
+  
+  const data = React.useMemo(
+    () => ({ tickets: (pages?.pages || []).flatMap((page) => page.tickets || []) }),
+    [pages]
+  );
 
   // Log tickets data and preload images when data is available
   useEffect(() => {
@@ -269,17 +287,7 @@ const AdminTickets = () => {
     }
   };
 
-  // Filter tickets based on search term
-  const filteredTickets = React.useMemo(() => {
-    const tickets = data?.tickets || [];
-    if (!searchTerm.trim()) {
-      return tickets;
-    }
-    
-    return tickets.filter((ticket: Ticket) => 
-      ticket.ticket_code.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-  }, [data?.tickets, searchTerm]);
+  const filteredTickets: Ticket[] = data.tickets;
 
   if (isLoading) {
     return (
@@ -381,6 +389,17 @@ const AdminTickets = () => {
                   ))}
                 </TableBody>
               </Table>
+              {hasNextPage && (
+                <div className="flex justify-center mt-4">
+                  <Button
+                    variant="outline"
+                    onClick={() => fetchNextPage()}
+                    disabled={isFetchingNextPage}
+                  >
+                    {isFetchingNextPage ? 'Loading...' : 'Load more'}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </Card>
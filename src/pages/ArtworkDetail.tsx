@@ -8,8 +8,7 @@ import { useAuth } from '@/contexts/AuthContext';
 import { useToast } from '@/hooks/use-toast';
 import ArtworkCard from '@/components/ArtworkCard';
 import { Artwork } from '@/types';
-import { getArtwork, getAllArtworks } from '@/services/api';
-import { RecommendationEngine } from '@/services/recommendationService';
+import { getArtwork, getSimilarArtworks } from '@/services/api';
 import { Ban, Sparkles } from 'lucide-react';
 
 const ArtworkDetail = () => {
@@ -31,14 +30,8 @@ const ArtworkDetail = () => {
         console.log("Artwork data received:", data);
         setArtwork(data);
         
-        // Fetch all artworks to get intelligent recommendations
-        const allArtworks = await getAllArtworks();
-        const recommendations = RecommendationEngine.generateSimilarArtworkRecommendations(
-          data, 
-          allArtworks, 
-          4
-        );
-        
+        // Precomputed on the server from artist, medium, price, year, description and co-purchases
+        const recommendations = await getSimilarArtworks(id, 4);
         setRelatedArtworks(recommendations);
       } catch (error) {
         console.error('Failed to fetch artwork:', error);
@@ -6,15 +6,21 @@ import { Label } from '@/components/ui/label';
 import { Slider } from '@/components/ui/slider';
 import { formatPrice } from '@/utils/formatters';
 import { Search, Sparkles, User } from 'lucide-react';
-import { getAllArtworks } from '@/services/api';
+import { getAllArtworks, searchCatalog, getSearchSuggestions } from '@/services/api';
 import { Artwork } from '@/types';
 import { useToast } from '@/hooks/use-toast';
 import { Button } from '@/components/ui/button';
 import { useAuth } from '@/contexts/AuthContext';
 import { RecommendationEngine } from '@/services/recommendationService';
 
+// Results per /search request; the server caps pages at 100
+const SEARCH_PAGE_SIZE = 100;
+
 const ArtworksPage = () => {
   const [searchTerm, setSearchTerm] = useState('');
+  // Artwork ids ranked by the server's search index; null while not searching or if search is unavailable
+  const [searchMatches, setSearchMatches] = useState<string[] | null>(null);
+  const [suggestions, setSuggestions] = useState<string[]>([]);
   const [priceRange, setPriceRange] = useState([0, 100000]);
   const [artworks, setArtworks] = useState<Artwork[]>([]);
   const [loading, setLoading] = useState(true);
@@ -57,6 +63,76 @@ const ArtworksPage = () => {
     fetchArtworks();
   }, [toast]);
 
+  // Ask the search index for ranked matches once typing pauses
+  useEffect(() => {
+    const query = searchTerm.trim();
+    if (query === '') {
+      setSearchMatches(null);
+      return;
+    }
+    
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        // Page through every match so a broad query is not cut off at one page
+        const ids: string[] = [];
+        const seen = new Set<string>();
+        let offset = 0;
+        let total = 0;
+        do {
+          const data = await searchCatalog(query, { type: 'artwork', limit: SEARCH_PAGE_SIZE, offset });
+          if (cancelled) return;
+          total = data.total;
+          data.results.forEach((result: { id: string }) => {
+            if (!seen.has(result.id)) {
+              seen.add(result.id);
+              ids.push(result.id);
+            }
+          });
+          if (data.results.length === 0) break;
+          offset += SEARCH_PAGE_SIZE;
+        } while (offset < total);
+        setSearchMatches(ids);
+      } catch (error) {
+        console.error('Search failed, filtering locally:', error);
+        if (!cancelled) {
+          setSearchMatches(null);
+        }
+      }
+    }, 200);
+    
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
+  // Type-ahead suggestions for the search box
+  useEffect(() => {
+    const prefix = searchTerm.trim();
+    if (prefix === '') {
+      setSuggestions([]);
+      return;
+    }
+    
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await getSearchSuggestions(prefix);
+        if (!cancelled) {
+          setSuggestions(results.map((suggestion) => suggestion.text));
+        }
+      } catch (error) {
+        console.error('Failed to fetch suggestions:', error);
+      }
+    }, 100);
+    
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
   // Generate personalized recommendations
   const generateRecommendations = async () => {
     if (artworks.length === 0) return;
@@ -71,7 +147,6 @@ const ArtworksPage = () => {
         console.log("Generating personalized recommendations");
         recommendations = await RecommendationEngine.generatePersonalizedRecommendations(
           currentUser.id, 
-          artworks, 
           6
         );
         personalized = true;
@@ -113,9 +188,14 @@ const ArtworksPage = () => {
     }
   };
 
-  // Filter artworks based on search term and price range
-  const filteredArtworks = artworks.filter((artwork) => {
-    const matchesSearch = 
+  // Filter artworks based on search term and price range, in search rank order when searching
+  const artworksById = new Map(artworks.map((artwork) => [String(artwork.id), artwork]));
+  const searchedArtworks = searchMatches === null
+    ? artworks
+    : searchMatches.map((id) => artworksById.get(id)).filter((artwork): artwork is Artwork => artwork !== undefined);
+  
+  const filteredArtworks = searchedArtworks.filter((artwork) => {
+    const matchesSearch = searchMatches !== null ||
       artwork.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
       artwork.artist.toLowerCase().includes(searchTerm.toLowerCase()) ||
       artwork.description.toLowerCase().includes(searchTerm.toLowerCase());
@@ -170,7 +250,14 @@ const ArtworksPage = () => {
                     value={searchTerm}
                     onChange={(e) => setSearchTerm(e.target.value)}
                     className="pr-10"
+                    list="search-suggestions"
+                    autoComplete="off"
                   />
+                  <datalist id="search-suggestions">
+                    {suggestions.map((suggestion) => (
+                      <option key={suggestion} value={suggestion} />
+                    ))}
+                  </datalist>
                   <Search className="absolute right-3 top-1/2 transform -translate-y-1/2 h-5 w-5 text-gray-400" />
                 </div>
               </div>
@@ -7,13 +7,11 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { useNavigate } from 'react-router-dom';
 import { formatPrice, formatDate } from '@/utils/formatters';
 import { CalendarIcon, MapPinIcon, UserIcon, PhoneIcon, MailIcon, Loader2, Sparkles } from 'lucide-react';
-import { authFetch, getAllArtworks } from '@/services/api';
+import { authFetch, generateExhibitionTicket } from '@/services/api';
 import { useToast } from '@/hooks/use-toast';
 import { RecommendationEngine } from '@/services/recommendationService';
 import ArtworkCard from '@/components/ArtworkCard';
 import { Artwork } from '@/types';
-import { format } from 'date-fns';
-import jsPDF from 'jspdf';
 
 type UserOrder = {
   id: string;
@@ -51,6 +49,8 @@ const Profile = () => {
   const [bookings, setBookings] = useState<UserBooking[]>([]);
   const [recommendedArtworks, setRecommendedArtworks] = useState<Artwork[]>([]);
   const [loading, setLoading] = useState(false);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loadingRecommendations, setLoadingRecommendations] = useState(false);
   const [generatingTicket, setGeneratingTicket] = useState<string | null>(null);
 
@@ -78,7 +78,7 @@ const Profile = () => {
     return null;
   }
 
-  const fetchUserOrders = async () => {
+  const fetchUserOrders = async (cursor: string | null = null) => {
     console.log('Profile: fetchUserOrders called with currentUser:', currentUser);
     
     if (!currentUser.id) {
@@ -87,10 +87,12 @@ const Profile = () => {
     }
     
     console.log('Profile: Starting to fetch orders for user ID:', currentUser.id);
-    setLoading(true);
+    const setBusy = cursor ? setLoadingMore : setLoading;
+    setBusy(true);
     try {
-      console.log('Profile: Making request to /user/{user_id}/orders endpoint using authFetch');
-      const data = await authFetch(`/user/${currentUser.id}/orders`);
+      // Orders and bookings come back as one page of the combined history, newest first
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const data = await authFetch(`/user/${currentUser.id}/orders${query}`);
       console.log("Profile: User orders response:", data);
       
       if (data.error) {
@@ -103,21 +105,11 @@ const Profile = () => {
         return;
       }
       
-      if (data.orders) {
-        console.log('Profile: Setting orders:', data.orders);
-        setOrders(data.orders);
-      } else {
-        console.log('Profile: No orders in response');
-        setOrders([]);
-      }
-      
-      if (data.bookings) {
-        console.log('Profile: Setting bookings:', data.bookings);
-        setBookings(data.bookings);
-      } else {
-        console.log('Profile: No bookings in response');
-        setBookings([]);
-      }
+      const pageOrders: UserOrder[] = data.orders || [];
+      const pageBookings: UserBooking[] = data.bookings || [];
+      setOrders((previous) => (cursor ? [...previous, ...pageOrders] : pageOrders));
+      setBookings((previous) => (cursor ? [...previous, ...pageBookings] : pageBookings));
+      setHistoryCursor(data.nextCursor || null);
     } catch (error) {
       console.error('Profile: Error fetching user orders:', error);
       toast({
@@ -126,18 +118,35 @@ const Profile = () => {
         variant: "destructive"
       });
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
+  const loadMoreButton = historyCursor ? (
+    <div className="flex justify-center mt-6">
+      <Button
+        variant="outline"
+        onClick={() => fetchUserOrders(historyCursor)}
+        disabled={loadingMore}
+      >
+        {loadingMore ? (
+          <>
+            <Loader2 className="h-4 w-4 animate-spin mr-2" />
+            Loading...
+          </>
+        ) : (
+          'Load older history'
+        )}
+      </Button>
+    </div>
+  ) : null;
+
   const loadPersonalizedRecommendations = async () => {
     console.log('Loading personalized recommendations');
     setLoadingRecommendations(true);
     try {
-      const allArtworks = await getAllArtworks();
       const recommendations = await RecommendationEngine.generatePersonalizedRecommendations(
         currentUser.id,
-        allArtworks,
         6
       );
       setRecommendedArtworks(recommendations);
@@ -158,113 +167,23 @@ const Profile = () => {
     navigate('/');
   };
 
-  const generateTicketPDF = (booking: UserBooking) => {
+  const generateTicketPDF = async (booking: UserBooking) => {
     try {
       setGeneratingTicket(booking.id);
-      console.log(`Generating PDF ticket for booking: ${booking.id}`);
-      
-      // Create new PDF document
-      const doc = new jsPDF();
-      
-      // Set font and colors
-      doc.setFont('helvetica');
-      
-      // Title
-      doc.setFontSize(24);
-      doc.setTextColor(0, 0, 0);
-      doc.text('EXHIBITION TICKET', 105, 30, { align: 'center' });
-      
-      // Subtitle
-      doc.setFontSize(12);
-      doc.text('Gallery Management System', 105, 40, { align: 'center' });
-      
-      // Draw border
-      doc.rect(20, 50, 170, 120);
-      
-      // Ticket details
-      doc.setFontSize(14);
-      doc.setTextColor(51, 51, 51);
+      console.log(`Downloading PDF ticket for booking: ${booking.id}`);
       
-      let yPosition = 70;
-      const lineHeight = 15;
-      
-      // User name
-      doc.setFontSize(12);
-      doc.setTextColor(102, 102, 102);
-      doc.text('User:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(currentUser.name, 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Exhibition title
-      doc.setTextColor(102, 102, 102);
-      doc.text('Exhibition:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(booking.exhibitionTitle, 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Exhibition start date
-      doc.setTextColor(102, 102, 102);
-      doc.text('Exhibition Start Date:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(booking.exhibition_start_date ? formatDate(booking.exhibition_start_date) : 'TBD', 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Exhibition end date
-      doc.setTextColor(102, 102, 102);
-      doc.text('Exhibition End Date:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(booking.exhibition_end_date ? formatDate(booking.exhibition_end_date) : 'TBD', 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Booking date
-      doc.setTextColor(102, 102, 102);
-      doc.text('Booking Date:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(formatDate(booking.date), 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Location
-      doc.setTextColor(102, 102, 102);
-      doc.text('Location:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(booking.location, 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Slots
-      doc.setTextColor(102, 102, 102);
-      doc.text('Slots:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(String(booking.slots), 70, yPosition);
-      yPosition += lineHeight;
-      
-      // Status
-      doc.setTextColor(102, 102, 102);
-      doc.text('Status:', 30, yPosition);
-      doc.setTextColor(51, 51, 51);
-      doc.text(booking.status.toUpperCase(), 70, yPosition);
-      yPosition += 25;
-      
-      // Ticket code (centered and highlighted)
-      doc.setFontSize(16);
-      doc.setTextColor(0, 0, 0);
+      // The server renders the ticket (with QR code) and streams the PDF back
+      const pdf = await generateExhibitionTicket(booking.id);
       const ticketCode = booking.ticket_code || `TKT-${String(booking.id).toUpperCase()}`;
-      doc.text(`Ticket Code: ${ticketCode}`, 105, yPosition, { align: 'center' });
-      
-      // Draw rectangle around ticket code
-      const codeWidth = doc.getTextWidth(`Ticket Code: ${ticketCode}`);
-      doc.rect(105 - codeWidth/2 - 5, yPosition - 8, codeWidth + 10, 12);
-      
-      // Footer
-      yPosition += 30;
-      doc.setFontSize(10);
-      doc.setTextColor(102, 102, 102);
-      doc.text('Please present this ticket at the exhibition entrance', 105, yPosition, { align: 'center' });
-      doc.text(`Generated on ${format(new Date(), 'MMMM do, yyyy h:mm a')}`, 105, yPosition + 10, { align: 'center' });
       
-      // Save the PDF
-      const fileName = `exhibition-ticket-${ticketCode}.pdf`;
-      doc.save(fileName);
+      const url = URL.createObjectURL(pdf);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `exhibition-ticket-${ticketCode}.pdf`;
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      URL.revokeObjectURL(url);
       
       toast({
         title: "Success",
@@ -415,6 +334,7 @@ const Profile = () => {
                     </CardContent>
                   </Card>
                 ))}
+                {loadMoreButton}
               </div>
             ) : (
               <div className="text-center py-10">
@@ -425,6 +345,7 @@ const Profile = () => {
                 >
                   Explore Exhibitions
                 </Button>
+                {loadMoreButton}
               </div>
             )}
           </TabsContent>
@@ -484,6 +405,7 @@ const Profile = () => {
                     </CardContent>
                   </Card>
                 ))}
+                {loadMoreButton}
               </div>
             ) : (
               <div className="text-center py-10">
@@ -494,6 +416,7 @@ const Profile = () => {
                 >
                   Explore Artworks
                 </Button>
+                {loadMoreButton}
               </div>
             )}
           </TabsContent>
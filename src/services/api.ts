@@ -1,5 +1,7 @@
 // API service to connect to the Python backend
 
+import { Artwork } from '@/types';
+
 // Base URL for the API
 const API_URL = 'http://localhost:8000';
 
@@ -77,6 +79,8 @@ export interface ArtistData {
   phone: string;
   created_at: string;
   artwork_count: number;
+  order_count: number;
+  revenue: number;
 }
 
 // Helper function to store auth data
@@ -533,6 +537,53 @@ export const getAllArtworks = async () => {
   }
 };
 
+// Ranked full-text search over artworks and exhibitions; the last word matches as a prefix
+export const searchCatalog = async (
+  query: string,
+  options: { type?: 'artwork' | 'exhibition'; limit?: number; offset?: number } = {}
+) => {
+  const params = new URLSearchParams({ q: query });
+  if (options.type) params.set('type', options.type);
+  if (options.limit !== undefined) params.set('limit', String(options.limit));
+  if (options.offset !== undefined) params.set('offset', String(options.offset));
+  
+  const response = await fetch(`${API_URL}/search?${params.toString()}`);
+  if (!response.ok) {
+    throw new Error('Search failed');
+  }
+  return await response.json();
+};
+
+// Type-ahead suggestions (artist names, titles, mediums, exhibitions) for a partly typed search
+export const getSearchSuggestions = async (prefix: string, limit = 8) => {
+  const params = new URLSearchParams({ q: prefix, limit: String(limit) });
+  const response = await fetch(`${API_URL}/autocomplete?${params.toString()}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch suggestions');
+  }
+  const data = await response.json();
+  return (data.suggestions || []) as { text: string; kind: string }[];
+};
+
+// Artworks recommended for a user, ranked on the server from their orders and exhibition bookings
+export const getRecommendations = async (userId: string, limit = 6) => {
+  const data = await authFetch(`/recommendations/${userId}?limit=${limit}`);
+  if (!data || data.error) {
+    throw new Error(data?.error || 'Failed to fetch recommendations');
+  }
+  return data as { recommendations: Artwork[]; personalized: boolean };
+};
+
+// The most popular available artworks, which users without history are recommended
+export const getPopularArtworks = async (limit = 6) => {
+  const response = await fetch(`${API_URL}/recommendations/popular?limit=${limit}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch popular artworks');
+  }
+  const data = await response.json();
+  return (data.recommendations || []) as Artwork[];
+};
+
 // Get a single artwork
 export const getArtwork = async (id: string) => {
   try {
@@ -547,6 +598,16 @@ export const getArtwork = async (id: string) => {
   }
 };
 
+// Artworks most similar to the given one (available only, best first)
+export const getSimilarArtworks = async (id: string, limit = 4) => {
+  const response = await fetch(`${API_URL}/artworks/${id}/similar?limit=${limit}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch similar artworks');
+  }
+  const data = await response.json();
+  return (data.artworks || []) as Artwork[];
+};
+
 // Get all artist's artworks
 export const getArtistArtworks = async () => {
   try {
@@ -667,9 +728,76 @@ export const bookExhibition = async (bookingData: any) => {
   });
 };
 
-// Get all tickets (admin only)
+export interface TicketFilters {
+  exhibitionId?: string;
+  status?: 'active' | 'used' | 'cancelled';
+  dateFrom?: string;
+  dateTo?: string;
+  ticketCode?: string;
+  limit?: number;
+  cursor?: string | null;
+}
+
+// Get one page of tickets, newest first (admin only)
+export const getTicketsPage = async (filters: TicketFilters = {}) => {
+  const params = new URLSearchParams();
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') {
+      params.set(key, String(value));
+    }
+  });
+  const query = params.toString();
+  return await authFetch(`/tickets${query ? `?${query}` : ''}`);
+};
+
+// Get all tickets by following the pagination cursor (admin only)
 export const getAllTickets = async () => {
-  return await authFetch('/tickets');
+  const tickets: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const page = await getTicketsPage({ limit: 200, cursor });
+    tickets.push(...(page.tickets || []));
+    cursor = page.nextCursor || null;
+  } while (cursor);
+  return { tickets };
+};
+
+export interface SalesReportFigures {
+  artwork_orders: number;
+  artwork_sales: number;
+  artwork_revenue: number;
+  ticket_bookings: number;
+  ticket_sales: number;
+  ticket_revenue: number;
+  tickets_sold: number;
+}
+
+export interface SalesReport {
+  granularity: 'day' | 'week' | 'month';
+  date_from: string;
+  date_to: string;
+  totals: SalesReportFigures & { total_revenue: number };
+  series: (SalesReportFigures & { period: string })[];
+  by_exhibition: { exhibition_id: number; exhibition_title: string | null; orders: number; sales: number; revenue: number; tickets_sold: number }[];
+  by_artist: { artist_id: number; artist_name: string; orders: number; sales: number; revenue: number }[];
+}
+
+export interface SalesReportParams {
+  granularity?: 'day' | 'week' | 'month';
+  dateFrom?: string;
+  dateTo?: string;
+}
+
+// Get aggregated sales figures computed by the server (admin only)
+export const getSalesReport = async (params: SalesReportParams = {}): Promise<SalesReport> => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value) {
+      query.set(key, value);
+    }
+  });
+  const queryString = query.toString();
+  return await authFetch(`/reports${queryString ? `?${queryString}` : ''}`);
 };
 
 // Get all orders (admin only)
@@ -677,10 +805,48 @@ export const getAllOrders = async () => {
   return await authFetch('/orders');
 };
 
-// Generate exhibition ticket
-export const generateExhibitionTicket = async (bookingId: string) => {
+// Download every matching order, ticket or message as a file streamed by the server (admin only)
+export const downloadExport = async (
+  exportName: 'orders' | 'tickets' | 'messages',
+  exportFormat: 'csv' | 'ndjson' = 'csv',
+  filters: Record<string, string> = {}
+): Promise<Blob> => {
+  const token = getToken();
+  if (!token) {
+    throw new Error('No authentication token found');
+  }
+  
+  const query = new URLSearchParams({ format: exportFormat, ...filters });
+  const response = await fetch(`${API_URL}/export/${exportName}?${query.toString()}`, {
+    headers: { 'Authorization': `Bearer ${token}` },
+  });
+  
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || `Export failed with status ${response.status}`);
+  }
+  
+  return await response.blob();
+};
+
+// Download an exhibition ticket as a PDF rendered by the server
+export const generateExhibitionTicket = async (bookingId: string): Promise<Blob> => {
+  const token = getToken();
+  if (!token) {
+    throw new Error('No authentication token found');
+  }
+  
   try {
-    return await authFetch(`/tickets/generate/${bookingId}`);
+    const response = await fetch(`${API_URL}/tickets/generate/${bookingId}`, {
+      headers: { 'Authorization': `Bearer ${token}` },
+    });
+    
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || `Ticket download failed with status ${response.status}`);
+    }
+    
+    return await response.blob();
   } catch (error) {
     console.error('Ticket generation error:', error);
     throw error;